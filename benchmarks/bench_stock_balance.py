@@ -0,0 +1,157 @@
+"""Stok Hareketleri tablosundaki bakiye sütunu için karşılaştırmalı ölçüm.
+
+Eski load_stock_table her satır için yeni bağlantı açıp parts tablosunu
+sorguluyordu (N+1). Burada aynı veri üzerinde şunlar ölçülür:
+  - n+1 (eski):            satır başına connect + SELECT quantity FROM parts
+  - pencere fonksiyonu:    tek sorguda SUM() OVER (PARTITION BY part_id ...)
+  - saklı bakiye:          stock_movements.balance_after sütununu okuma
+  - saklı bakiye (sayfa):  tablonun ilk sayfası (STOCK_TABLE_QUERY)
+  - backfill:              mevcut veritabanında balance_after'ı doldurma
+
+Kullanım:
+    python benchmarks/bench_stock_balance.py --sizes 10000 100000 1000000 --json sonuc.json
+"""
+import argparse
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+from time import perf_counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import main  # noqa: E402
+import service  # noqa: E402
+
+LEGACY_SAMPLE = 20000  # n+1 yolu bu kadar satırda ölçülüp doğrusal olarak ölçeklenir
+
+
+def build_db(path, movements, parts):
+    service.DB = service.Database(os.path.join(path, "depo.db"))
+    service.init_db()
+    conn = sqlite3.connect(service.DB.path)
+    conn.executemany(
+        "INSERT INTO parts (code, description, quantity, shelf) VALUES (?, '', 0, '')",
+        ((f"P{i:06d}",) for i in range(parts))
+    )
+    rnd = random.Random(42)
+    types = ("Giriş", "Giriş", "Çıkış", "Sayım")
+    conn.executemany(
+        "INSERT INTO stock_movements (part_id, movement_type, quantity) VALUES (?, ?, ?)",
+        ((rnd.randint(1, parts), rnd.choice(types), rnd.randint(1, 50)) for _ in range(movements))
+    )
+    conn.execute(f"""
+        UPDATE parts SET quantity = COALESCE((
+            SELECT SUM({service.SIGNED_QUANTITY_SQL}) FROM stock_movements s WHERE s.part_id = parts.id
+        ), 0)
+    """)
+    conn.commit()
+    return conn
+
+
+def timed(fn):
+    start = perf_counter()
+    result = fn()
+    return perf_counter() - start, result
+
+
+def bench_legacy(db_file, conn, sample):
+    rows = conn.execute("""
+        SELECT s.id, p.code FROM stock_movements s JOIN parts p ON s.part_id = p.id
+        ORDER BY s.id ASC LIMIT ?
+    """, (sample,)).fetchall()
+
+    def run():
+        for _, code in rows:
+            conn2 = sqlite3.connect(db_file)
+            conn2.execute("SELECT quantity FROM parts WHERE code = ?", (code,)).fetchone()
+            conn2.close()
+    return timed(run)[0]
+
+
+def bench_window(conn):
+    return timed(lambda: conn.execute(f"""
+        SELECT s.id, p.code, s.quantity,
+               SUM({service.SIGNED_QUANTITY_SQL}) OVER (PARTITION BY s.part_id ORDER BY s.id) AS balance,
+               s.movement_type, s.date
+        FROM stock_movements s
+        JOIN parts p ON s.part_id = p.id
+        ORDER BY s.id DESC
+    """).fetchall())[0]
+
+
+def bench_stored(conn):
+    return timed(lambda: conn.execute("""
+        SELECT s.id, p.code, s.quantity, s.balance_after, s.movement_type, s.date
+        FROM stock_movements s
+        JOIN parts p ON s.part_id = p.id
+        ORDER BY s.id DESC
+    """).fetchall())[0]
+
+
+def bench_first_page(conn):
+    sql = main.STOCK_TABLE_QUERY.format(keyset="")
+    return timed(lambda: conn.execute(sql, (main.TABLE_PAGE_SIZE,)).fetchall())[0]
+
+
+def run_size(movements, parts):
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = build_db(tmp, movements, parts)
+        db_file = service.DB.path
+
+        backfill = timed(lambda: (service.backfill_balance_after(conn.cursor()), conn.commit()))[0]
+        sample = min(movements, LEGACY_SAMPLE)
+        legacy = bench_legacy(db_file, conn, sample) * movements / sample
+
+        # Saklı bakiye ile pencere fonksiyonu aynı sonucu vermeli
+        mismatch = conn.execute(f"""
+            SELECT COUNT(*) FROM (
+                SELECT s.balance_after AS stored,
+                       SUM({service.SIGNED_QUANTITY_SQL}) OVER (PARTITION BY s.part_id ORDER BY s.id) AS computed
+                FROM stock_movements s
+            ) WHERE stored != computed
+        """).fetchone()[0]
+
+        result = {
+            "movements": movements,
+            "parts": parts,
+            "legacy_n_plus_1_s": legacy,
+            "legacy_extrapolated": sample < movements,
+            "window_function_s": bench_window(conn),
+            "stored_balance_s": bench_stored(conn),
+            "stored_first_page_s": bench_first_page(conn),
+            "backfill_s": backfill,
+            "balance_mismatches": mismatch,
+        }
+        conn.close()
+        service.DB.close_thread_connection()
+        return result
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--parts", type=int, default=2000)
+    parser.add_argument("--json", help="sonuçları bu dosyaya JSON olarak yaz")
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'hareket':>10} {'n+1 (eski)':>12} {'pencere':>10} {'saklı':>10} {'ilk sayfa':>10} {'backfill':>10}")
+    for size in args.sizes:
+        r = run_size(size, args.parts)
+        results.append(r)
+        legacy = f"{r['legacy_n_plus_1_s']:.2f}{'*' if r['legacy_extrapolated'] else ''}"
+        print(f"{size:>10} {legacy:>12} {r['window_function_s']:>10.3f} {r['stored_balance_s']:>10.3f} "
+              f"{r['stored_first_page_s']:>10.4f} {r['backfill_s']:>10.3f}")
+        if r["balance_mismatches"]:
+            print(f"  ⚠️ {r['balance_mismatches']} satırda saklı bakiye pencere sonucundan farklı")
+    print(f"(saniye; * = ilk {LEGACY_SAMPLE} satırdan doğrusal tahmin)")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main_cli()
@@ -0,0 +1,266 @@
+"""Ana sıcak yollar için ölçüm takımı; sonuçlar sürümler arası karşılaştırma için JSON yazılır.
+
+Her boyut için generate_data ile ayrı bir veritabanı üretilir (veya --db ile
+verilen veritabanının kopyası kullanılır) ve şunlar ölçülür:
+  - init_db:          mevcut veritabanını açma ve şema kontrolü (soğuk bağlantı)
+  - window_init:      MainWindow oluşturma (üç tablonun ilk sayfası dahil)
+  - load_*:           load_stock_table / load_count_table / load_work_orders (medyan)
+  - add_stock:        arayüzden tek Giriş kaydı: commit + tablo güncellemesi (p50/p95)
+  - webhook_ingest:   /creator-webhook'a gönderilen stok hareketlerinin veritabanına yazılma hızı
+  - sync_data:        değişen parçaların yerel sahte Creator sunucusuna gönderimi
+
+Kullanım:
+    python benchmarks/bench_suite.py --sizes 1000 100000 1000000 --json sonuc.json
+    python benchmarks/bench_suite.py --db depo_10m.db --json sonuc.json
+    python benchmarks/bench_suite.py --sizes 100000 --baseline onceki.json   # %10'dan kötüleşenleri göster
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+from datetime import datetime, timedelta
+from itertools import count
+from time import perf_counter, sleep
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from PyQt5.QtWidgets import QApplication  # noqa: E402
+
+import generate_data  # noqa: E402
+import main  # noqa: E402
+import service  # noqa: E402
+
+LOAD_REPEAT = 5
+WEBHOOK_TIMEOUT = 120      # saniye; olayların yazılması için en fazla beklenen süre
+REGRESSION_THRESHOLD = 0.10  # --baseline: bu orandan fazla kötüleşme raporlanır
+
+
+def timed(fn):
+    start = perf_counter()
+    result = fn()
+    return perf_counter() - start, result
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))]
+
+
+def use_db(path):
+    # main, DB'yi import sırasında kendi ad alanına alır; ikisi birlikte değiştirilmeli
+    service.DB = main.DB = service.Database(path)
+
+
+def mock_creator(latency):
+    """Token, tekli/toplu ekleme, güncelleme, kayıt kontrolü ve silme uçlarını taklit eden sunucu."""
+    from flask import Flask, request, jsonify
+    from werkzeug.serving import make_server
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    mock = Flask("mock_creator")
+    ids = count(9000000000000000000)
+    lock = threading.Lock()
+
+    def new_id():
+        with lock:
+            return str(next(ids))
+
+    @mock.before_request
+    def delay():
+        if latency:
+            sleep(latency)
+
+    @mock.route("/oauth/v2/token", methods=["POST"])
+    def token():
+        return jsonify({"access_token": "bench", "expires_in": 3600})
+
+    @mock.route("/creator/v2/data/<owner>/<app_name>/form/<form>", methods=["POST"])
+    def add(owner, app_name, form):
+        data = request.json["data"]
+        if isinstance(data, list):
+            return jsonify({"code": 3000, "result": [{"code": 3000, "data": {"ID": new_id()}} for _ in data]})
+        return jsonify({"code": 3000, "data": {"ID": new_id()}})
+
+    @mock.route("/creator/v2/data/<owner>/<app_name>/form/<form>/<record_id>", methods=["PUT"])
+    def update(owner, app_name, form, record_id):
+        return jsonify({"code": 3000, "data": {"ID": record_id}})
+
+    @mock.route("/creator/v2/data/<owner>/<app_name>/report/<report>/<record_id>", methods=["GET", "DELETE"])
+    def record(owner, app_name, report, record_id):
+        return jsonify({"code": 3000, "data": {"ID": record_id}})
+
+    server = make_server("127.0.0.1", 0, mock, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def bench_startup(path):
+    use_db(path)
+    return timed(service.init_db)[0]
+
+
+def bench_window():
+    elapsed, window = timed(main.MainWindow)
+    loads = {}
+    for name in ("load_stock_table", "load_count_table", "load_work_orders"):
+        loads[f"{name}_s"] = statistics.median(timed(getattr(window, name))[0] for _ in range(LOAD_REPEAT))
+    return elapsed, window, loads
+
+
+def bench_add_stock(window, commits):
+    samples = []
+    for i in range(commits):
+        window.part_code_input.setText(str(10000 + i % 50))
+        window.quantity_input.setText("1")
+        samples.append(timed(lambda: window.add_stock("Giriş"))[0])
+    return {"add_stock_p50_ms": percentile(samples, 0.5) * 1000,
+            "add_stock_p95_ms": percentile(samples, 0.95) * 1000,
+            "add_stock_mean_ms": statistics.fmean(samples) * 1000}
+
+
+def bench_webhook(path, events, batch, parts):
+    conn = sqlite3.connect(path)
+    before = conn.execute("SELECT COUNT(*) FROM stock_movements").fetchone()[0]
+    client = service.app.test_client()
+    # Date_Time farklı olmalı: ID'li olaylar içerik anahtarıyla da tekilleştirilir
+    now = datetime.now()
+    start = perf_counter()
+    for first in range(0, events, batch):
+        payload = [{"ID": str(generate_data.CREATOR_ID_BASE * 2 + i), "Part_Code": str(10000 + i % parts),
+                    "Added_Removed": "3", "Movement": "added",
+                    "Date_Time": (now + timedelta(seconds=i)).strftime(service.CREATOR_DATETIME_FORMAT)}
+                   for i in range(first, min(first + batch, events))]
+        while client.post("/creator-webhook", json=payload).status_code == 503:
+            sleep(0.01)   # kuyruk dolu: yazıcı yetişsin
+    accepted = perf_counter() - start
+    persisted = 0
+    while perf_counter() - start < WEBHOOK_TIMEOUT:
+        persisted = conn.execute("SELECT COUNT(*) FROM stock_movements").fetchone()[0] - before
+        if persisted >= events:
+            break
+        sleep(0.01)
+    elapsed = perf_counter() - start
+    conn.close()
+    return {"webhook_accept_events_per_s": events / accepted, "webhook_events_per_s": persisted / elapsed,
+            "webhook_lost_events": events - persisted}
+
+
+def bench_sync(path, sync_parts, latency):
+    server, base = mock_creator(latency)
+    service.API_DOMAIN = service.ACCOUNTS_DOMAIN = base
+    service.TOKEN_FILE = os.path.join(os.path.dirname(path), "token.json")
+    service.TOKENS = service.TokenManager()
+    # Yalnızca ilk sync_parts parça değişmiş olsun: dörtte biri Creator'da hiç olmayan
+    # (toplu ekleme), kalanı güncellenen parçalar
+    with service.DB.write() as cursor:
+        cursor.execute("UPDATE parts SET synced_version = version")
+        cursor.execute("UPDATE parts SET creator_id = NULL WHERE id <= ?", (sync_parts // 4,))
+        cursor.execute("UPDATE parts SET synced_version = version - 1 WHERE id <= ?", (sync_parts,))
+    elapsed, (sent, failed) = timed(service.push_parts_to_creator)
+    server.shutdown()
+    return {"sync_parts": sent + failed, "sync_failed": failed, "sync_s": elapsed,
+            "sync_parts_per_s": (sent + failed) / elapsed if elapsed else 0}
+
+
+def run_size(app_qt, args, movements=None, source=None):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "depo.db")
+        result = {}
+        if source:
+            result["generate_s"] = timed(lambda: shutil.copy(source, path))[0]
+        else:
+            parts = args.parts or max(100, movements // 100)
+            result["generate_s"] = timed(lambda: generate_data.generate(path, parts=parts, movements=movements))[0]
+        conn = sqlite3.connect(path)
+        for table in ("parts", "stock_movements", "work_orders"):
+            result[table] = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        conn.close()
+        result["db_size_mb"] = os.path.getsize(path) / 1e6
+
+        result["init_db_s"] = bench_startup(path)
+        result["window_init_s"], window, loads = bench_window()
+        result.update(loads)
+        result.update(bench_add_stock(window, args.commits))
+        app_qt.processEvents()
+        result.update(bench_webhook(path, args.webhook_events, args.webhook_batch, result["parts"]))
+        result.update(bench_sync(path, min(args.sync_parts, result["parts"]), args.mock_latency / 1000))
+
+        service.DB.changes.on_change = service.OUTBOX.on_change = None
+        window.deleteLater()
+        app_qt.processEvents()
+        service.DB.close_thread_connection()
+        return result
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {"commit": commit, "date": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(), "sqlite": sqlite3.sqlite_version, "platform": platform.platform()}
+
+
+def compare(results, baseline_path):
+    """Aynı hareket sayılı ölçümleri karşılaştırır; kötüleşen metrikleri yazdırır."""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {r["stock_movements"]: r for r in json.load(f)["results"]}
+    regressions = 0
+    for result in results:
+        old = baseline.get(result["stock_movements"])
+        if not old:
+            continue
+        for key, value in result.items():
+            if not isinstance(old.get(key), (int, float)) or not old[key] or not key.endswith(("_s", "_ms")):
+                continue
+            # *_per_s büyükse, süreler küçükse iyidir
+            change = (old[key] - value) / old[key] if key.endswith("_per_s") else (value - old[key]) / old[key]
+            if change > REGRESSION_THRESHOLD and key != "generate_s":
+                regressions += 1
+                print(f"  ⚠️ {result['stock_movements']} hareket, {key}: {old[key]:.4g} -> {value:.4g} "
+                      f"(%{change * 100:.0f} kötü)")
+    print(f"{regressions} metrik %{REGRESSION_THRESHOLD * 100:.0f}'dan fazla kötüleşti.")
+    return regressions
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 100000, 1000000],
+                        help="üretilecek hareket sayıları")
+    parser.add_argument("--db", help="üretmek yerine bu veritabanının kopyasını kullan")
+    parser.add_argument("--parts", type=int, default=None, help="varsayılan: hareket/100, en az 100")
+    parser.add_argument("--commits", type=int, default=200, help="ölçülecek add_stock sayısı")
+    parser.add_argument("--webhook-events", type=int, default=5000)
+    parser.add_argument("--webhook-batch", type=int, default=50, help="istek başına olay")
+    parser.add_argument("--sync-parts", type=int, default=2000, help="değişmiş işaretlenecek parça sayısı")
+    parser.add_argument("--mock-latency", type=float, default=0, help="sahte Creator'ın istek başına gecikmesi (ms)")
+    parser.add_argument("--json", help="sonuçları bu dosyaya JSON olarak yaz")
+    parser.add_argument("--baseline", help="önceki bir --json çıktısıyla karşılaştır")
+    args = parser.parse_args()
+
+    app_qt = QApplication.instance() or QApplication(sys.argv[:1])
+    runs = [dict(source=args.db)] if args.db else [dict(movements=size) for size in args.sizes]
+    results = []
+    for run in runs:
+        result = run_size(app_qt, args, **run)
+        results.append(result)
+        print(json.dumps(result, indent=2))
+
+    report = {"environment": environment(), "results": results}
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if args.baseline:
+        sys.exit(1 if compare(results, args.baseline) else 0)
+
+
+if __name__ == "__main__":
+    main_cli()
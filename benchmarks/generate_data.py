@@ -0,0 +1,158 @@
+"""Ölçümler için gerçekçi sentetik depo veritabanı üretir.
+
+Parçalar, zamana yayılmış stok hareketleri ve iş emirleri yazılır:
+  - bazı parçalar çok, çoğu az hareket görür (çarpık dağılım)
+  - Çıkış hiçbir zaman stoğu eksiye düşürmez, Sayım mevcut stoğa yakın sayar
+  - balance_after ve parts.quantity defterle tutarlıdır (verify temiz çıkar)
+  - iş emirlerinin parça satırları ve ayrılan stoklar (parts.reserved) kurulur
+  - her parçanın stoğu tek (varsayılan) rafındadır (part_locations)
+  - son SYNC_PENDING_RATIO kadar kayıt Creator'a henüz gönderilmemiştir
+Veri parça parça üretilip yazılır; 10M hareket için bellek kullanımı sabittir.
+
+Kullanım:
+    python benchmarks/generate_data.py depo_1m.db --movements 1000000
+    python benchmarks/generate_data.py depo_10m.db --movements 10000000 --parts 50000 --days 1825
+"""
+import argparse
+import os
+import random
+import sqlite3
+import sys
+from datetime import datetime, timedelta
+from itertools import islice
+from time import perf_counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import service  # noqa: E402
+
+INSERT_CHUNK = 50000        # executemany başına satır
+SYNC_PENDING_RATIO = 0.01   # gönderilmemiş (creator_id'siz) kayıt oranı
+CREATOR_ID_BASE = 4000000000000000000
+
+PART_NAMES = ("Rulman", "Conta", "Vida", "Somun", "Kayış", "Filtre", "Sensör", "Röle", "Sigorta", "Hortum",
+              "Keçe", "Pim", "Yay", "Valf", "Kaplin", "Motor", "Pompa", "Kablo", "Konnektör", "Dişli")
+MACHINES = ("CNC-1", "CNC-2", "Pres-3", "Konveyör-A", "Konveyör-B", "Kompresör", "Robot-7", "Paketleme-2")
+ISSUES = ("yağ kaçağı", "titreşim", "aşırı ısınma", "sensör arızası", "periyodik bakım", "kayış değişimi")
+WORK_ORDER_STATUSES = ("Beklemede", "Devam Ediyor", "Tamamlandı", "Tamamlandı")
+
+
+def _chunks(rows, size=INSERT_CHUNK):
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _timeline(count, days, now):
+    """count adet artan zaman damgası; id sırası tarih sırasıyla aynı olur."""
+    start = now - timedelta(days=days)
+    step = days * 86400 / max(count, 1)
+    for i in range(count):
+        yield (start + timedelta(seconds=i * step)).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _movements(rnd, count, parts, days, now, balances):
+    pending_from = int(count * (1 - SYNC_PENDING_RATIO))
+    for i, date in enumerate(_timeline(count, days, now)):
+        # Karesi alınmış uniform: düşük id'li parçalar çok daha sık hareket görür
+        part = int(parts * rnd.random() ** 2)
+        balance = balances[part]
+        roll = rnd.random()
+        if roll < 0.05:
+            movement, counted = "Sayım", max(0, balance + rnd.randint(-2, 2))
+            quantity = counted - balance
+        elif roll < 0.45 or balance == 0:
+            movement, counted, quantity = "Giriş", None, rnd.choice((10, 20, 25, 50, 100, 200))
+        else:
+            movement, counted, quantity = "Çıkış", None, rnd.randint(1, min(balance, 20))
+        quantity, balances[part] = service.ledger_step(balance, movement, quantity, counted)
+        synced = i < pending_from
+        yield (part + 1, movement, quantity, counted, None, balances[part], date,
+               str(CREATOR_ID_BASE + i) if synced else None, "synced" if synced else "pending")
+
+
+def _work_orders(rnd, count, parts, days, now):
+    pending_from = int(count * (1 - SYNC_PENDING_RATIO))
+    for i, date in enumerate(_timeline(count, days, now)):
+        required = ", ".join(f"{10000 + rnd.randrange(parts)} x{rnd.randint(1, 4)}" for _ in range(rnd.randint(1, 3)))
+        synced = i < pending_from
+        yield (f"{rnd.choice(MACHINES)}: {rnd.choice(ISSUES)}", required, rnd.choice(WORK_ORDER_STATUSES), date,
+               str(CREATOR_ID_BASE + i) if synced else None, "synced" if synced else "pending")
+
+
+def generate(path, parts=1000, movements=100000, work_orders=None, days=730, seed=42, snapshots=True,
+             progress=None):
+    """path'te (yoksa) şemayı kurar ve veriyi ekler; satır sayılarını döner."""
+    if work_orders is None:
+        work_orders = max(movements // 50, 10)
+    rnd = random.Random(seed)
+    now = datetime.utcnow()
+    service.DB = service.Database(path)
+    service.init_db()
+
+    conn = sqlite3.connect(path, isolation_level=None)
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.execute("PRAGMA cache_size=-262144")    # ~256 MB; indeks güncellemeleri diske taşmasın
+    conn.execute("BEGIN")
+    conn.executemany(
+        "INSERT INTO parts (code, description, quantity, shelf, creator_id) VALUES (?, ?, 0, ?, ?)",
+        ((str(10000 + i), f"{rnd.choice(PART_NAMES)} {rnd.randint(100, 9999)}",
+          f"{chr(65 + rnd.randrange(8))}{rnd.randint(1, 20):02d}-{rnd.randint(1, 5)}",
+          str(CREATOR_ID_BASE + i)) for i in range(parts))
+    )
+    balances = [0] * parts
+    written = 0
+    for chunk in _chunks(_movements(rnd, movements, parts, days, now, balances)):
+        conn.executemany(
+            """INSERT INTO stock_movements (part_id, movement_type, quantity, counted_qty, shelf, balance_after,
+                                            date, creator_id, sync_status)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""", chunk)
+        written += len(chunk)
+        if progress:
+            progress("stock_movements", written, movements)
+    for chunk in _chunks(_work_orders(rnd, work_orders, parts, days, now)):
+        conn.executemany(
+            """INSERT INTO work_orders (records, required_parts, status, date, creator_id, sync_status)
+               VALUES (?, ?, ?, ?, ?, ?)""", chunk)
+    service.rebuild_work_order_lines(conn.cursor())
+    conn.executemany("UPDATE parts SET quantity=? WHERE id=?",
+                     ((quantity, part + 1) for part, quantity in enumerate(balances)))
+    service.assign_default_locations(conn.cursor())
+    # Üretilen stoklar Creator'da varmış gibi: değişen parça kalmasın
+    conn.execute("UPDATE parts SET synced_version = version")
+    conn.execute("COMMIT")
+    conn.execute("ANALYZE")
+    conn.close()
+
+    taken = service.ensure_monthly_snapshots(now) if snapshots else 0
+    service.DB.close_thread_connection()
+    return {"parts": parts, "movements": movements, "work_orders": work_orders, "snapshots": taken}
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path", help="oluşturulacak veritabanı dosyası (varsa üzerine eklenmez)")
+    parser.add_argument("--movements", type=int, default=100000)
+    parser.add_argument("--parts", type=int, default=None, help="varsayılan: hareket/100, en az 100")
+    parser.add_argument("--work-orders", type=int, default=None, help="varsayılan: hareket/50")
+    parser.add_argument("--days", type=int, default=730, help="hareketlerin yayıldığı geçmiş gün sayısı")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--no-snapshots", action="store_true", help="ay sonu görüntülerini alma")
+    args = parser.parse_args()
+    if os.path.exists(args.path):
+        parser.error(f"{args.path} zaten var")
+
+    def progress(table, done, total):
+        print(f"\r{table}: {done}/{total}", end="", flush=True)
+
+    start = perf_counter()
+    counts = generate(args.path, parts=args.parts or max(100, args.movements // 100), movements=args.movements,
+                      work_orders=args.work_orders, days=args.days, seed=args.seed,
+                      snapshots=not args.no_snapshots, progress=progress)
+    print(f"\n{counts} — {perf_counter() - start:.1f} s, {os.path.getsize(args.path) / 1e6:.0f} MB")
+
+
+if __name__ == "__main__":
+    main_cli()
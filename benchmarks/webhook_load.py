@@ -0,0 +1,176 @@
+"""/creator-webhook için yük testi.
+
+Önce/sonra karşılaştırması için sunucuyu geçici bir veritabanıyla kendisi başlatır:
+  --mode legacy   eski işleyici: istek başına sqlite3.connect + COUNT(*) tekilleştirme
+                  + payload yankısı, Flask geliştirme sunucusu
+  --mode current  service.app: doğrulama + kuyruk, toplu transaction, waitress
+veya --url ile zaten çalışan bir sunucuya yük gönderir.
+
+Kullanım:
+    python benchmarks/webhook_load.py --mode legacy  --requests 5000 --concurrency 32
+    python benchmarks/webhook_load.py --mode current --requests 5000 --concurrency 32
+    python benchmarks/webhook_load.py --mode current --batch 50     # dizi payload
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+from time import perf_counter, sleep
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import service  # noqa: E402
+
+
+def legacy_app(db_file):
+    """Değişiklik öncesi creator_webhook'un birebir kopyası."""
+    from flask import Flask, request, jsonify
+    app = Flask("legacy_webhook")
+
+    @app.route('/creator-webhook', methods=['POST'])
+    def creator_webhook():
+        data = request.json
+        if "Maintenance_Repair_Records" in data:
+            records = data.get("Maintenance_Repair_Records", "")
+            parts = data.get("Required_Parts", "")
+            status = data.get("Status_Information", "")
+            conn = sqlite3.connect(db_file)
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT COUNT(*) FROM work_orders
+                WHERE records=? AND required_parts=? AND status=?
+            """, (records, parts, status))
+            if cursor.fetchone()[0] == 0:
+                cursor.execute(
+                    "INSERT INTO work_orders (records, required_parts, status) VALUES (?, ?, ?)",
+                    (records, parts, status)
+                )
+                conn.commit()
+            conn.close()
+        return jsonify({"status": "success", "message": "Payload saved", "received_payload": data})
+    return app
+
+
+def start_server(mode, db_file):
+    if mode == "legacy":
+        from werkzeug.serving import make_server
+        server = make_server("127.0.0.1", 0, legacy_app(db_file), threaded=True)
+        port = server.server_port
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    else:
+        from waitress.server import create_server
+        server = create_server(service.app, host="127.0.0.1", port=0, threads=service.WEBHOOK_SERVER_THREADS)
+        port = server.effective_port
+        threading.Thread(target=server.run, daemon=True).start()
+    sleep(0.2)
+    return f"http://127.0.0.1:{port}/creator-webhook"
+
+
+def make_payload(i, batch):
+    events = [{
+        "Maintenance_Repair_Records": f"WO-{i}-{k}",
+        "Required_Parts": "P1 x2, P2",
+        "Status_Information": "Pending",
+    } for k in range(batch)]
+    return events[0] if batch == 1 else events
+
+
+def run_load(url, total, concurrency, batch):
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    counter = iter(range(total))
+
+    def worker():
+        session = requests.Session()
+        local = []
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                break
+            start = perf_counter()
+            try:
+                resp = session.post(url, data=json.dumps(make_payload(i, batch)),
+                                    headers={"Content-Type": "application/json"}, timeout=30)
+                if resp.status_code >= 300:
+                    with lock:
+                        errors[0] += 1
+            except requests.RequestException:
+                with lock:
+                    errors[0] += 1
+            local.append(perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = perf_counter() - start
+    latencies.sort()
+    return {
+        "requests": total,
+        "events": total * batch,
+        "errors": errors[0],
+        "elapsed_s": elapsed,
+        "requests_per_s": total / elapsed,
+        "events_per_s": total * batch / elapsed,
+        "p50_ms": latencies[len(latencies) // 2] * 1000 if latencies else 0,
+        "p95_ms": latencies[int(len(latencies) * 0.95)] * 1000 if latencies else 0,
+    }
+
+
+def wait_persisted(db_file, expected, timeout=120):
+    """Kuyruktaki olayların veritabanına yazılmasını bekler; geçen süreyi döner."""
+    start = perf_counter()
+    conn = sqlite3.connect(db_file)
+    while perf_counter() - start < timeout:
+        if conn.execute("SELECT COUNT(*) FROM work_orders").fetchone()[0] >= expected:
+            break
+        sleep(0.05)
+    conn.close()
+    return perf_counter() - start
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--mode", choices=("legacy", "current"), default="current")
+    parser.add_argument("--url", help="kendi sunucusunu başlatmak yerine bu adrese yük gönder")
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--batch", type=int, default=1, help="istek başına olay sayısı (current modda)")
+    parser.add_argument("--json", help="sonuçları bu dosyaya JSON olarak yaz")
+    args = parser.parse_args()
+    if args.mode == "legacy" and args.batch != 1:
+        parser.error("eski işleyici dizi payload kabul etmez; --batch 1 kullanın")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_file = None
+        url = args.url
+        if not url:
+            service.DB = service.Database(os.path.join(tmp, "depo.db"))
+            service.init_db()
+            db_file = service.DB.path
+            url = start_server(args.mode, db_file)
+
+        result = run_load(url, args.requests, args.concurrency, args.batch)
+        result["mode"] = args.mode if not args.url else "external"
+        if db_file:
+            drain = wait_persisted(db_file, result["events"] - result["errors"] * args.batch)
+            result["persisted_events_per_s"] = result["events"] / (result["elapsed_s"] + drain)
+
+        print(json.dumps(result, indent=2))
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main_cli()
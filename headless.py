@@ -0,0 +1,83 @@
+"""Arayüzsüz sunucu modu: webhook dinleyicisi, Creator gönderim kuyruğu ve periyodik senkronizasyon.
+
+PyQt5 içe aktarılmaz; küçük sunucularda masaüstü arayüzü olmadan çalışır.
+
+Kullanım:
+    python headless.py [--host 0.0.0.0] [--port 5000] [--sync-interval 300] [--pull-interval 600]
+    python headless.py verify|snapshot|stock-at|import|export ...   # bakım komutları
+"""
+import sys
+import argparse
+import threading
+
+from service import (
+    DB, OUTBOX, AUTO_SYNC_INTERVAL, CLI_COMMANDS, MAINTENANCE_INTERVAL,
+    init_db, run_cli, run_server, start_background_services, run_maintenance,
+    dirty_part_count, push_parts_to_creator, pull_from_creator,
+)
+
+HEADLESS_PULL_INTERVAL = 600  # saniye; Creator'dan değişiklik çekme aralığı (0: kapalı)
+
+_stop = threading.Event()
+
+def run_every(interval, job, name):
+    """job'u interval saniyede bir arka plan thread'inde çalıştırır; hata döngüyü durdurmaz."""
+    def loop():
+        while not _stop.wait(interval):
+            try:
+                job()
+            except Exception as e:
+                print(f"⚠️ {name} başarısız:", e)
+        DB.close_thread_connection()
+
+    thread = threading.Thread(target=loop, name=name, daemon=True)
+    thread.start()
+    return thread
+
+def push_dirty_parts():
+    # Arayüzdeki boşta gönderimin karşılığı: değişen parça yoksa tek bir indeksli COUNT
+    if dirty_part_count():
+        sent, failed = push_parts_to_creator()
+        print(f"Creator’a {sent} parça gönderildi, {failed} parça gönderilemedi.")
+
+def pull_changes():
+    results = pull_from_creator()
+    if any(results.values()):
+        print("Creator’dan değişiklikler alındı:", results)
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] and argv[0] in CLI_COMMANDS:
+        return run_cli(argv)
+
+    parser = argparse.ArgumentParser(prog="headless.py", description="Depo webhook ve senkronizasyon sunucusu")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--sync-interval", type=int, default=AUTO_SYNC_INTERVAL,
+                        help="Değişen parçaları gönderme aralığı, saniye (0: kapalı)")
+    parser.add_argument("--pull-interval", type=int, default=HEADLESS_PULL_INTERVAL,
+                        help="Creator'dan değişiklik çekme aralığı, saniye (0: kapalı)")
+    args = parser.parse_args(argv)
+
+    init_db()
+    start_background_services()
+    if args.sync_interval:
+        run_every(args.sync_interval, push_dirty_parts, "auto-sync")
+    if args.pull_interval:
+        run_every(args.pull_interval, pull_changes, "auto-pull")
+    if MAINTENANCE_INTERVAL:
+        # Açık kaldıkça her ay sonu görüntüsü alınır, eski önbellek ve anahtarlar silinir
+        run_every(MAINTENANCE_INTERVAL, run_maintenance, "maintenance")
+
+    print(f"Webhook server başlatıldı: http://{args.host}:{args.port}/creator-webhook")
+    try:
+        run_server(host=args.host, port=args.port)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        _stop.set()
+        OUTBOX.stop()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
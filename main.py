@@ -1,277 +1,236 @@
 import sys
-import sqlite3
-import requests
+import json
+import threading
 from PyQt5.QtWidgets import (
     QApplication, QMainWindow, QWidget, QTabWidget, QVBoxLayout,
-    QLabel, QLineEdit, QPushButton, QHBoxLayout, QTableWidget,
-    QTableWidgetItem, QAbstractItemView, QTextEdit
+    QLabel, QLineEdit, QPushButton, QHBoxLayout, QAbstractItemView,
+    QTextEdit, QProgressBar, QTableView, QMenu, QShortcut, QCheckBox, QComboBox, QFileDialog
+)
+from PyQt5.QtCore import pyqtSignal, Qt, QAbstractTableModel, QModelIndex, QTimer
+from PyQt5.QtGui import QKeySequence
+# İş mantığı arayüzden bağımsız service modülünde; burada yalnızca masaüstü arayüzü var
+from service import (
+    DB, OUTBOX, METRICS, AUTO_SYNC_INTERVAL, MAINTENANCE_INTERVAL, CLI_COMMANDS, EXPORT_TABLES,
+    init_db, run_cli, run_server, start_background_services, maintenance_in_background,
+    add_stock_movement, add_count_movement, transfer_stock, zone_totals, remove_movement, add_work_order, remove_work_order,
+    sync_status_label, outbox_counts, retry_failed_outbox, dirty_part_count,
+    push_parts_to_creator, pull_from_creator, import_movements, import_summary,
+    export_table, ledger_time, parse_required_parts, kittable_work_orders, kitting_summary,
+    search_match, search_filter,
 )
-from datetime import datetime
-import json
-import os
-from time import time
-import threading
-from flask import Flask, request, jsonify
 
 # --------------------
-# Zoho Creator API Yardımcı
+# Tablo Modelleri
 # --------------------
-CLIENT_ID = "YOUR_CLIENT_ID"
-CLIENT_SECRET = "YOUR_CLIENT_SECRET"
-REFRESH_TOKEN = "YOUR_REFRESH_TOKEN"
-API_DOMAIN = "https://www.zohoapis.eu"
-OWNER_NAME = "YOUR_OWNER_NAME"
-APP_LINK_NAME = "YOUR_APP_LINK_NAME"
-ACCESS_TOKEN = None
-ACCOUNTS_DOMAIN = "https://accounts.zoho.eu"
-TOKEN_FILE = "token.json"
-
-def save_token_file(access_token, expires_in=None):
-    try:
-        payload = {"access_token": access_token, "saved_at": int(time())}
-        if expires_in:
-            payload["expires_in"] = int(expires_in)
-        with open(TOKEN_FILE, "w", encoding="utf-8") as f:
-            json.dump(payload, f)
-    except Exception as e:
-        print("token.json kaydedilemedi:", e)
-
-def load_token_file():
-    if not os.path.exists(TOKEN_FILE):
-        return None
-    try:
-        with open(TOKEN_FILE, "r", encoding="utf-8") as f:
-            return json.load(f)
-    except Exception as e:
-        print("token.json okunamadı:", e)
+TABLE_PAGE_SIZE = 500
+SCAN_DEFAULT_QUANTITY = 1   # barkod modunda miktar kutusu boşsa okutma başına miktar
+SCAN_GROUP_WINDOW = 0.5     # saniye; bu süre içindeki okutmalar tek transaction'da, aynı kod tek harekette yazılır
+REFRESH_DEBOUNCE = 0.25     # saniye; bu süre içindeki değişiklik bildirimleri tek yenilemede uygulanır
+SEARCH_DEBOUNCE = 0.2       # saniye; arama kutusunda yazma bu kadar durunca sorgu çalışır
+
+class SqlPagedTableModel(QAbstractTableModel):
+    """SQLite'tan sayfa sayfa okunan salt okunur tablo modeli.
+
+    Satırlar id'ye göre azalan sırada, görünüm kaydırıldıkça (fetchMore)
+    keyset sayfalama ile yüklenir; böylece tablo büyüdükçe açılış süresi artmaz.
+    query: ilk sütunu satır id'si olan SELECT. "{keyset}" WHERE içinde, son
+    parametre LIMIT olmalıdır. formatter bir satırı hücre metinlerine çevirir.
+    search: set_search ile aranacak (FTS dizinli tablo, süzülen id sütunu); yoksa
+    tablo aranamaz.
+    """
+
+    def __init__(self, headers, query, formatter, id_column, parent=None, search=None):
+        super().__init__(parent)
+        self.headers = headers
+        self.query = query
+        self.formatter = formatter
+        self.id_column = id_column
+        self.search = search
+        self._match = None
+        self._search_filter = None
+        self._ids = []
+        self._rows = []
+        self._exhausted = False
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.headers)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and index.isValid():
+            return self._rows[index.row()][index.column()]
         return None
 
-_tok = load_token_file()
-if _tok and "access_token" in _tok:
-    ACCESS_TOKEN = _tok["access_token"]
-
-def refresh_access_token():
-    global ACCESS_TOKEN
-    url = f"{ACCOUNTS_DOMAIN}/oauth/v2/token"
-    data = {
-        "refresh_token": REFRESH_TOKEN,
-        "client_id": CLIENT_ID,
-        "client_secret": CLIENT_SECRET,
-        "grant_type": "refresh_token"
-    }
-    try:
-        resp = requests.post(url, data=data, timeout=20)
-        print("Refresh token endpoint response:", resp.status_code)
-        print("Refresh response text:", resp.text)
-        if resp.status_code != 200:
-            return False
-        json_resp = resp.json()
-        if "access_token" in json_resp:
-            ACCESS_TOKEN = json_resp["access_token"]
-            save_token_file(ACCESS_TOKEN, expires_in=json_resp.get("expires_in"))
-            print("Yeni access token alındı (kayıt edildi).")
-            return True
-        else:
-            print("Refresh token yanıtı hatalı:", json_resp)
-            return False
-    except Exception as e:
-        print("Refresh token işlenirken hata:", e)
-        return False
-    
-def check_record_exists(report_name, record_id):
-    """Creator'da kayıt var mı diye kontrol eder."""
-    global ACCESS_TOKEN
-    if not ACCESS_TOKEN:
-        if not refresh_access_token():
-            return False
-
-    url = f"{API_DOMAIN}/creator/v2/data/{OWNER_NAME}/{APP_LINK_NAME}/report/{report_name}/{record_id}"
-    headers = {"Authorization": f"Zoho-oauthtoken {ACCESS_TOKEN}"}
-
-    try:
-        resp = requests.get(url, headers=headers, timeout=20)
-        if resp.status_code == 200:
-            return True
-        elif resp.status_code == 404:
-            return False
-        elif resp.status_code in (401, 403):
-            if refresh_access_token():
-                return check_record_exists(report_name, record_id)
-        return False
-    except Exception as e:
-        print("⚠️ check_record_exists hata:", e)
-        return False
-
-
-def send_to_creator(form_link_name, data, method="POST", record_id=None):
-    """Zoho Creator’a veri gönderir (ekle/güncelle)."""
-    global ACCESS_TOKEN
-    if not ACCESS_TOKEN:
-        if not refresh_access_token():
-            return False, "Token alınamadı."
-
-    headers = {"Authorization": f"Zoho-oauthtoken {ACCESS_TOKEN}"}
-
-    try:
-        if method == "PUT" and record_id:
-            # Güncelleme
-            url = f"{API_DOMAIN}/creator/v2/data/{OWNER_NAME}/{APP_LINK_NAME}/form/{form_link_name}/{record_id}"
-            resp = requests.put(url, headers=headers, json={"data": data}, timeout=20)
-
-        else:
-            # Ekleme (önce var mı kontrol et)
-            if data.get("ID"):
-                report_name = f"All_{form_link_name}"
-                exists = check_record_exists(report_name, data["ID"])
-                if exists:
-                    return False, f"Kayıt zaten Creator'da var (ID={data['ID']})."
-
-            url = f"{API_DOMAIN}/creator/v2/data/{OWNER_NAME}/{APP_LINK_NAME}/form/{form_link_name}"
-            resp = requests.post(url, headers=headers, json={"data": data}, timeout=20)
-
-        if resp.status_code in (200, 201):
-            return True, resp.json()
-        elif resp.status_code in (401, 403):
-            if refresh_access_token():
-                return send_to_creator(form_link_name, data, method, record_id)
-        return False, f"Hata: {resp.status_code}, {resp.text}"
-
-    except Exception as e:
-        return False, f"send_to_creator hata: {e}"
-
-
-def extract_record_id_from_data(data_obj):
-    if isinstance(data_obj, dict):
-        return data_obj.get("ID")
-    if isinstance(data_obj, list) and data_obj:
-        elem = data_obj[0]
-        if isinstance(elem, dict):
-            return elem.get("ID")
-    return None
-
-from functools import partial
-
-def delete_from_creator(form_name, record_id):
-    """Zoho Creator’dan kayıt siler (önce var mı kontrol eder)."""
-    global ACCESS_TOKEN
-    if not ACCESS_TOKEN:
-        if not refresh_access_token():
-            return False
-
-    report_name = f"All_{form_name}"
-
-    # Silmeden önce kontrol
-    exists = check_record_exists(report_name, record_id)
-    if not exists:
-        print(f"⚠️ {form_name} id={record_id} Creator'da zaten yok, silme atlanıyor.")
-        return True
-
-    url = f"{API_DOMAIN}/creator/v2/data/{OWNER_NAME}/{APP_LINK_NAME}/report/{report_name}/{record_id}"
-    headers = {"Authorization": f"Zoho-oauthtoken {ACCESS_TOKEN}"}
-
-    try:
-        resp = requests.delete(url, headers=headers, timeout=20)
-        if resp.status_code == 200:
-            return True
-        elif resp.status_code in (401, 403):
-            if refresh_access_token():
-                return delete_from_creator(form_name, record_id)
-        return False
-    except Exception as e:
-        print("⚠️ delete_from_creator hata:", e)
-        return False
-
-
-
-
-
-
-
-
-# --------------------
-# SQLite Veritabanı
-# --------------------
-def init_db():
-    conn = sqlite3.connect("depo.db")
-    cursor = conn.cursor()
-    cursor.execute("""CREATE TABLE IF NOT EXISTS parts (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        code TEXT NOT NULL,
-        description TEXT,
-        quantity INTEGER DEFAULT 0,
-        shelf TEXT,
-        creator_id TEXT
-    )""")
-    cursor.execute("""CREATE TABLE IF NOT EXISTS stock_movements (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        part_id INTEGER,
-        movement_type TEXT,
-        quantity INTEGER,
-        shelf TEXT,
-        creator_id TEXT,
-        date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        FOREIGN KEY(part_id) REFERENCES parts(id)
-    )""")
-    cursor.execute("""CREATE TABLE IF NOT EXISTS work_orders (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        records TEXT,
-        required_parts TEXT,
-        status TEXT,
-        date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        creator_id TEXT
-    )""")
-    conn.commit()
-    conn.close()
-
-# --------------------
-# Flask Webhook Listener
-# --------------------
-app = Flask(__name__)
-
-# Flask Webhook Listener
-@app.route('/creator-webhook', methods=['POST'])
-def creator_webhook():
-    data = request.json
-    print("Webhook payload received:", data)
-
-    # Work Order ise kayıt ekle
-    if "Maintenance_Repair_Records" in data:
-        records = data.get("Maintenance_Repair_Records", "")
-        parts = data.get("Required_Parts", "")
-        status = data.get("Status_Information", "")
-
-        conn = sqlite3.connect("depo.db")
-        cursor = conn.cursor()
-
-        # Aynı kayıt zaten varsa ekleme (tekilleştirme)
-        cursor.execute("""
-            SELECT COUNT(*) FROM work_orders 
-            WHERE records=? AND required_parts=? AND status=?
-        """, (records, parts, status))
-        count = cursor.fetchone()[0]
-
-        if count == 0:
-            cursor.execute(
-                "INSERT INTO work_orders (records, required_parts, status) VALUES (?, ?, ?)",
-                (records, parts, status)
-            )
-            conn.commit()
-
-        conn.close()
-
-    return jsonify({"status": "success", "message": "Payload saved", "received_payload": data})
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.headers[section]
+        return None
 
+    def row_id(self, row):
+        return self._ids[row]
 
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self._exhausted
 
+    def _select(self, keyset="", params=(), limit=TABLE_PAGE_SIZE):
+        # Arama varsa her sorguya (sayfa, yeni satırlar, yenileme) aynı koşul eklenir
+        if self._match:
+            keyset = f"{keyset} AND {self._search_filter}"
+            params = (*params, self._match)
+        return DB.fetchall(self.query.format(keyset=keyset), (*params, limit))
 
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self._exhausted:
+            return
+        if self._ids:
+            records = self._select(f"AND {self.id_column} < ?", (self._ids[-1],))
+        else:
+            records = self._select()
 
+        if len(records) < TABLE_PAGE_SIZE:
+            self._exhausted = True
+        if not records:
+            return
+        first = len(self._rows)
+        self.beginInsertRows(QModelIndex(), first, first + len(records) - 1)
+        for record in records:
+            self._ids.append(record[0])
+            self._rows.append(self.formatter(record))
+        self.endInsertRows()
+
+    def fetch_newer(self):
+        """Yalnızca son yüklemeden sonra eklenen satırları tablonun başına ekler.
+
+        Yeni satır sayısı bir sayfayı aşarsa (arada boşluk kalmasın diye) yeniden yükler.
+        """
+        if not self._ids:
+            self.reload()
+            return
+        records = self._select(f"AND {self.id_column} > ?", (self._ids[0],))
+        if len(records) >= TABLE_PAGE_SIZE:
+            self.reload()
+            return
+        if not records:
+            return
+        self.beginInsertRows(QModelIndex(), 0, len(records) - 1)
+        self._ids[:0] = [record[0] for record in records]
+        self._rows[:0] = [self.formatter(record) for record in records]
+        self.endInsertRows()
+
+    def refresh_rows(self, ids):
+        """Verilen id'lerden yüklü olan satırları yeniden okur.
+
+        Silinmiş ya da artık sorguya uymayan satırlar tablodan kaldırılır; yüklü
+        olmayan id'ler atlanır (kaydırıldıklarında zaten güncel okunurlar).
+        """
+        positions = {row_id: row for row, row_id in enumerate(self._ids)}
+        loaded = [row_id for row_id in ids if row_id in positions]
+        if not loaded:
+            return
+        records = {record[0]: record for record in self._select(
+            f"AND {self.id_column} IN (SELECT value FROM json_each(?))", (json.dumps(loaded),), len(loaded))}
+        removed = []
+        for row_id in loaded:
+            row = positions[row_id]
+            if row_id in records:
+                self._rows[row] = self.formatter(records[row_id])
+                self.dataChanged.emit(self.index(row, 0), self.index(row, len(self.headers) - 1))
+            else:
+                removed.append(row)
+        for row in sorted(removed, reverse=True):
+            self.beginRemoveRows(QModelIndex(), row, row)
+            del self._ids[row]
+            del self._rows[row]
+            self.endRemoveRows()
+
+    def apply_changes(self, ids):
+        """ChangeFeed'den gelen değişiklikleri uygular; ids None ise yeniden yükler."""
+        if ids is None:
+            self.reload()
+            return
+        self.refresh_rows(ids)
+        self.fetch_newer()
+
+    def set_search(self, text):
+        """Tabloyu arama metnine uyan satırlarla sınırlar (boş metin süzmeyi kaldırır)."""
+        match = search_match(text)
+        if match != self._match:
+            self._match = match
+            self._search_filter = search_filter(*self.search, match) if match else None
+            self.reload()
+
+    def reload(self):
+        """Yüklü sayfaları atıp ilk sayfayı yeniden okur."""
+        self.beginResetModel()
+        self._ids = []
+        self._rows = []
+        self._exhausted = False
+        self.endResetModel()
+        self.fetchMore()
+
+STOCK_TABLE_QUERY = """
+    SELECT s.id, p.code, s.quantity, s.balance_after, s.movement_type, s.shelf, t.code, s.date, s.sync_status,
+           s.creator_id
+    FROM stock_movements s
+    JOIN parts p ON s.part_id = p.id
+    LEFT JOIN locations t ON t.id = s.to_location_id
+    WHERE 1=1 {keyset}
+    ORDER BY s.id DESC
+    LIMIT ?
+"""
+
+def _stock_row_cells(record):
+    movement_id, code, movement_qty, stock_after, movement_type, shelf, to_shelf, date, sync_status, creator_id = record
+    # Transferde "kaynak → hedef"; rafsız hareket varsayılan rafa yazılmıştır
+    shelf = f"{shelf or '-'} → {to_shelf}" if to_shelf else shelf or ""
+    return [str(code), str(movement_qty), str(stock_after), str(movement_type), shelf, str(date),
+            sync_status_label(sync_status, creator_id)]
+
+COUNT_TABLE_QUERY = """
+    SELECT s.id, p.code, s.quantity, s.counted_qty, s.shelf, s.balance_after, s.sync_status, s.creator_id
+    FROM stock_movements s
+    JOIN parts p ON s.part_id = p.id
+    WHERE s.movement_type='Sayım' {keyset}
+    ORDER BY s.id DESC
+    LIMIT ?
+"""
+
+def _count_row_cells(record):
+    mid, code, diff, counted, shelf, stock_after, sync_status, creator_id = record
+    # Raflı sayımda sayılan ve önceki miktar o rafındır; rafsız sayım parçanın toplamını sayar
+    counted = stock_after if counted is None else counted
+    return [str(code), str(counted - diff), str(counted), str(diff), str(shelf or ""),
+            sync_status_label(sync_status, creator_id)]
+
+WORK_ORDER_TABLE_QUERY = """
+    SELECT id, records, required_parts, status, date, sync_status, creator_id
+    FROM work_orders
+    WHERE 1=1 {keyset}
+    ORDER BY id DESC
+    LIMIT ?
+"""
+
+def _work_order_row_cells(record):
+    wid, records, parts, status, date, sync_status, creator_id = record
+    return [str(records), str(parts), str(status), str(date), sync_status_label(sync_status, creator_id)]
 
-def run_server(host="0.0.0.0", port=5000):
-    app.run(host=host, port=port)
 # --------------------
 # Ana Pencere
 # --------------------
 class MainWindow(QMainWindow):
+    # Outbox iş parçacıklarından gelen durum değişikliği (Qt thread'ine taşınır)
+    sync_state_changed = pyqtSignal()
+    # Toplu senkronizasyon ilerlemesi (gönderilen, toplam) ve sonuç mesajı
+    sync_progress = pyqtSignal(int, int)
+    sync_finished = pyqtSignal(str)
+    pull_finished = pyqtSignal(str)
+    import_finished = pyqtSignal(str)
+    export_finished = pyqtSignal(str)
+    # Commit edilen yazmalar (herhangi bir thread'den; ör. webhook, outbox, içe aktarma)
+    data_changed = pyqtSignal()
+
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Depo Yönetim Uygulaması")
@@ -303,6 +262,29 @@ class MainWindow(QMainWindow):
         self.init_is_emirleri_tab()
         self.init_senkron_tab()
 
+        # Değişiklik bildirimleri REFRESH_DEBOUNCE boyunca biriktirilir, sonra yalnızca
+        # etkilenen satırlar güncellenir
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setSingleShot(True)
+        self.refresh_timer.timeout.connect(self.apply_changes)
+        self.data_changed.connect(self.schedule_refresh)
+        self.sync_state_changed.connect(self.schedule_refresh)
+        DB.changes.on_change = self.data_changed.emit
+        OUTBOX.on_change = self.sync_state_changed.emit
+
+        # Boşta periyodik gönderim: değişen parça yoksa tek bir indeksli COUNT'tan ibarettir
+        if AUTO_SYNC_INTERVAL:
+            self.auto_sync_timer = QTimer(self)
+            self.auto_sync_timer.timeout.connect(self.auto_sync)
+            self.auto_sync_timer.start(AUTO_SYNC_INTERVAL * 1000)
+
+        # Uygulama günlerce açık kalabilir: ay sonu görüntüleri ve temizlik arka planda tekrarlanır
+        if MAINTENANCE_INTERVAL:
+            self.maintenance_timer = QTimer(self)
+            self.maintenance_timer.timeout.connect(
+                lambda: threading.Thread(target=maintenance_in_background, daemon=True).start())
+            self.maintenance_timer.start(MAINTENANCE_INTERVAL * 1000)
+
     # --------------------
     # Stok Hareketleri Sekmesi
     # --------------------
@@ -311,29 +293,58 @@ class MainWindow(QMainWindow):
         self.part_code_input.setPlaceholderText("Parça Kodu")
         self.quantity_input = QLineEdit()
         self.quantity_input.setPlaceholderText("Miktar")
+        self.stock_shelf_input = QLineEdit()
+        self.stock_shelf_input.setPlaceholderText("Raf (boşsa varsayılan raf)")
+        self.transfer_target_input = QLineEdit()
+        self.transfer_target_input.setPlaceholderText("Hedef Raf")
         entry_button = QPushButton("Giriş")
         exit_button = QPushButton("Çıkış")
+        transfer_button = QPushButton("Transfer")
 
         h_layout = QHBoxLayout()
         h_layout.addWidget(self.part_code_input)
         h_layout.addWidget(self.quantity_input)
+        h_layout.addWidget(self.stock_shelf_input)
         h_layout.addWidget(entry_button)
         h_layout.addWidget(exit_button)
+        h_layout.addWidget(self.transfer_target_input)
+        h_layout.addWidget(transfer_button)
         self.stok_tab.layout.addLayout(h_layout)
 
+        # Barkod modu: okuyucu kodu yazıp Enter gönderir; buton tıklaması gerekmez
+        self.scan_mode_checkbox = QCheckBox("Barkod modu")
+        self.scan_movement_combo = QComboBox()
+        self.scan_movement_combo.addItems(["Giriş", "Çıkış"])
+        self.scan_movement_combo.setEnabled(False)
+        scan_layout = QHBoxLayout()
+        scan_layout.addWidget(self.scan_mode_checkbox)
+        scan_layout.addWidget(self.scan_movement_combo)
+        scan_layout.addStretch()
+        self.stok_tab.layout.addLayout(scan_layout)
+
+        self.pending_scans = {}
+        self.scan_flush_timer = QTimer(self)
+        self.scan_flush_timer.setSingleShot(True)
+        self.scan_flush_timer.timeout.connect(self.flush_scans)
+        self.scan_mode_checkbox.toggled.connect(self.toggle_scan_mode)
+        self.part_code_input.returnPressed.connect(self.on_scan)
+
         self.stok_info_label = QLabel("")
         self.stok_tab.layout.addWidget(self.stok_info_label)
 
-        self.stock_table = QTableWidget()
-        self.stock_table.setColumnCount(6)
-        self.stock_table.setHorizontalHeaderLabels(["Parça Kodu", "Eklenen/Çıkarılan", "Stok", "Hareket", "Tarih", "Sil"])
-        self.stock_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.stock_model = SqlPagedTableModel(
+            ["Parça Kodu", "Eklenen/Çıkarılan", "Stok", "Hareket", "Raf", "Tarih", "Senkron"],
+            STOCK_TABLE_QUERY, _stock_row_cells, "s.id", self, ("parts", "s.part_id")
+        )
+        self.stock_table = self._create_table_view(self.stock_model, self.delete_movements)
+        self.stok_tab.layout.addWidget(self._create_search_box(self.stock_model, "Ara: parça kodu / açıklama"))
         self.stok_tab.layout.addWidget(self.stock_table)
 
         self.stok_tab.setLayout(self.stok_tab.layout)
 
         entry_button.clicked.connect(lambda: self.add_stock("Giriş"))
         exit_button.clicked.connect(lambda: self.add_stock("Çıkış"))
+        transfer_button.clicked.connect(self.transfer_stock)
 
         self.load_stock_table()
 
@@ -348,120 +359,196 @@ class MainWindow(QMainWindow):
             self.stok_info_label.setText("Parça kodu boş olamaz!")
             return
 
-        conn = sqlite3.connect("depo.db")
-        cursor = conn.cursor()
-        cursor.execute("SELECT id, quantity, creator_id FROM parts WHERE code = ?", (code,))
-        result = cursor.fetchone()
-        if result:
-            part_id, current_qty, part_creator_id = result
-            new_qty = current_qty + quantity if movement == "Giriş" else current_qty - quantity
-            cursor.execute("UPDATE parts SET quantity=? WHERE id=?", (new_qty, part_id))
-        else:
-            cursor.execute("INSERT INTO parts (code, description, quantity, shelf, creator_id) VALUES (?, ?, ?, ?, ?)",
-                        (code, "", quantity if movement=="Giriş" else 0, "", None))
-            part_id = cursor.lastrowid
-            new_qty = quantity if movement=="Giriş" else 0
-            part_creator_id = None
-
-        # Stock movement kaydı SQLite
-        cursor.execute("INSERT INTO stock_movements (part_id, movement_type, quantity) VALUES (?, ?, ?)",
-                    (part_id, movement, quantity))
-        local_movement_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
-
-        # Creator payload
-        dt_str = datetime.now().strftime("%d-%b-%Y %H:%M:%S")
-        movement_map = {"Giriş": "added", "Çıkış": "removed", "Sayım": "count"}
-        payload = {
-            "Part_Code": code, #3423
-            "Added_Removed": int(quantity), #25
-            "Stock": int(new_qty),
-            "Movement": movement_map[movement],
-            "Date_Time": dt_str
-        }
-
-        success, res = send_to_creator("Stock_Movements", payload, record_id=None if not part_creator_id else part_creator_id)
-        if success:
-            new_creator_id = extract_record_id_from_data(res)
-            # SQLite stock_movements kaydına creator_id ekle
-            conn = sqlite3.connect("depo.db")
-            c = conn.cursor()
-            c.execute("UPDATE stock_movements SET creator_id=? WHERE id=?", (new_creator_id, local_movement_id))
-            # Parça için de creator_id boşsa ekle
-            if not part_creator_id:
-                c.execute("UPDATE parts SET creator_id=? WHERE id=?", (new_creator_id, part_id))
-            conn.commit()
-            conn.close()
-
-        self.stok_info_label.setText("Stock Movements: " + ("Başarılı" if success else f"Hata: {res}"))
-
-        self.part_code_input.setText("")
+        # Ölçülen süre: yazma + tablo güncellemesi (kullanıcının beklediği süre)
+        with METRICS.timer("depo_gui_operation_seconds", op="add_stock"):
+            with DB.write() as cursor:
+                add_stock_movement(cursor, code, movement, quantity, self.stock_shelf_input.text().strip() or None)
+            OUTBOX.notify()
+
+            self.stok_info_label.setText("Stock Movements: Kaydedildi, Creator'a gönderim kuyrukta.")
+
+            self.part_code_input.setText("")
+            self.quantity_input.setText("")
+            self.apply_changes()
+
+    def transfer_stock(self):
+        # Raf boşsa varsayılan raftan taşınır; toplam stok değişmediği için Creator'a hareket gitmez
+        code = self.part_code_input.text().strip()
+        try:
+            quantity = int(self.quantity_input.text())
+        except ValueError:
+            self.stok_info_label.setText("Hatalı miktar girdiniz!")
+            return
+        try:
+            with DB.write() as cursor:
+                _, remaining = transfer_stock(cursor, code, quantity, self.stock_shelf_input.text(),
+                                              self.transfer_target_input.text())
+        except ValueError as e:
+            self.stok_info_label.setText(f"Transfer yapılamadı: {e}")
+            return
+        self.stok_info_label.setText(f"Transfer kaydedildi; kaynak rafta {remaining} adet kaldı.")
         self.quantity_input.setText("")
-        self.load_stock_table()
+        self.transfer_target_input.setText("")
+        self.apply_changes()
+
+    def toggle_scan_mode(self, enabled):
+        self.scan_movement_combo.setEnabled(enabled)
+        if enabled:
+            self.stok_info_label.setText(
+                f"Barkod modu açık: okutulan her parça {SCAN_DEFAULT_QUANTITY} adet (veya Miktar kutusundaki kadar) işlenir."
+            )
+            self.part_code_input.setFocus()
+        else:
+            self.flush_scans()
 
+    def on_scan(self):
+        if not self.scan_mode_checkbox.isChecked():
+            return
+        code = self.part_code_input.text().strip()
+        self.part_code_input.clear()
+        if not code:
+            return
+        quantity_text = self.quantity_input.text().strip()
+        try:
+            quantity = int(quantity_text) if quantity_text else SCAN_DEFAULT_QUANTITY
+        except ValueError:
+            self.stok_info_label.setText("Hatalı miktar girdiniz!")
+            return
+
+        # Okutma yalnızca bellekte toplanır; yazma grup penceresi dolunca tek seferde yapılır
+        movement = self.scan_movement_combo.currentText()
+        # Raf okutma anında alınır: pencere içinde raf değişirse hareketler ayrı rafa yazılır
+        key = (code, movement, self.stock_shelf_input.text().strip() or None)
+        self.pending_scans[key] = self.pending_scans.get(key, 0) + quantity
+        if not self.scan_flush_timer.isActive():
+            self.scan_flush_timer.start(int(SCAN_GROUP_WINDOW * 1000))
+        self.stok_info_label.setText(f"Okutuldu: {code} ({movement} {self.pending_scans[key]})")
+
+    def flush_scans(self):
+        self.scan_flush_timer.stop()
+        if not self.pending_scans:
+            return
+        scans, self.pending_scans = self.pending_scans, {}
+        with DB.write() as cursor:
+            for (code, movement, shelf), quantity in scans.items():
+                add_stock_movement(cursor, code, movement, quantity, shelf)
+        OUTBOX.notify()
+        self.apply_changes()
+        self.stok_info_label.setText(f"{len(scans)} hareket kaydedildi, Creator'a gönderim kuyrukta.")
+
+    def closeEvent(self, event):
+        # Pencere kapanırken grup penceresinde bekleyen okutmalar kaybolmasın
+        self.flush_scans()
+        super().closeEvent(event)
 
     def load_stock_table(self):
-        self.stock_table.setRowCount(0)
-        conn = sqlite3.connect("depo.db")
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT s.id, p.code, s.movement_type, s.quantity, s.date
-            FROM stock_movements s
-            JOIN parts p ON s.part_id = p.id
-            ORDER BY s.id ASC
-        """)
-        records = cursor.fetchall()
-        conn.close()
-
-        for row_idx, row_data in enumerate(records):
-            movement_id, code, movement_type, movement_qty, date = row_data
-            conn2 = sqlite3.connect("depo.db")
-            cursor2 = conn2.cursor()
-            cursor2.execute("SELECT quantity FROM parts WHERE code = ?", (code,))
-            stock_after = cursor2.fetchone()[0]
-            conn2.close()
-
-            self.stock_table.insertRow(row_idx)
-            self.stock_table.setItem(row_idx, 0, QTableWidgetItem(str(code)))
-            self.stock_table.setItem(row_idx, 1, QTableWidgetItem(str(movement_qty)))
-            self.stock_table.setItem(row_idx, 2, QTableWidgetItem(str(stock_after)))
-            self.stock_table.setItem(row_idx, 3, QTableWidgetItem(str(movement_type)))
-            self.stock_table.setItem(row_idx, 4, QTableWidgetItem(str(date)))
-
-            delete_btn = QPushButton("Sil")
-            delete_btn.clicked.connect(lambda _, mid=movement_id: self.delete_stock(mid))
-            self.stock_table.setCellWidget(row_idx, 5, delete_btn)
+        with METRICS.timer("depo_gui_operation_seconds", op="load_stock_table"):
+            self.stock_model.reload()
+
+    # Tablolar: satır başına buton yerine sağ tık menüsü / Delete tuşu ile silme.
+    # delete seçili satırların id listesiyle çağrılır.
+    def _create_table_view(self, model, delete):
+        view = QTableView()
+        view.setModel(model)
+        view.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        view.setSelectionBehavior(QAbstractItemView.SelectRows)
+        view.setContextMenuPolicy(Qt.CustomContextMenu)
+        view.customContextMenuRequested.connect(lambda pos: self._show_delete_menu(view, pos, delete))
+        QShortcut(QKeySequence.Delete, view, activated=lambda: delete(self._selected_ids(view)))
+        return view
+
+    # Yazarken arama: her tuşta değil, SEARCH_DEBOUNCE kadar durunca tek sorgu çalışır
+    def _create_search_box(self, model, placeholder):
+        box = QLineEdit()
+        box.setPlaceholderText(placeholder)
+        box.setClearButtonEnabled(True)
+        timer = QTimer(box)
+        timer.setSingleShot(True)
+        timer.timeout.connect(lambda: model.set_search(box.text()))
+        box.textChanged.connect(lambda: timer.start(int(SEARCH_DEBOUNCE * 1000)))
+        return box
+
+    def _show_delete_menu(self, view, pos, delete):
+        if not view.indexAt(pos).isValid():
+            return
+        menu = QMenu(view)
+        delete_action = menu.addAction("Sil")
+        if menu.exec_(view.viewport().mapToGlobal(pos)) == delete_action:
+            delete(self._selected_ids(view))
+
+    @staticmethod
+    def _selected_ids(view):
+        model = view.model()
+        return [model.row_id(index.row()) for index in view.selectionModel().selectedRows()]
+
     # --------------------
     # Sayım Sekmesi
     # --------------------
     def init_sayim_tab(self):
         self.shelf_input = QLineEdit()
-        self.shelf_input.setPlaceholderText("Raf/Lokasyon")
+        self.shelf_input.setPlaceholderText("Raf/Lokasyon (boşsa parçanın toplamı sayılır)")
         self.count_code_input = QLineEdit()
         self.count_code_input.setPlaceholderText("Parça Kodu")
         self.count_quantity_input = QLineEdit()
         self.count_quantity_input.setPlaceholderText("Sayım Miktarı")
 
         count_button = QPushButton("Sayımı Kaydet")
+        self.import_btn = QPushButton("Dosyadan Yükle (CSV/XLSX)")
 
         h_layout = QHBoxLayout()
         h_layout.addWidget(self.shelf_input)
         h_layout.addWidget(self.count_code_input)
         h_layout.addWidget(self.count_quantity_input)
         h_layout.addWidget(count_button)
+        h_layout.addWidget(self.import_btn)
         self.sayim_tab.layout.addLayout(h_layout)
 
-        self.count_table = QTableWidget()
-        self.count_table.setColumnCount(6)
-        self.count_table.setHorizontalHeaderLabels(["Parça Kodu", "Mevcut Stok", "Sayım Miktarı", "Fark", "Raf/Lokasyon", "Sil"])
+        self.count_info_label = QLabel("")
+        self.sayim_tab.layout.addWidget(self.count_info_label)
+
+        zones_btn = QPushButton("Bölge Toplamları")
+        self.zones_label = QLabel("")
+        self.zones_label.setWordWrap(True)
+        self.sayim_tab.layout.addWidget(zones_btn)
+        self.sayim_tab.layout.addWidget(self.zones_label)
+
+        self.count_model = SqlPagedTableModel(
+            ["Parça Kodu", "Mevcut Stok", "Sayım Miktarı", "Fark", "Raf/Lokasyon", "Senkron"],
+            COUNT_TABLE_QUERY, _count_row_cells, "s.id", self, ("parts", "s.part_id")
+        )
+        self.count_table = self._create_table_view(self.count_model, self.delete_movements)
+        self.sayim_tab.layout.addWidget(self._create_search_box(self.count_model, "Ara: parça kodu / açıklama"))
         self.sayim_tab.layout.addWidget(self.count_table)
 
         self.sayim_tab.setLayout(self.sayim_tab.layout)
 
         count_button.clicked.connect(self.add_count)
+        zones_btn.clicked.connect(self.show_zone_totals)
+        self.import_btn.clicked.connect(self.import_file)
+        self.import_finished.connect(self.on_import_finished)
         self.load_count_table()
 
+    def import_file(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Sayım / Hareket Dosyası", "", "Tablolar (*.csv *.xlsx)")
+        if not path:
+            return
+        self.import_btn.setEnabled(False)
+        self.count_info_label.setText("Dosya yükleniyor...")
+
+        def worker():
+            try:
+                self.import_finished.emit(import_summary(import_movements(path)))
+            except Exception as e:
+                self.import_finished.emit(f"Dosya yüklenemedi: {e}")
+            finally:
+                DB.close_thread_connection()
+
+        threading.Thread(target=worker, daemon=True).start()
+
+    def on_import_finished(self, message):
+        self.import_btn.setEnabled(True)
+        self.count_info_label.setText(message)
+
     def add_count(self):
         code = self.count_code_input.text().strip()
         shelf = self.shelf_input.text().strip()
@@ -474,112 +561,28 @@ class MainWindow(QMainWindow):
             self.stok_info_label.setText("Parça kodu boş olamaz!")
             return
 
-        conn = sqlite3.connect("depo.db")
-        cursor = conn.cursor()
-        cursor.execute("SELECT id, quantity, creator_id FROM parts WHERE code = ?", (code,))
-        result = cursor.fetchone()
-        if result:
-            part_id, current_qty, part_creator_id = result
-        else:
-            cursor.execute(
-                "INSERT INTO parts (code, description, quantity, shelf, creator_id) VALUES (?, ?, ?, ?, ?)",
-                (code, "", 0, shelf, None)
-            )
-            part_id = cursor.lastrowid
-            current_qty = 0
-            part_creator_id = None
-            conn.commit()
-
-        difference = counted_qty - current_qty
-        new_qty = counted_qty
-        cursor.execute("UPDATE parts SET quantity=?, shelf=? WHERE id=?", (new_qty, shelf, part_id))
-        cursor.execute(
-            "INSERT INTO stock_movements (part_id, movement_type, quantity, shelf) VALUES (?, ?, ?, ?)",
-            (part_id, "Sayım", difference, shelf)
-        )
-        local_movement_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
-
-        dt_str = datetime.now().strftime("%d-%b-%Y %H:%M:%S")
-
-        # --- Stock Movements raporuna gönderim ---
-        movement_payload = {
-            "Part_Code": code,
-            "Added_Removed": int(difference),
-            "Stock": int(new_qty),
-            "Movement": "count",
-            "Date_Time": dt_str
-        }
-
-        success1, res1 = send_to_creator("Stock_Movements", movement_payload, record_id=part_creator_id)
-        if success1:
-            new_creator_id = extract_record_id_from_data(res1)
-            conn2 = sqlite3.connect("depo.db")
-            c2 = conn2.cursor()
-            c2.execute("UPDATE stock_movements SET creator_id=? WHERE id=?", (new_creator_id, local_movement_id))
-            if not part_creator_id:
-                c2.execute("UPDATE parts SET creator_id=? WHERE id=?", (new_creator_id, part_id))
-            conn2.commit()
-            conn2.close()
-
-        # --- Stocks raporuna parça bazlı güncelleme/ekleme ---
-        stock_payload = {
-            "Part_Code": code,
-            "Available_Quantity": int(new_qty),
-            "Shelf_Location": shelf or ""
-        }
-        # Eğer parça daha önce Stocks raporuna eklenmişse güncelle, yoksa ekle
-        success2, res2 = send_to_creator("Stocks", stock_payload, record_id=part_creator_id)
-        if success2 and not part_creator_id:
-            new_stock_id = extract_record_id_from_data(res2)
-            if new_stock_id:
-                conn3 = sqlite3.connect("depo.db")
-                c3 = conn3.cursor()
-                c3.execute("UPDATE parts SET creator_id=? WHERE id=?", (new_stock_id, part_id))
-                conn3.commit()
-                conn3.close()
-
-        self.stok_info_label.setText(
-            "Stock Movements: " + ("Başarılı" if success1 else f"Hata: {res1}") +
-            " | Stocks: " + ("Başarılı" if success2 else f"Hata: {res2}")
-        )
-
-        self.count_code_input.setText("")
-        self.count_quantity_input.setText("")
-        self.shelf_input.setText("")
-        self.load_count_table()
-        self.load_stock_table()
-
+        with METRICS.timer("depo_gui_operation_seconds", op="add_count"):
+            with DB.write() as cursor:
+                add_count_movement(cursor, code, counted_qty, shelf or None)
+            OUTBOX.notify()
 
+            self.stok_info_label.setText("Sayım kaydedildi, Creator'a gönderim kuyrukta.")
 
+            self.count_code_input.setText("")
+            self.count_quantity_input.setText("")
+            self.shelf_input.setText("")
+            self.apply_changes()
 
+    def show_zone_totals(self):
+        self.zones_label.setText("\n".join(
+            f"{'Rafsız' if zone is None else 'Bölge ' + zone}: {qty} adet, {parts} parça"
+            + (f", {locations} raf" if locations else "")
+            for zone, locations, parts, qty in zone_totals()
+        ) or "Stok yok.")
 
     def load_count_table(self):
-        self.count_table.setRowCount(0)
-        conn = sqlite3.connect("depo.db")
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT s.id, p.code, s.quantity, s.movement_type, s.shelf, p.quantity
-            FROM stock_movements s
-            JOIN parts p ON s.part_id = p.id
-            WHERE s.movement_type='Sayım'
-            ORDER BY s.id ASC
-        """)
-        records = cursor.fetchall()
-        conn.close()
-
-        for row_idx, (mid, code, diff, mtype, shelf, stock_after) in enumerate(records):
-            self.count_table.insertRow(row_idx)
-            self.count_table.setItem(row_idx, 0, QTableWidgetItem(code))
-            self.count_table.setItem(row_idx, 1, QTableWidgetItem(str(stock_after - diff)))
-            self.count_table.setItem(row_idx, 2, QTableWidgetItem(str(stock_after)))
-            self.count_table.setItem(row_idx, 3, QTableWidgetItem(str(diff)))
-            self.count_table.setItem(row_idx, 4, QTableWidgetItem(str(shelf or "")))
-
-            delete_btn = QPushButton("Sil")
-            delete_btn.clicked.connect(lambda _, mid=mid: self.delete_stock(mid))
-            self.count_table.setCellWidget(row_idx, 5, delete_btn)
+        with METRICS.timer("depo_gui_operation_seconds", op="load_count_table"):
+            self.count_model.reload()
 
     # --------------------
     # İş Emirleri Sekmesi
@@ -593,21 +596,31 @@ class MainWindow(QMainWindow):
         self.status_input.setPlaceholderText("Durum Bilgisi")
 
         save_btn = QPushButton("İş Emrini Kaydet")
+        kitting_btn = QPushButton("Karşılanabilirlik Kontrolü")
+        self.kitting_label = QLabel("")
+        self.kitting_label.setWordWrap(True)
 
         self.is_emirleri_tab.layout.addWidget(self.records_input)
         self.is_emirleri_tab.layout.addWidget(self.required_parts_input)
         self.is_emirleri_tab.layout.addWidget(self.status_input)
         self.is_emirleri_tab.layout.addWidget(save_btn)
+        self.is_emirleri_tab.layout.addWidget(kitting_btn)
+        self.is_emirleri_tab.layout.addWidget(self.kitting_label)
 
-        self.work_orders_table = QTableWidget()
-        self.work_orders_table.setColumnCount(5)
-        self.work_orders_table.setHorizontalHeaderLabels(["Bakım/Onarım Kaydı", "Gerekli Parçalar", "Durum", "Tarih", "Sil"])
-        self.work_orders_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.work_order_model = SqlPagedTableModel(
+            ["Bakım/Onarım Kaydı", "Gerekli Parçalar", "Durum", "Tarih", "Senkron"],
+            WORK_ORDER_TABLE_QUERY, _work_order_row_cells, "id", self, ("work_orders", "id")
+        )
+        self.work_orders_table = self._create_table_view(self.work_order_model, self.delete_work_orders)
+        self.is_emirleri_tab.layout.addWidget(
+            self._create_search_box(self.work_order_model, "Ara: kayıt / gerekli parçalar / durum")
+        )
         self.is_emirleri_tab.layout.addWidget(self.work_orders_table)
 
         self.is_emirleri_tab.setLayout(self.is_emirleri_tab.layout)
 
         save_btn.clicked.connect(self.save_work_order)
+        kitting_btn.clicked.connect(self.check_kitting)
         self.load_work_orders()
 
     def save_work_order(self):
@@ -619,76 +632,39 @@ class MainWindow(QMainWindow):
             self.info_label.setText("İş emri kaydı boş olamaz.")
             return
 
-        conn = sqlite3.connect("depo.db")
-        cursor = conn.cursor()
-        cursor.execute("INSERT INTO work_orders (records, required_parts, status) VALUES (?, ?, ?)",
-                       (records, parts, status))
-        conn.commit()
-        conn.close()
-
-        success, res = send_to_creator("Work_Order", {
-            "Maintenance_Repair_Records": records,
-            "Required_Parts": parts,
-            "Status_Information": status
-        })
-
-        if success:
-            new_creator_id = extract_record_id_from_data(res)
-            if new_creator_id:
-                conn2 = sqlite3.connect("depo.db")
-                c2 = conn2.cursor()
-                c2.execute("SELECT id FROM work_orders ORDER BY id DESC LIMIT 1")
-                last = c2.fetchone()
-                if last:
-                    local_id = last[0]
-                    c2.execute("UPDATE work_orders SET creator_id=? WHERE id=?", (new_creator_id, local_id))
-                    conn2.commit()
-                conn2.close()
-
-        self.info_label.setText("Work Order: " + ("Başarılı" if success else f"Hata: {res}"))
+        add_work_order(records, parts, status)
+
+        self.info_label.setText("Work Order: Kaydedildi, Creator'a gönderim kuyrukta.")
+        unparsed = parse_required_parts(parts)[1]
+        self.kitting_label.setText(
+            f"Tanınmayan parça yazımı (stok ayrılmadı): {', '.join(unparsed)}" if unparsed else ""
+        )
         self.records_input.clear()
         self.required_parts_input.clear()
         self.status_input.clear()
-        self.load_work_orders()
+        self.apply_changes()
 
     def load_work_orders(self):
-        conn = sqlite3.connect("depo.db")
-        cursor = conn.cursor()
-        cursor.execute("SELECT id, records, required_parts, status, date FROM work_orders ORDER BY id DESC")
-        records = cursor.fetchall()
-        conn.close()
-
-        self.work_orders_table.setRowCount(len(records))
-        for row_idx, (wid, recs, parts, status, date) in enumerate(records):
-            self.work_orders_table.setItem(row_idx, 0, QTableWidgetItem(str(recs)))
-            self.work_orders_table.setItem(row_idx, 1, QTableWidgetItem(str(parts)))
-            self.work_orders_table.setItem(row_idx, 2, QTableWidgetItem(str(status)))
-            self.work_orders_table.setItem(row_idx, 3, QTableWidgetItem(str(date)))
-
-            del_btn = QPushButton("Sil")
-            del_btn.clicked.connect(lambda _, id=wid: self.delete_work_order(id))
-            self.work_orders_table.setCellWidget(row_idx, 4, del_btn)
-
-    def delete_work_order(self, work_order_id):
-        conn = sqlite3.connect("depo.db")
-        cursor = conn.cursor()
-        cursor.execute("SELECT creator_id FROM work_orders WHERE id=?", (work_order_id,))
-        creator_id = cursor.fetchone()
-        if creator_id:
-            creator_id = creator_id[0]
-        cursor.execute("DELETE FROM work_orders WHERE id=?", (work_order_id,))
-        conn.commit()
-        conn.close()
-
-        # Creator’dan sil
-        if creator_id:
-            delete_from_creator("All_Work_Orders", creator_id)  # <- Burayı All_Work_Orders yaptık
-
-        self.load_work_orders()
-        self.info_label.setText(f"İş Emri (id={work_order_id}) silindi.")
-
-
-
+        with METRICS.timer("depo_gui_operation_seconds", op="load_work_orders"):
+            self.work_order_model.reload()
+
+    def check_kitting(self):
+        # Tüm açık iş emirleri tek sorguda; eksikli olanların ilk birkaçı gösterilir
+        result = kittable_work_orders()
+        short = [(work_order_id, shorts) for work_order_id, shorts in sorted(result.items()) if shorts]
+        lines = [kitting_summary(result)]
+        lines += [f"İş emri {work_order_id}: eksik " + ", ".join(f"{code} x{qty}" for code, qty in shorts.items())
+                  for work_order_id, shorts in short[:5]]
+        if len(short) > 5:
+            lines.append(f"... ve {len(short) - 5} iş emri daha")
+        self.kitting_label.setText("\n".join(lines))
+
+    def delete_work_orders(self, work_order_ids):
+        for work_order_id in work_order_ids:
+            remove_work_order(work_order_id)
+        self.apply_changes()
+        if work_order_ids:
+            self.info_label.setText(f"{len(work_order_ids)} iş emri silindi.")
 
     # --------------------
     # Senkronizasyon Sekmesi
@@ -698,93 +674,202 @@ class MainWindow(QMainWindow):
 # --------------------
     def init_senkron_tab(self):
         # Butonlar
-        sync_btn = QPushButton("Tüm Verileri Creator’a Gönder")
+        self.sync_btn = QPushButton("Değişen Parçaları Creator’a Gönder")
+        self.sync_progress_bar = QProgressBar()
+        self.sync_progress_bar.setVisible(False)
+        self.pull_btn = QPushButton("Creator’dan Değişiklikleri Al")
         refresh_btn = QPushButton("Tüm Tabloları Yenile")
+        retry_btn = QPushButton("Hatalı Gönderimleri Yeniden Dene")
+        self.outbox_label = QLabel("")
+        self.http_stats_label = QLabel("")
+
+        # Dışa aktarma: tablo + isteğe bağlı tarih aralığı ve parça kodu
+        self.export_table_combo = QComboBox()
+        self.export_table_combo.addItems(list(EXPORT_TABLES))
+        self.export_since_input = QLineEdit()
+        self.export_since_input.setPlaceholderText("Başlangıç (YYYY-MM-DD)")
+        self.export_until_input = QLineEdit()
+        self.export_until_input.setPlaceholderText("Bitiş (YYYY-MM-DD)")
+        self.export_part_input = QLineEdit()
+        self.export_part_input.setPlaceholderText("Parça kodları (virgülle)")
+        self.export_btn = QPushButton("Dışa Aktar")
+        export_layout = QHBoxLayout()
+        export_layout.addWidget(self.export_table_combo)
+        export_layout.addWidget(self.export_since_input)
+        export_layout.addWidget(self.export_until_input)
+        export_layout.addWidget(self.export_part_input)
+        export_layout.addWidget(self.export_btn)
 
         # Sekme layout'una ekle
-        self.senkron_tab.layout.addWidget(sync_btn)
+        self.senkron_tab.layout.addWidget(self.sync_btn)
+        self.senkron_tab.layout.addWidget(self.sync_progress_bar)
+        self.senkron_tab.layout.addWidget(self.pull_btn)
         self.senkron_tab.layout.addWidget(refresh_btn)
+        self.senkron_tab.layout.addWidget(retry_btn)
+        self.senkron_tab.layout.addLayout(export_layout)
+        self.senkron_tab.layout.addWidget(self.outbox_label)
+        self.senkron_tab.layout.addWidget(self.http_stats_label)
         self.senkron_tab.setLayout(self.senkron_tab.layout)
 
         # Buton click olayları
-        sync_btn.clicked.connect(self.sync_data)
+        self.sync_btn.clicked.connect(self.sync_data)
+        self.sync_progress.connect(self.on_sync_progress)
+        self.sync_finished.connect(self.on_sync_finished)
+        self.pull_btn.clicked.connect(self.pull_data)
+        self.pull_finished.connect(self.on_pull_finished)
         refresh_btn.clicked.connect(self.load_all_tables)
+        retry_btn.clicked.connect(self.retry_failed_sync)
+        self.export_btn.clicked.connect(self.export_data)
+        self.export_finished.connect(self.on_export_finished)
+        self.update_outbox_label()
+
+    def update_outbox_label(self):
+        counts = outbox_counts()
+        self.outbox_label.setText(
+            f"Gönderim kuyruğu: {counts.get('pending', 0) + counts.get('in_progress', 0)} bekliyor, "
+            f"{counts.get('failed', 0)} hatalı | Gönderilmemiş parça: {dirty_part_count()}"
+        )
+        self.http_stats_label.setText("\n".join(METRICS.latency_summary("depo_creator_request_seconds",
+                                                                          "method", "endpoint")))
+
+    def retry_failed_sync(self):
+        count = retry_failed_outbox()
+        self.info_label.setText(f"{count} hatalı gönderim yeniden kuyruğa alındı.")
+        self.apply_changes()
+
+    def schedule_refresh(self):
+        # İlk bildirim zamanlayıcıyı başlatır; süre dolana kadar gelenler aynı yenilemeye katılır
+        if not self.refresh_timer.isActive():
+            self.refresh_timer.start(int(REFRESH_DEBOUNCE * 1000))
+
+    def apply_changes(self):
+        """Birikmiş değişiklikleri yalnızca etkilenen satırlara uygular."""
+        self.refresh_timer.stop()
+        changes = DB.changes.drain()
+        if "stock_movements" in changes:
+            self.stock_model.apply_changes(changes["stock_movements"])
+            self.count_model.apply_changes(changes["stock_movements"])
+        if "work_orders" in changes:
+            self.work_order_model.apply_changes(changes["work_orders"])
+        self.update_outbox_label()
 
     # Tüm tabloları yükleme fonksiyonu
     def load_all_tables(self):
+        DB.changes.drain()          # tam yenileme bekleyen değişiklikleri de kapsar
         self.load_stock_table()     # Stok hareketleri tablosunu yükle
         self.load_count_table()     # Sayım tablosunu yükle
         self.load_work_orders()     # İş emirleri tablosunu yükle
         self.info_label.setText("Tüm tablolar yenilendi.")  # Kullanıcıya bilgi
 
+    def auto_sync(self):
+        if self.sync_btn.isEnabled() and dirty_part_count():
+            self.sync_data()
+
     def sync_data(self):
-        conn = sqlite3.connect("depo.db")
-        cursor = conn.cursor()
-        cursor.execute("SELECT id, code, quantity, shelf, creator_id FROM parts")
-        parts = cursor.fetchall()
-        conn.close()
-
-        for part_id, code, qty, shelf, creator_id in parts:
-            data_to_send = {
-                "Part_Code": code,
-                "Available_Quantity": int(qty),
-                "Shelf_Location": shelf or ""
-            }
-
-            success, res = send_to_creator("Stock", data_to_send, record_id=creator_id if creator_id else None)
-
-            if success and not creator_id:
-                new_id = extract_record_id_from_data(res)
-                if new_id:
-                    conn2 = sqlite3.connect("depo.db")
-                    c2 = conn2.cursor()
-                    c2.execute("UPDATE parts SET creator_id=? WHERE id=?", (new_id, part_id))
-                    conn2.commit()
-                    conn2.close()
-
-        self.info_label.setText("Tüm parçalar Creator’a gönderildi.")
+        # Gönderim arka planda; ilerleme sinyallerle Qt thread'ine taşınır
+        if not dirty_part_count():
+            self.info_label.setText("Creator’a gönderilecek değişen parça yok.")
+            return
+        self.sync_btn.setEnabled(False)
+        self.sync_progress_bar.setValue(0)
+        self.sync_progress_bar.setVisible(True)
+        self.info_label.setText("Parçalar Creator’a gönderiliyor...")
+
+        def worker():
+            try:
+                sent, failed = push_parts_to_creator(progress=self.sync_progress.emit)
+                if failed:
+                    self.sync_finished.emit(f"{sent} parça gönderildi, {failed} parça gönderilemedi.")
+                else:
+                    self.sync_finished.emit(f"Değişen {sent} parça Creator’a gönderildi.")
+            except Exception as e:
+                self.sync_finished.emit(f"Senkronizasyon hatası: {e}")
+            finally:
+                DB.close_thread_connection()
+
+        threading.Thread(target=worker, daemon=True).start()
+
+    def export_data(self):
+        table = self.export_table_combo.currentText()
+        try:
+            since = self.export_since_input.text().strip() or None
+            until = self.export_until_input.text().strip() or None
+            since = since and ledger_time(since, end_of_day=False)
+            until = until and ledger_time(until)
+        except ValueError:
+            self.info_label.setText("Tarih YYYY-MM-DD biçiminde olmalı.")
+            return
+        part_codes = [code.strip() for code in self.export_part_input.text().split(",") if code.strip()] or None
+        path, _ = QFileDialog.getSaveFileName(self, "Dışa Aktar", f"{table}.csv",
+                                              "CSV (*.csv);;JSON Lines (*.jsonl);;Parquet (*.parquet)")
+        if not path:
+            return
+        self.export_btn.setEnabled(False)
+        self.info_label.setText(f"{table} dışa aktarılıyor...")
+
+        def worker():
+            try:
+                total = export_table(table, path, since=since, until=until, part_codes=part_codes)
+                self.export_finished.emit(f"{total} satır {path} dosyasına yazıldı.")
+            except Exception as e:
+                self.export_finished.emit(f"Dışa aktarma hatası: {e}")
+            finally:
+                DB.close_thread_connection()
+
+        threading.Thread(target=worker, daemon=True).start()
+
+    def on_export_finished(self, message):
+        self.export_btn.setEnabled(True)
+        self.info_label.setText(message)
+
+    def pull_data(self):
+        self.pull_btn.setEnabled(False)
+        self.info_label.setText("Creator’dan değişiklikler alınıyor...")
+
+        def worker():
+            try:
+                results = pull_from_creator()
+                summary = ", ".join(f"{name}: {count}" for name, count in results.items())
+                self.pull_finished.emit(f"Creator’dan alındı ({summary}).")
+            except Exception as e:
+                self.pull_finished.emit(f"Creator’dan alma hatası: {e}")
+            finally:
+                DB.close_thread_connection()
+
+        threading.Thread(target=worker, daemon=True).start()
+
+    def on_pull_finished(self, message):
+        self.pull_btn.setEnabled(True)
+        self.info_label.setText(message)
+
+    def on_sync_progress(self, done, total):
+        self.sync_progress_bar.setMaximum(max(total, 1))
+        self.sync_progress_bar.setValue(done)
+        self.info_label.setText(f"Creator’a gönderiliyor: {done}/{total}")
+
+    def on_sync_finished(self, message):
+        self.update_outbox_label()
+        self.sync_btn.setEnabled(True)
+        self.sync_progress_bar.setVisible(False)
+        self.info_label.setText(message)
 
     # --------------------
     # Silme Fonksiyonu (stok hareketleri/sayım)
     # --------------------
-    def delete_stock(self, movement_id):
-        conn = sqlite3.connect("depo.db")
-        cursor = conn.cursor()
-        cursor.execute("SELECT part_id, movement_type, quantity, creator_id FROM stock_movements WHERE id=?", (movement_id,))
-        result = cursor.fetchone()
-        if not result:
-            conn.close()
-            return
-
-        part_id, movement_type, quantity, movement_creator_id = result
-        cursor.execute("SELECT quantity FROM parts WHERE id=?", (part_id,))
-        current_qty = cursor.fetchone()[0]
-
-        if movement_type in ("Giriş", "Sayım"):
-            new_qty = current_qty - quantity
-        elif movement_type == "Çıkış":
-            new_qty = current_qty + quantity
-        else:
-            new_qty = current_qty
-
-        cursor.execute("UPDATE parts SET quantity=? WHERE id=?", (new_qty, part_id))
-        cursor.execute("DELETE FROM stock_movements WHERE id=?", (movement_id,))
-        conn.commit()
-        conn.close()
-
-        # --- Creator’a otomatik silme ---
-        if movement_creator_id:
-            delete_from_creator("Stock_Movements", movement_creator_id)
-
-        self.load_stock_table()
-        self.load_count_table()
+    def delete_movements(self, movement_ids):
+        for movement_id in movement_ids:
+            remove_movement(movement_id)
+        self.apply_changes()
 
 
 # --------------------
 # Uygulama Başlat
 # --------------------
 if __name__ == "__main__":
+    if sys.argv[1:2] and sys.argv[1] in CLI_COMMANDS:
+        sys.exit(run_cli(sys.argv[1:]))
     init_db()
+    start_background_services()
     # Flask server arka planda
     server_thread = threading.Thread(target=run_server, kwargs={"host":"0.0.0.0","port":5000}, daemon=True)
     server_thread.start()
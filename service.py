@@ -0,0 +1,3171 @@
+"""Depo yönetiminin arayüzden bağımsız katmanı.
+
+Veritabanı, stok defteri, Creator senkronizasyonu, webhook sunucusu ve komut
+satırı burada; PyQt5 içe aktarılmaz. Masaüstü arayüzü main.py, sunucu modu
+headless.py üzerinden bunu kullanır.
+"""
+import sqlite3
+from contextlib import contextmanager, nullcontext
+import requests
+from requests.adapters import HTTPAdapter
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+import json
+import csv
+import math
+import os
+import re
+import random
+import hashlib
+import hmac
+from time import time, perf_counter
+import threading
+import queue
+import atexit
+import argparse
+import logging
+from itertools import groupby
+from operator import itemgetter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from flask import Flask, request, jsonify
+
+# --------------------
+# Zoho Creator API Yardımcı
+# --------------------
+CLIENT_ID = "YOUR_CLIENT_ID"
+CLIENT_SECRET = "YOUR_CLIENT_SECRET"
+REFRESH_TOKEN = "YOUR_REFRESH_TOKEN"
+API_DOMAIN = "https://www.zohoapis.eu"
+OWNER_NAME = "YOUR_OWNER_NAME"
+APP_LINK_NAME = "YOUR_APP_LINK_NAME"
+ACCOUNTS_DOMAIN = "https://accounts.zoho.eu"
+TOKEN_FILE = "token.json"
+
+# --------------------
+# Metrikler
+# --------------------
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)  # saniye
+DB_LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)  # saniye; yerel SQLite işlemleri
+SLOW_OP_THRESHOLD = float(os.environ.get("DEPO_SLOW_OP_MS", 500)) / 1000  # saniye; bundan uzun süren işlemler günlüğe yazılır
+SLOW_OP_LOG = logging.getLogger("depo.slow_ops")
+
+class LatencyHistogram:
+    """Bir endpoint için istek sürelerinin kümülatif olmayan histogramı."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # son kova: en büyük sınırdan uzun
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, seconds):
+        for i, bound in enumerate(self.buckets):
+            if seconds <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.count += 1
+        self.total += seconds
+
+    def quantile(self, q):
+        """Kova sınırlarına göre yaklaşık yüzdelik (üst sınır) döner."""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= target:
+                return self.buckets[i] if i < len(self.buckets) else float("inf")
+        return float("inf")
+
+def _prometheus_labels(labels, **extra):
+    labels = {**labels, **extra}
+    if not labels:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+               for value in labels.values())
+    return "{" + ",".join(f'{key}="{value}"' for key, value in zip(labels, escaped)) + "}"
+
+class Metrics:
+    """Süreç içi sayaç, gösterge ve süre histogramları; /metrics'te Prometheus metin biçiminde yayımlanır.
+
+    Seriler (ad, etiketler) ile tutulur. SLOW_OP_THRESHOLD'dan uzun süren her
+    ölçüm SLOW_OP_LOG'a tek satır JSON olarak da yazılır.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters = {}
+        self.histograms = {}
+        self.gauges = {}    # ad -> (değer döndüren fonksiyon, etiket adı); her okumada çağrılır
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name, seconds, buckets=LATENCY_BUCKETS, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            hist = self.histograms.get(key)
+            if hist is None:
+                hist = self.histograms[key] = LatencyHistogram(buckets)
+            hist.observe(seconds)
+        if seconds >= SLOW_OP_THRESHOLD:
+            SLOW_OP_LOG.warning(json.dumps({"at": datetime.now().isoformat(timespec="milliseconds"), "metric": name,
+                                            **labels, "ms": round(seconds * 1000, 1)}, ensure_ascii=False))
+
+    @contextmanager
+    def timer(self, name, buckets=DB_LATENCY_BUCKETS, **labels):
+        """with bloğunun süresini name histogramına ekler (hata olsa da)."""
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, perf_counter() - start, buckets, **labels)
+
+    def latency_summary(self, name, *group_by):
+        """name histogramının group_by etiketlerine göre birleştirilmiş (adet, ortalama, ~p95) satırları."""
+        groups = {}
+        with self._lock:
+            for (series, labels), hist in self.histograms.items():
+                if series != name:
+                    continue
+                labels = dict(labels)
+                key = " ".join(str(labels.get(label, "")) for label in group_by)
+                merged = groups.get(key)
+                if merged is None:
+                    merged = groups[key] = LatencyHistogram(hist.buckets)
+                merged.counts = [a + b for a, b in zip(merged.counts, hist.counts)]
+                merged.count += hist.count
+                merged.total += hist.total
+        lines = []
+        for key, hist in sorted(groups.items()):
+            avg = hist.total / hist.count if hist.count else 0
+            lines.append(f"{key}: {hist.count} istek, ort {avg * 1000:.0f} ms, p95 ≤ {hist.quantile(0.95) * 1000:.0f} ms")
+        return lines
+
+    def gauge(self, name, read, label=None):
+        """read() tek sayı döner; label verilirse {etiket değeri: sayı} sözlüğü döner."""
+        self.gauges[name] = (read, label)
+
+    def render(self):
+        """Prometheus metin biçimi (text/plain; version=0.0.4)."""
+        with self._lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted((key, hist.buckets, list(hist.counts), hist.count, hist.total)
+                                for key, hist in self.histograms.items())
+        lines, typed = [], set()
+
+        def declare(name, kind):
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} {kind}")
+
+        for (name, labels), value in counters:
+            declare(name, "counter")
+            lines.append(f"{name}{_prometheus_labels(dict(labels))} {value}")
+        for (name, labels), buckets, counts, count, total in histograms:
+            declare(name, "histogram")
+            labels, cumulative = dict(labels), 0
+            for bound, bucket_count in zip((*buckets, "+Inf"), counts):
+                cumulative += bucket_count
+                lines.append(f"{name}_bucket{_prometheus_labels(labels, le=bound)} {cumulative}")
+            lines.append(f"{name}_sum{_prometheus_labels(labels)} {total}")
+            lines.append(f"{name}_count{_prometheus_labels(labels)} {count}")
+        for name, (read, label) in sorted(self.gauges.items()):
+            try:
+                values = read() if label else {None: read()}
+            except Exception as e:
+                print(f"⚠️ {name} metriği okunamadı:", e)
+                continue
+            declare(name, "gauge")
+            for label_value, value in values.items():
+                lines.append(f"{name}{_prometheus_labels({label: label_value} if label else {})} {value}")
+        return "\n".join(lines) + "\n"
+
+METRICS = Metrics()
+
+# --------------------
+# Ortak HTTP İstemcisi
+# --------------------
+HTTP_POOL_CONNECTIONS = 4     # bağlantı havuzu tutulan host sayısı
+HTTP_POOL_MAXSIZE = 10        # host başına en fazla açık bağlantı
+HTTP_CONNECT_TIMEOUT = 5      # saniye
+HTTP_READ_TIMEOUT = 20        # saniye
+class ZohoHttpClient:
+    """Tüm Zoho çağrıları için bağlantı havuzlu, keep-alive ortak oturum."""
+
+    def __init__(self, pool_connections=HTTP_POOL_CONNECTIONS, pool_maxsize=HTTP_POOL_MAXSIZE,
+                 connect_timeout=HTTP_CONNECT_TIMEOUT, read_timeout=HTTP_READ_TIMEOUT):
+        self.session = requests.Session()
+        # pool_block: host başına sınır aşılınca yeni bağlantı açmak yerine bekle
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize, pool_block=True)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+
+    def request(self, method, url, endpoint, read_timeout=None, **kwargs):
+        """endpoint: metrik etiketi (ör. "form/Stock_Movements"), kayıt ID'si içermemeli.
+
+        Süreler çağıranda METRICS'e yazılır (Creator istekleri: depo_creator_request_seconds).
+        """
+        timeout = (self.connect_timeout, read_timeout or self.read_timeout)
+        return self.session.request(method, url, timeout=timeout, **kwargs)
+
+    def get(self, url, endpoint, **kwargs):
+        return self.request("GET", url, endpoint, **kwargs)
+
+    def post(self, url, endpoint, **kwargs):
+        return self.request("POST", url, endpoint, **kwargs)
+
+    def put(self, url, endpoint, **kwargs):
+        return self.request("PUT", url, endpoint, **kwargs)
+
+    def delete(self, url, endpoint, **kwargs):
+        return self.request("DELETE", url, endpoint, **kwargs)
+
+HTTP = ZohoHttpClient()
+
+def save_token_file(access_token, expires_in=None):
+    try:
+        payload = {"access_token": access_token, "saved_at": int(time())}
+        if expires_in:
+            payload["expires_in"] = int(expires_in)
+        with open(TOKEN_FILE, "w", encoding="utf-8") as f:
+            json.dump(payload, f)
+    except Exception as e:
+        print("token.json kaydedilemedi:", e)
+
+def load_token_file():
+    if not os.path.exists(TOKEN_FILE):
+        return None
+    try:
+        with open(TOKEN_FILE, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception as e:
+        print("token.json okunamadı:", e)
+        return None
+
+TOKEN_REFRESH_MARGIN = 300      # saniye; süresi dolmadan bu kadar önce yenile
+TOKEN_DEFAULT_LIFETIME = 3600   # expires_in bilinmiyorsa Zoho varsayılanı
+TOKEN_REFRESH_COOLDOWN = 10     # başarısız yenilemeden sonra tekrar denemeden önce bekleme
+CREATOR_AUTH_RETRIES = 1        # 401/403 sonrası token yenileyip en fazla bu kadar tekrar dene
+
+def _request_new_token():
+    """Refresh token ile yeni access token ister; (token, expires_in) veya None döner."""
+    url = f"{ACCOUNTS_DOMAIN}/oauth/v2/token"
+    data = {
+        "refresh_token": REFRESH_TOKEN,
+        "client_id": CLIENT_ID,
+        "client_secret": CLIENT_SECRET,
+        "grant_type": "refresh_token"
+    }
+    try:
+        resp = HTTP.post(url, "oauth/token", data=data)
+        if resp.status_code != 200:
+            print("Token yenilenemedi:", resp.status_code, resp.text)
+            return None
+        json_resp = resp.json()
+        if "access_token" in json_resp:
+            return json_resp["access_token"], json_resp.get("expires_in")
+        print("Refresh token yanıtı hatalı:", json_resp)
+        return None
+    except Exception as e:
+        print("Refresh token işlenirken hata:", e)
+        return None
+
+class TokenManager:
+    """Access token'ı süresi dolmadan yeniler; aynı anda yalnızca bir yenileme çalışır."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._token = None
+        self._expires_at = 0
+        self._last_failure = 0
+        tok = load_token_file()
+        if tok and "access_token" in tok:
+            self._token = tok["access_token"]
+            self._expires_at = tok.get("saved_at", 0) + tok.get("expires_in", TOKEN_DEFAULT_LIFETIME)
+
+    def _is_fresh(self):
+        return self._token is not None and time() < self._expires_at - TOKEN_REFRESH_MARGIN
+
+    def get_token(self):
+        """Geçerli token'ı döner, süresi dolmak üzereyse önce yeniler."""
+        if self._is_fresh():
+            return self._token
+        return self.refresh()
+
+    def refresh(self, stale_token=None):
+        """Token'ı yeniler; diğer çağıranlar kilitte bekler ve aynı sonucu kullanır.
+
+        stale_token: 401 alınan token. Bu arada başka bir thread yenilediyse
+        tekrar istek atılmaz.
+        """
+        with self._lock:
+            if self._token is not None and self._token != stale_token and self._is_fresh():
+                return self._token
+            if time() - self._last_failure < TOKEN_REFRESH_COOLDOWN:
+                return None
+            start = perf_counter()
+            result = _request_new_token()
+            METRICS.observe("depo_token_refresh_seconds", perf_counter() - start,
+                            result="failed" if result is None else "ok")
+            if result is None:
+                self._last_failure = time()
+                return None
+            token, expires_in = result
+            self._token = token
+            self._expires_at = time() + int(expires_in or TOKEN_DEFAULT_LIFETIME)
+            save_token_file(token, expires_in=expires_in)
+            print("Yeni access token alındı (kayıt edildi).")
+            return token
+
+TOKENS = TokenManager()
+
+def refresh_access_token():
+    """Token'ı zorla yeniler (geriye dönük uyumluluk)."""
+    return TOKENS.refresh(stale_token=TOKENS._token) is not None
+
+def _creator_request(method, url, endpoint, **kwargs):
+    """Creator isteğini geçerli token ile atar; 401/403'te sınırlı sayıda yenileyip tekrar dener.
+
+    Token alınamazsa None döner.
+    """
+    token = TOKENS.get_token()
+    if not token:
+        return None
+    for attempt in range(CREATOR_AUTH_RETRIES + 1):
+        headers = {"Authorization": f"Zoho-oauthtoken {token}"}
+        # Durum koduna göre süre: check_record_exists GET report/..., delete_from_creator
+        # DELETE report/..., send_to_creator POST/PUT form/... olarak görünür
+        status, start = "error", perf_counter()
+        try:
+            resp = HTTP.request(method, url, endpoint, headers=headers, **kwargs)
+            status = resp.status_code
+        finally:
+            METRICS.observe("depo_creator_request_seconds", perf_counter() - start,
+                            method=method, endpoint=endpoint, status=status)
+        if resp.status_code not in (401, 403) or attempt == CREATOR_AUTH_RETRIES:
+            return resp
+        token = TOKENS.refresh(stale_token=token)
+        if not token:
+            return resp
+    return resp
+
+# --------------------
+# Creator Kayıt Önbelleği
+# --------------------
+# Creator'da var olduğu bilinen kayıtlar (rapor, ID); kendi başarılı yazmalarımız, webhook'lar ve
+# çekme doldurur. Süresi dolmamış kayıt için varlık kontrolü (GET) atılmaz; 404 alınan kayıt silinir.
+CREATOR_RECORD_TTL = 24 * 3600   # saniye
+# Form -> kayıtlarının okunduğu rapor; listede olmayan form için All_<form>
+CREATOR_REPORTS = {"Work_Order": "All_Work_Orders"}
+
+def creator_report_name(form_name):
+    # Silme işleri rapor adıyla da kuyruğa alınır ("All_Work_Orders")
+    if form_name.startswith("All_"):
+        return form_name
+    return CREATOR_REPORTS.get(form_name, f"All_{form_name}")
+
+def remember_creator_records(report_name, record_ids):
+    """Kayıtları Creator'da var olarak işaretler; süreleri yeniden başlar."""
+    now = time()
+    rows = [(report_name, str(record_id), now) for record_id in record_ids if record_id]
+    if rows:
+        with DB.write() as cursor:
+            cursor.executemany("INSERT OR REPLACE INTO creator_records (report, record_id, seen_at) VALUES (?, ?, ?)",
+                               rows)
+
+def forget_creator_record(report_name, record_id):
+    with DB.write() as cursor:
+        cursor.execute("DELETE FROM creator_records WHERE report=? AND record_id=?", (report_name, str(record_id)))
+
+def creator_record_known(report_name, record_id):
+    """Kayıt son CREATOR_RECORD_TTL içinde Creator'da görüldüyse True."""
+    return DB.fetchone("SELECT 1 FROM creator_records WHERE report=? AND record_id=? AND seen_at > ?",
+                       (report_name, str(record_id), time() - CREATOR_RECORD_TTL)) is not None
+
+def purge_creator_records():
+    with DB.write() as cursor:
+        cursor.execute("DELETE FROM creator_records WHERE seen_at <= ?", (time() - CREATOR_RECORD_TTL,))
+
+def check_record_exists(report_name, record_id):
+    """Creator'da kayıt var mı diye kontrol eder; önbellekte taze kaydı varsa istek atılmaz."""
+    if creator_record_known(report_name, record_id):
+        METRICS.inc("depo_creator_record_cache_total", result="hit")
+        return True
+    METRICS.inc("depo_creator_record_cache_total", result="miss")
+    url = f"{API_DOMAIN}/creator/v2/data/{OWNER_NAME}/{APP_LINK_NAME}/report/{report_name}/{record_id}"
+
+    try:
+        resp = _creator_request("GET", url, f"report/{report_name}")
+        if resp is not None and resp.status_code == 200:
+            remember_creator_records(report_name, [record_id])
+            return True
+        return False
+    except Exception as e:
+        print("⚠️ check_record_exists hata:", e)
+        return False
+
+
+def send_to_creator(form_link_name, data, method="POST", record_id=None):
+    """Zoho Creator’a veri gönderir (ekle/güncelle)."""
+    report_name = creator_report_name(form_link_name)
+    try:
+        if method == "PUT" and record_id:
+            # Güncelleme
+            url = f"{API_DOMAIN}/creator/v2/data/{OWNER_NAME}/{APP_LINK_NAME}/form/{form_link_name}/{record_id}"
+            resp = _creator_request("PUT", url, f"form/{form_link_name}", json={"data": data})
+
+        else:
+            # Ekleme (önce var mı kontrol et)
+            if data.get("ID"):
+                exists = check_record_exists(report_name, data["ID"])
+                if exists:
+                    return False, f"Kayıt zaten Creator'da var (ID={data['ID']})."
+
+            url = f"{API_DOMAIN}/creator/v2/data/{OWNER_NAME}/{APP_LINK_NAME}/form/{form_link_name}"
+            resp = _creator_request("POST", url, f"form/{form_link_name}", json={"data": data})
+
+        if resp is None:
+            return False, "Token alınamadı."
+        if resp.status_code in (200, 201):
+            body = resp.json()
+            remember_creator_records(report_name, [record_id if method == "PUT" else extract_record_id_from_data(body)])
+            return True, body
+        if resp.status_code == 404 and method == "PUT" and record_id:
+            forget_creator_record(report_name, record_id)
+        return False, f"Hata: {resp.status_code}, {resp.text}"
+
+    except Exception as e:
+        return False, f"send_to_creator hata: {e}"
+
+
+def extract_record_id_from_data(data_obj):
+    if isinstance(data_obj, dict):
+        # Creator yanıtı {"code": 3000, "data": {"ID": ...}} şeklinde gelir
+        if "ID" not in data_obj and "data" in data_obj:
+            return extract_record_id_from_data(data_obj["data"])
+        return data_obj.get("ID")
+    if isinstance(data_obj, list) and data_obj:
+        elem = data_obj[0]
+        if isinstance(elem, dict):
+            return elem.get("ID")
+    return None
+
+def delete_from_creator(form_name, record_id):
+    """Zoho Creator’dan kayıt siler; kayıt zaten yoksa (404) da başarılı sayılır.
+
+    Varlık kontrolü yapılmaz: tek istek atılır. Diğer tüm hatalarda False döner ve iş yeniden denenir.
+    """
+    report_name = creator_report_name(form_name)
+    url = f"{API_DOMAIN}/creator/v2/data/{OWNER_NAME}/{APP_LINK_NAME}/report/{report_name}/{record_id}"
+
+    try:
+        resp = _creator_request("DELETE", url, f"report/{report_name}")
+        if resp is not None and resp.status_code in (200, 404):
+            if resp.status_code == 404:
+                print(f"⚠️ {form_name} id={record_id} Creator'da zaten yok.")
+            forget_creator_record(report_name, record_id)
+            return True
+        return False
+    except Exception as e:
+        print("⚠️ delete_from_creator hata:", e)
+        return False
+
+CREATOR_BATCH_LIMIT = 200  # Creator tek istekte en fazla 200 kayıt kabul eder
+
+def send_batch_to_creator(form_link_name, records):
+    """Birden fazla kaydı tek istekte Creator'a ekler.
+
+    (success, sonuçlar) döner; sonuçlar her kayıt için (başarılı mı, ID veya hata) listesidir.
+    """
+    if not records:
+        return True, []
+    if len(records) > CREATOR_BATCH_LIMIT:
+        raise ValueError(f"En fazla {CREATOR_BATCH_LIMIT} kayıt gönderilebilir.")
+
+    url = f"{API_DOMAIN}/creator/v2/data/{OWNER_NAME}/{APP_LINK_NAME}/form/{form_link_name}"
+
+    try:
+        resp = _creator_request("POST", url, f"form/{form_link_name}", json={"data": records}, read_timeout=60)
+        if resp is None:
+            return False, "Token alınamadı."
+        if resp.status_code not in (200, 201):
+            return False, f"Hata: {resp.status_code}, {resp.text}"
+
+        results = []
+        for item in resp.json().get("result", []):
+            if item.get("code") == 3000:
+                results.append((True, extract_record_id_from_data(item)))
+            else:
+                results.append((False, item.get("message") or item.get("error")))
+        remember_creator_records(creator_report_name(form_link_name), [value for ok, value in results if ok])
+        return True, results
+    except Exception as e:
+        return False, f"send_batch_to_creator hata: {e}"
+
+
+
+
+
+
+
+
+# --------------------
+# SQLite Veritabanı
+# --------------------
+DB_PATH = os.environ.get("DEPO_DB_PATH", "depo.db")
+DB_BUSY_TIMEOUT = 10          # saniye; kilitli veritabanında beklenecek süre
+DB_STATEMENT_CACHE = 256      # bağlantı başına saklanan hazırlanmış sorgu sayısı
+
+# Her bağlantıda uygulanan ayarlar (journal_mode=WAL dosyada kalıcıdır)
+DB_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA foreign_keys=ON",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-16000",     # ~16 MB
+    "PRAGMA mmap_size=268435456",   # 256 MB
+)
+
+CHANGE_MAX_IDS = 5000   # tablo başına; aşılırsa tablonun tamamı değişmiş sayılır
+
+class ChangeFeed:
+    """Commit edilen yazmalarda değişen satır id'lerini biriktirip dinleyiciye haber verir.
+
+    {tablo: id kümesi} biçiminde tutulur; None "tablonun tamamı" demektir.
+    on_change yazan thread'den çağrılır. Dinleyici birikenleri drain() ile tek
+    seferde alır; böylece art arda gelen yazmalar tek yenilemede toplanır.
+    """
+
+    def __init__(self):
+        self.on_change = None
+        self._lock = threading.Lock()
+        self._pending = {}
+
+    @staticmethod
+    def merge(target, changes):
+        for table, ids in changes.items():
+            current = target.get(table, set())
+            if ids is None or current is None or len(current) + len(ids) > CHANGE_MAX_IDS:
+                target[table] = None
+            else:
+                target[table] = current | set(ids)
+
+    def publish(self, changes):
+        if not changes:
+            return
+        with self._lock:
+            self.merge(self._pending, changes)
+        if self.on_change:
+            self.on_change()
+
+    def drain(self):
+        with self._lock:
+            changes, self._pending = self._pending, {}
+        return changes
+
+class Database:
+    """Thread başına tek bağlantı tutan ortak veri erişim katmanı.
+
+    Her thread kendi bağlantısını yeniden kullanır; böylece sqlite3'ün
+    hazırlanmış sorgu önbelleği çağrılar arasında korunur. Yazmalar süreç
+    içinde tek bir kilitle sıraya girer ve BEGIN IMMEDIATE ile başlar; başka
+    bir süreç yazıyorsa busy_timeout kadar beklenir.
+    """
+
+    def __init__(self, path=DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._write_lock = threading.RLock()
+        self.changes = ChangeFeed()
+
+    def connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=DB_BUSY_TIMEOUT, isolation_level=None,
+                                   check_same_thread=False, cached_statements=DB_STATEMENT_CACHE)
+            for pragma in DB_PRAGMAS:
+                conn.execute(pragma)
+            self._local.conn = conn
+        return conn
+
+    def close_thread_connection(self):
+        """Kısa ömürlü thread'ler işini bitirince kendi bağlantısını kapatır."""
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    @contextmanager
+    def write(self):
+        """Yazma transaction'ı; iç içe çağrılar dıştaki transaction'a katılır."""
+        conn = self.connection()
+        waited = perf_counter()
+        with self._write_lock:
+            if conn.in_transaction:
+                yield conn.cursor()
+                return
+            METRICS.observe("depo_db_lock_wait_seconds", perf_counter() - waited, DB_LATENCY_BUCKETS)
+            started = perf_counter()
+            conn.execute("BEGIN IMMEDIATE")
+            self._local.changes = {}
+            try:
+                yield conn.cursor()
+            except BaseException:
+                conn.execute("ROLLBACK")
+                self._local.changes = None
+                raise
+            conn.execute("COMMIT")
+            METRICS.observe("depo_db_transaction_seconds", perf_counter() - started, DB_LATENCY_BUCKETS)
+            changes, self._local.changes = self._local.changes, None
+            self.changes.publish(changes)
+
+    def mark_changed(self, table, ids=None):
+        """Açık yazma transaction'ında değişen satırları işaretler; commit'te yayımlanır.
+
+        ids verilmezse tablonun tamamı değişmiş sayılır.
+        """
+        changes = getattr(self._local, "changes", None)
+        if changes is not None:
+            ChangeFeed.merge(changes, {table: None if ids is None else list(ids)})
+
+    def fetchall(self, sql, params=()):
+        return self.connection().execute(sql, params).fetchall()
+
+    def fetchone(self, sql, params=()):
+        return self.connection().execute(sql, params).fetchone()
+
+DB = Database()
+
+def init_db():
+    """Veritabanını açar ve bekleyen şema göçlerini (migration) sırayla uygular.
+
+    Şema sürümü PRAGMA user_version'da tutulur; her göç kendi transaction'ında
+    çalışır, böylece mevcut depo.db dosyaları yerinde yükseltilir.
+    """
+    version = DB.fetchone("PRAGMA user_version")[0]
+    for target, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+        with DB.write() as cursor:
+            migration(cursor)
+            cursor.execute(f"PRAGMA user_version = {target}")
+        print(f"Veritabanı şeması v{target} sürümüne yükseltildi.")
+
+# --------------------
+# Şema Göçleri
+# --------------------
+# Göçler eski (sürümsüz) veritabanlarında da çalışabilmesi için idempotent yazılır.
+def _migrate_base_tables(cursor):
+    cursor.execute("""CREATE TABLE IF NOT EXISTS parts (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        code TEXT NOT NULL,
+        description TEXT,
+        quantity INTEGER DEFAULT 0,
+        shelf TEXT,
+        creator_id TEXT
+    )""")
+    cursor.execute("""CREATE TABLE IF NOT EXISTS stock_movements (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        part_id INTEGER,
+        movement_type TEXT,
+        quantity INTEGER,
+        shelf TEXT,
+        creator_id TEXT,
+        date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY(part_id) REFERENCES parts(id)
+    )""")
+    cursor.execute("""CREATE TABLE IF NOT EXISTS work_orders (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        records TEXT,
+        required_parts TEXT,
+        status TEXT,
+        date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        creator_id TEXT
+    )""")
+
+def _migrate_outbox(cursor):
+    # Creator'a gönderilecek değişiklikler için kalıcı kuyruk (outbox)
+    cursor.execute("""CREATE TABLE IF NOT EXISTS outbox (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        form_name TEXT NOT NULL,
+        method TEXT NOT NULL DEFAULT 'POST',
+        payload TEXT,
+        record_id TEXT,
+        target_table TEXT,
+        target_id INTEGER,
+        part_id INTEGER,
+        status TEXT NOT NULL DEFAULT 'pending',
+        attempts INTEGER NOT NULL DEFAULT 0,
+        next_attempt_at REAL NOT NULL DEFAULT 0,
+        last_error TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )""")
+    _add_column_if_missing(cursor, "stock_movements", "sync_status", "TEXT")
+    _add_column_if_missing(cursor, "work_orders", "sync_status", "TEXT")
+
+def _migrate_balance_after(cursor):
+    # Hareket sonrası stok; tablolar her satır için parts'a gitmek yerine bunu okur
+    _add_column_if_missing(cursor, "stock_movements", "balance_after", "INTEGER")
+    backfill_balance_after(cursor)
+
+def _migrate_indexes(cursor):
+    # parts.code tekil olmalı: aynı koddan birden fazla satır varsa en eskisinde birleştir
+    cursor.execute("""
+        CREATE TEMP TABLE part_merge AS
+        SELECT p.id AS old_id, k.keep_id
+        FROM parts p
+        JOIN (SELECT code, MIN(id) AS keep_id FROM parts GROUP BY code HAVING COUNT(*) > 1) k
+          ON k.code = p.code AND p.id != k.keep_id
+    """)
+    cursor.execute("SELECT COUNT(*) FROM part_merge")
+    if cursor.fetchone()[0]:
+        cursor.execute("""
+            UPDATE parts SET
+                quantity = quantity + (SELECT SUM(d.quantity) FROM parts d JOIN part_merge m ON m.old_id = d.id
+                                       WHERE m.keep_id = parts.id),
+                creator_id = COALESCE(creator_id, (SELECT d.creator_id FROM parts d JOIN part_merge m ON m.old_id = d.id
+                                                   WHERE m.keep_id = parts.id AND d.creator_id IS NOT NULL LIMIT 1))
+            WHERE id IN (SELECT keep_id FROM part_merge)
+        """)
+        cursor.execute("""
+            UPDATE stock_movements SET
+                part_id = (SELECT keep_id FROM part_merge WHERE old_id = stock_movements.part_id)
+            WHERE part_id IN (SELECT old_id FROM part_merge)
+        """)
+        cursor.execute("DELETE FROM parts WHERE id IN (SELECT old_id FROM part_merge)")
+        # Birleşen parçaların bakiyeleri yeniden hesaplansın
+        cursor.execute("""
+            UPDATE stock_movements SET balance_after = NULL
+            WHERE part_id IN (SELECT DISTINCT keep_id FROM part_merge)
+        """)
+        backfill_balance_after(cursor)
+    cursor.execute("DROP TABLE part_merge")
+
+    cursor.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_parts_code ON parts(code)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_movements_part ON stock_movements(part_id, id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_movements_type ON stock_movements(movement_type, id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_work_orders_dedup ON work_orders(records, required_parts, status)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_outbox_status ON outbox(status, next_attempt_at)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_outbox_target ON outbox(target_table, target_id)")
+
+def _migrate_webhook_events(cursor):
+    # Webhook tekilleştirmesi: içerik taraması yerine tekil anahtar üzerinde tek indeks araması
+    cursor.execute("""CREATE TABLE IF NOT EXISTS webhook_events (
+        idempotency_key TEXT PRIMARY KEY,
+        kind TEXT NOT NULL,
+        received_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    ) WITHOUT ROWID""")
+    # Mevcut iş emirleri eski içerik eşleşmesiyle aynı şekilde tekrar eklenmesin
+    cursor.execute("SELECT records, required_parts, status, creator_id FROM work_orders")
+    keys = []
+    for records, parts, status, creator_id in cursor.fetchall():
+        event = {"Maintenance_Repair_Records": records or "", "Required_Parts": parts or "",
+                 "Status_Information": status or ""}
+        keys.append((webhook_idempotency_key("work_order", event), "work_order"))
+        if creator_id:
+            keys.append((webhook_idempotency_key("work_order", {"ID": creator_id}), "work_order"))
+    cursor.executemany("INSERT OR IGNORE INTO webhook_events (idempotency_key, kind) VALUES (?, ?)", keys)
+    cursor.execute("DROP INDEX IF EXISTS idx_work_orders_dedup")
+
+def _migrate_pull_sync(cursor):
+    # Creator'dan çekmede kaldığımız yer (rapor başına en son Modified_Time)
+    cursor.execute("""CREATE TABLE IF NOT EXISTS sync_state (
+        key TEXT PRIMARY KEY,
+        value TEXT
+    )""")
+    # Çekilen kayıtlar creator_id ile eşleştirilir; tekrarlı ID'ler varsa en eski satırda kalsın
+    for table in ("stock_movements", "work_orders"):
+        cursor.execute(f"""
+            UPDATE {table} SET creator_id = NULL
+            WHERE creator_id IS NOT NULL AND id NOT IN (
+                SELECT MIN(id) FROM {table} WHERE creator_id IS NOT NULL GROUP BY creator_id
+            )
+        """)
+        cursor.execute(f"""CREATE UNIQUE INDEX IF NOT EXISTS idx_{table}_creator_id
+                           ON {table}(creator_id) WHERE creator_id IS NOT NULL""")
+
+def _migrate_part_versions(cursor):
+    # Değişiklik takibi: her değişiklikte version artar, başarılı gönderimde synced_version ona eşitlenir
+    _add_column_if_missing(cursor, "parts", "version", "INTEGER NOT NULL DEFAULT 1")
+    _add_column_if_missing(cursor, "parts", "synced_version", "INTEGER NOT NULL DEFAULT 0")
+    _add_column_if_missing(cursor, "parts", "updated_at", "TIMESTAMP")
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_parts_version AFTER UPDATE OF code, description, quantity, shelf ON parts
+        WHEN NEW.code IS NOT OLD.code OR NEW.description IS NOT OLD.description
+          OR NEW.quantity IS NOT OLD.quantity OR NEW.shelf IS NOT OLD.shelf
+        BEGIN
+            UPDATE parts SET version = OLD.version + 1, updated_at = CURRENT_TIMESTAMP WHERE id = NEW.id;
+        END
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_parts_dirty ON parts(id) WHERE version > synced_version")
+
+def _migrate_stock_ledger(cursor):
+    # Sayım satırı bakiyeyi sayılan miktara eşitler; fark sonradan değişebileceği için miktarın kendisi saklanır
+    _add_column_if_missing(cursor, "stock_movements", "counted_qty", "INTEGER")
+    cursor.execute("""
+        UPDATE stock_movements SET counted_qty = balance_after
+        WHERE movement_type = 'Sayım' AND counted_qty IS NULL
+    """)
+    # Ay sonu stokları; geçmiş bir andaki stok en yakın görüntü + sonraki hareketlerden okunur
+    cursor.execute("""CREATE TABLE IF NOT EXISTS stock_snapshots (
+        snapshot_at TIMESTAMP NOT NULL,
+        part_id INTEGER NOT NULL,
+        quantity INTEGER NOT NULL,
+        PRIMARY KEY (snapshot_at, part_id)
+    ) WITHOUT ROWID""")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_movements_part_date ON stock_movements(part_id, date, id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_movements_date ON stock_movements(date)")
+
+def _migrate_work_order_lines(cursor):
+    # required_parts serbest metni (parça kodu, miktar) satırlarına ayrılır; açık iş emirlerinin
+    # toplam ihtiyacı parts.reserved'de tetikleyicilerle artımlı tutulur
+    _add_column_if_missing(cursor, "work_orders", "is_open", "INTEGER NOT NULL DEFAULT 1")
+    _add_column_if_missing(cursor, "parts", "reserved", "INTEGER NOT NULL DEFAULT 0")
+    cursor.execute("""CREATE TABLE IF NOT EXISTS work_order_lines (
+        work_order_id INTEGER NOT NULL REFERENCES work_orders(id),
+        part_code TEXT NOT NULL,
+        quantity INTEGER NOT NULL,
+        PRIMARY KEY (work_order_id, part_code)
+    ) WITHOUT ROWID""")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_work_order_lines_part ON work_order_lines(part_code, work_order_id)")
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_work_order_lines_reserve AFTER INSERT ON work_order_lines
+        WHEN (SELECT is_open FROM work_orders WHERE id = NEW.work_order_id)
+        BEGIN
+            UPDATE parts SET reserved = reserved + NEW.quantity WHERE code = NEW.part_code;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_work_order_lines_release AFTER DELETE ON work_order_lines
+        WHEN (SELECT is_open FROM work_orders WHERE id = OLD.work_order_id)
+        BEGIN
+            UPDATE parts SET reserved = reserved - OLD.quantity WHERE code = OLD.part_code;
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_work_orders_open AFTER UPDATE OF is_open ON work_orders
+        WHEN NEW.is_open IS NOT OLD.is_open
+        BEGIN
+            UPDATE parts SET reserved = reserved + (CASE WHEN NEW.is_open THEN 1 ELSE -1 END) *
+                (SELECT l.quantity FROM work_order_lines l WHERE l.work_order_id = NEW.id AND l.part_code = parts.code)
+            WHERE code IN (SELECT part_code FROM work_order_lines WHERE work_order_id = NEW.id);
+        END
+    """)
+    # Satırlar iş emri silinmeden önce silinmeli: release tetikleyicisi is_open'ı okur
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_work_orders_delete_lines BEFORE DELETE ON work_orders
+        BEGIN
+            DELETE FROM work_order_lines WHERE work_order_id = OLD.id;
+        END
+    """)
+    # Parça iş emrinden sonra oluşursa ayrılan miktarı baştan alır
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_parts_reserved AFTER INSERT ON parts
+        WHEN EXISTS (SELECT 1 FROM work_order_lines WHERE part_code = NEW.code)
+        BEGIN
+            UPDATE parts SET reserved = (
+                SELECT COALESCE(SUM(l.quantity), 0) FROM work_order_lines l
+                JOIN work_orders w ON w.id = l.work_order_id
+                WHERE l.part_code = NEW.code AND w.is_open
+            ) WHERE id = NEW.id;
+        END
+    """)
+    rebuild_work_order_lines(cursor)
+
+def _migrate_search_index(cursor):
+    # FTS5 arama dizinleri; metin tablonun kendisinden okunur (content=), dizin yalnızca
+    # SEARCH_INDEXES sütunları değişince güncellenir (stok hareketleri dizine dokunmaz)
+    for table, columns in SEARCH_INDEXES.items():
+        names = ", ".join(columns)
+        new = ", ".join(f"NEW.{column}" for column in columns)
+        old = ", ".join(f"OLD.{column}" for column in columns)
+        cursor.execute(f"""CREATE VIRTUAL TABLE IF NOT EXISTS {table}_fts USING fts5(
+            {names}, content='{table}', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+        )""")
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_fts_insert AFTER INSERT ON {table}
+            BEGIN
+                INSERT INTO {table}_fts (rowid, {names}) VALUES (NEW.id, {new});
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_fts_delete AFTER DELETE ON {table}
+            BEGIN
+                INSERT INTO {table}_fts ({table}_fts, rowid, {names}) VALUES ('delete', OLD.id, {old});
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS trg_{table}_fts_update AFTER UPDATE OF {names} ON {table}
+            BEGIN
+                INSERT INTO {table}_fts ({table}_fts, rowid, {names}) VALUES ('delete', OLD.id, {old});
+                INSERT INTO {table}_fts (rowid, {names}) VALUES (NEW.id, {new});
+            END
+        """)
+        cursor.execute(f"INSERT INTO {table}_fts ({table}_fts) VALUES ('rebuild')")
+
+def _migrate_locations(cursor):
+    # Parça birden fazla rafta durabilir: (parça, konum) bakiyeleri defterden türeyen bir önbellektir.
+    # Konumsuz hareketler parçanın varsayılan rafına (parts.location_id) yazılır; eski tek raf bu olur.
+    cursor.execute("""CREATE TABLE IF NOT EXISTS locations (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        code TEXT NOT NULL UNIQUE,
+        zone TEXT NOT NULL DEFAULT ''
+    )""")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_locations_zone ON locations(zone, code)")
+    cursor.execute("""CREATE TABLE IF NOT EXISTS part_locations (
+        part_id INTEGER NOT NULL REFERENCES parts(id),
+        location_id INTEGER NOT NULL REFERENCES locations(id),
+        quantity INTEGER NOT NULL,
+        PRIMARY KEY (part_id, location_id)
+    ) WITHOUT ROWID""")
+    # Konum / bölge toplamları yalnızca bu indeksi tarar
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_part_locations_location ON part_locations(location_id, quantity)")
+    _add_column_if_missing(cursor, "parts", "location_id", "INTEGER REFERENCES locations(id)")
+    _add_column_if_missing(cursor, "stock_movements", "location_id", "INTEGER REFERENCES locations(id)")
+    _add_column_if_missing(cursor, "stock_movements", "to_location_id", "INTEGER REFERENCES locations(id)")
+    assign_default_locations(cursor)
+
+def _migrate_creator_records(cursor):
+    # Creator'da var olduğu bilinen kayıtlar; varlık kontrolü (GET) bu tablodan cevaplanır
+    cursor.execute("""CREATE TABLE IF NOT EXISTS creator_records (
+        report TEXT NOT NULL,
+        record_id TEXT NOT NULL,
+        seen_at REAL NOT NULL,
+        PRIMARY KEY (report, record_id)
+    ) WITHOUT ROWID""")
+
+def _migrate_reparse_required_parts(cursor):
+    # Ayrıştırıcı düzeltildi ("2 x 3423", "3423 x 2" gibi girdiler); eski satırlar ve ayrılan stoklar yeniden kurulur
+    rebuild_work_order_lines(cursor)
+
+# Sıra önemli: yeni göçler yalnızca sona eklenir
+MIGRATIONS = [
+    _migrate_base_tables,
+    _migrate_outbox,
+    _migrate_balance_after,
+    _migrate_indexes,
+    _migrate_webhook_events,
+    _migrate_pull_sync,
+    _migrate_part_versions,
+    _migrate_stock_ledger,
+    _migrate_work_order_lines,
+    _migrate_search_index,
+    _migrate_locations,
+    _migrate_creator_records,
+    _migrate_reparse_required_parts,
+]
+
+# Hareketin stoğa etkisi (işaretli miktar); Sayım satırlarında quantity farkı tutar
+SIGNED_QUANTITY_SQL = ("CASE s.movement_type WHEN 'Çıkış' THEN -s.quantity WHEN 'Transfer' THEN 0 "
+                       "ELSE s.quantity END")
+
+def backfill_balance_after(cursor):
+    """balance_after boş olan hareketleri tek sorguda doldurur.
+
+    Bakiye, parçanın güncel stoğundan o hareketten sonraki hareketlerin
+    toplamı çıkarılarak bulunur; böylece son satır her zaman parts.quantity ile aynıdır.
+    """
+    cursor.execute(f"""
+        WITH ledger AS (
+            SELECT s.id,
+                   p.quantity - COALESCE(SUM({SIGNED_QUANTITY_SQL}) OVER (
+                       PARTITION BY s.part_id ORDER BY s.id
+                       ROWS BETWEEN 1 FOLLOWING AND UNBOUNDED FOLLOWING
+                   ), 0) AS balance
+            FROM stock_movements s
+            JOIN parts p ON p.id = s.part_id
+        )
+        UPDATE stock_movements SET balance_after = ledger.balance
+        FROM ledger
+        WHERE ledger.id = stock_movements.id AND stock_movements.balance_after IS NULL
+    """)
+
+def _add_column_if_missing(cursor, table, column, decl):
+    cursor.execute(f"PRAGMA table_info({table})")
+    if column not in [row[1] for row in cursor.fetchall()]:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+
+# --------------------
+# Stok Defteri
+# --------------------
+# stock_movements esas kayıttır. balance_after, parts.quantity ve stock_snapshots
+# defterin (date, id) sırasıyla katlanmasından türeyen önbelleklerdir:
+# Giriş ekler, Çıkış düşer, Sayım bakiyeyi counted_qty'ye eşitler.
+LEDGER_TIME_FORMAT = "%Y-%m-%d %H:%M:%S"  # stock_movements.date biçimi (UTC)
+
+def ledger_time(value, end_of_day=True):
+    """datetime veya metni defter tarih biçimine çevirir; yalnızca gün verilirse gün sonu (veya başı) alınır."""
+    if isinstance(value, datetime):
+        return value.strftime(LEDGER_TIME_FORMAT)
+    value = str(value).strip()
+    if len(value) == 10:
+        value += " 23:59:59" if end_of_day else " 00:00:00"
+    return datetime.strptime(value, LEDGER_TIME_FORMAT).strftime(LEDGER_TIME_FORMAT)
+
+def ledger_step(balance, movement_type, quantity, counted=None):
+    """Tek hareketin bakiyeye etkisi: (saklanacak quantity, yeni bakiye)."""
+    if movement_type == "Sayım" and counted is not None:
+        return counted - balance, counted
+    if movement_type == "Çıkış":
+        return quantity, balance - quantity
+    return quantity, balance + quantity
+
+# --------------------
+# Raflar (Konumlar)
+# --------------------
+# Parçanın stoğu raflara bölünür: part_locations (parça, raf) bakiyeleri tutar, rafsız kısım
+# parts.quantity'den raf toplamı çıkarılarak bulunur. Rafı belirtilmeyen hareketler parçanın
+# varsayılan rafına (parts.location_id) yazılır; raf belirtilmeyen Sayım parçanın toplamını sayar.
+# Bölge raf kodunun baştaki harfleridir ("B19-4" -> "B"); harf yoksa ilk ayraca kadarki kısım ("12-3" -> "12")
+LOCATION_ZONE_PATTERN = re.compile(r"[^\W\d_]+|[^-/. ]+")
+SHELF_LOCATION_MAX_LENGTH = 255   # parts.shelf (Creator Shelf_Location) özetinin en fazla uzunluğu
+PART_LOCATION_UPSERT_SQL = """
+    INSERT INTO part_locations (part_id, location_id, quantity) VALUES (?, ?, ?)
+    ON CONFLICT (part_id, location_id) DO UPDATE SET quantity = excluded.quantity
+"""
+
+def location_zone(code):
+    match = LOCATION_ZONE_PATTERN.match(code)
+    return match.group(0) if match else ""
+
+def _ensure_location(cursor, code):
+    """Raf kodunun id'si; yoksa oluşturulur. Boş kod için None döner."""
+    code = (code or "").strip()
+    if not code:
+        return None
+    cursor.execute("INSERT OR IGNORE INTO locations (code, zone) VALUES (?, ?)", (code, location_zone(code)))
+    cursor.execute("SELECT id FROM locations WHERE code = ?", (code,))
+    return cursor.fetchone()[0]
+
+def assign_default_locations(cursor):
+    """Varsayılan rafı olmayan parçalarda parts.shelf'i varsayılan raf yapar; stoğun tamamı o rafta sayılır.
+
+    Tek raflı eski veriyi (ve dışarıdan doğrudan yazılmış parçaları) raflara taşır.
+    """
+    cursor.execute("""SELECT id, trim(shelf) FROM parts
+                      WHERE location_id IS NULL AND trim(COALESCE(shelf, '')) != ''""")
+    parts = cursor.fetchall()
+    cursor.executemany("INSERT OR IGNORE INTO locations (code, zone) VALUES (?, ?)",
+                       [(code, location_zone(code)) for code in {code for _, code in parts}])
+    cursor.executemany("UPDATE parts SET location_id = (SELECT id FROM locations WHERE code = ?) WHERE id = ?",
+                       [(code, part_id) for part_id, code in parts])
+    cursor.execute("""
+        INSERT OR IGNORE INTO part_locations (part_id, location_id, quantity)
+        SELECT id, location_id, quantity FROM parts
+        WHERE id IN (SELECT value FROM json_each(?)) AND quantity != 0
+    """, (json.dumps([part_id for part_id, _ in parts]),))
+
+def _part_buckets(cursor, part_ids):
+    """{part_id: [varsayılan raf id, toplam stok, {raf id: miktar}]}; rafsız kısım None anahtarındadır."""
+    ids = json.dumps(list(part_ids))
+    cursor.execute("SELECT id, location_id, quantity FROM parts WHERE id IN (SELECT value FROM json_each(?))", (ids,))
+    states = {part_id: [default, quantity or 0, {}] for part_id, default, quantity in cursor.fetchall()}
+    cursor.execute("SELECT part_id, location_id, quantity FROM part_locations WHERE part_id IN (SELECT value FROM json_each(?))",
+                   (ids,))
+    for part_id, location_id, quantity in cursor.fetchall():
+        states[part_id][2][location_id] = quantity
+    for _, total, buckets in states.values():
+        if total != sum(buckets.values()):
+            buckets[None] = total - sum(buckets.values())
+    return states
+
+def ledger_step_at(buckets, balance, movement_type, quantity, counted=None, location_id=None,
+                   to_location_id=None, part_count=False):
+    """ledger_step'in raflı hali: buckets ({raf id: miktar}) yerinde güncellenir.
+
+    Transfer location_id'den to_location_id'ye taşır, toplamı değiştirmez. part_count
+    Sayımında counted parçanın toplamıdır, fark location_id'ye yazılır; diğer Sayımlarda
+    counted o raftaki miktardır. (saklanacak quantity, yeni toplam) döner.
+    """
+    if movement_type == "Transfer":
+        buckets[location_id] = buckets.get(location_id, 0) - quantity
+        buckets[to_location_id] = buckets.get(to_location_id, 0) + quantity
+        return quantity, balance
+    if part_count:
+        quantity, new_balance = ledger_step(balance, movement_type, quantity, counted)
+    else:
+        before = buckets.get(location_id, 0)
+        quantity, after = ledger_step(before, movement_type, quantity, counted)
+        new_balance = balance + after - before
+    buckets[location_id] = buckets.get(location_id, 0) + new_balance - balance
+    return quantity, new_balance
+
+def _adopt_location(cursor, part_id, state, location_id):
+    # İlk kez rafa konan parça: rafsız hareketler (ve stok) artık bu rafa aittir
+    state[0] = location_id
+    state[2][location_id] = state[2].get(location_id, 0) + state[2].pop(None, 0)
+    cursor.execute("UPDATE parts SET location_id=? WHERE id=?", (location_id, part_id))
+
+def _step_part(cursor, part_id, state, movement_type, quantity, counted, location_id, to_location_id=None):
+    """Hareketi _part_buckets durumuna uygular; (saklanacak quantity, counted, yeni toplam) döner."""
+    if location_id is not None and state[0] is None and movement_type != "Transfer":
+        _adopt_location(cursor, part_id, state, location_id)
+    default, balance, buckets = state
+    part_count = movement_type == "Sayım" and location_id is None
+    target = location_id if location_id is not None else default
+    if movement_type == "Sayım" and counted is None:
+        counted = (balance if part_count else buckets.get(target, 0)) + quantity
+    quantity, state[1] = ledger_step_at(buckets, balance, movement_type, quantity, counted, target,
+                                        to_location_id, part_count)
+    return quantity, counted, state[1]
+
+def _save_part_locations(cursor, states):
+    cursor.executemany(PART_LOCATION_UPSERT_SQL,
+                       [(part_id, location_id, quantity) for part_id, (_, _, buckets) in states.items()
+                        for location_id, quantity in buckets.items() if location_id is not None])
+
+def refresh_shelf_text(cursor, part_ids):
+    """parts.shelf'i (Creator'da Shelf_Location) stoklu raflardan yeniden yazar.
+
+    Tek raf: "B19-4"; birden fazla: "B19-4 (5), A02-1 (3)" (çoktan aza). Stoklu raf
+    yoksa varsayılan raf yazılır. Değişen parça version tetikleyicisiyle gönderime girer.
+    """
+    ids = json.dumps(list(part_ids))
+    cursor.execute("""SELECT p.id, COALESCE(l.code, p.shelf, '') FROM parts p LEFT JOIN locations l ON l.id = p.location_id
+                      WHERE p.id IN (SELECT value FROM json_each(?))""", (ids,))
+    texts = dict(cursor.fetchall())
+    cursor.execute("""
+        SELECT pl.part_id, l.code, pl.quantity FROM part_locations pl JOIN locations l ON l.id = pl.location_id
+        WHERE pl.part_id IN (SELECT value FROM json_each(?)) AND pl.quantity > 0
+        ORDER BY pl.part_id, pl.quantity DESC, l.code
+    """, (ids,))
+    for part_id, rows in groupby(cursor.fetchall(), key=itemgetter(0)):
+        rows = list(rows)
+        text = rows[0][1] if len(rows) == 1 else ", ".join(f"{code} ({qty})" for _, code, qty in rows)
+        if len(text) > SHELF_LOCATION_MAX_LENGTH:
+            text = text[:SHELF_LOCATION_MAX_LENGTH - 1].rsplit(", ", 1)[0] + "…"
+        texts[part_id] = text
+    cursor.executemany("UPDATE parts SET shelf=? WHERE id=? AND shelf IS NOT ?",
+                       [(text, part_id, text) for part_id, text in texts.items()])
+
+def record_movement(cursor, part_id, movement_type, quantity=0, counted=None, shelf=None,
+                    creator_id=None, sync_status=None, to_shelf=None, date=None):
+    """Hareketi deftere ekler; parts.quantity'yi, raf bakiyelerini ve raf özetini günceller.
+
+    shelf hareketin rafıdır (verilmezse varsayılan raf). Sayımda counted o rafta sayılan
+    miktardır; raf verilmeyen Sayımda parçanın toplamıdır (Creator sayımları). counted
+    verilmezse quantity fark kabul edilir. Transfer shelf'ten to_shelf'e taşır. Saklanan
+    quantity her zaman stoğa olan etkidir. date (UTC defter zamanı) verilmezse şimdiki
+    zaman yazılır. (hareket id, quantity, bakiye) döner.
+    """
+    location_id, to_location_id = _ensure_location(cursor, shelf), _ensure_location(cursor, to_shelf)
+    states = _part_buckets(cursor, [part_id])
+    quantity, counted, balance = _step_part(cursor, part_id, states[part_id], movement_type, quantity, counted,
+                                            location_id, to_location_id)
+    cursor.execute("UPDATE parts SET quantity=? WHERE id=?", (balance, part_id))
+    cursor.execute(
+        """INSERT INTO stock_movements (part_id, movement_type, quantity, counted_qty, shelf, creator_id,
+                                        balance_after, sync_status, location_id, to_location_id, date)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP))""",
+        (part_id, movement_type, quantity, counted, shelf.strip() if location_id else None, creator_id, balance,
+         sync_status, location_id, to_location_id, date)
+    )
+    movement_id = cursor.lastrowid
+    _save_part_locations(cursor, states)
+    refresh_shelf_text(cursor, [part_id])
+    if date is not None:
+        # Geçmiş tarihli hareket sonraki bakiyeleri ve anlık görüntüleri değiştirir: defterden yeniden hesapla
+        cursor.execute("""
+            SELECT EXISTS(SELECT 1 FROM stock_movements WHERE part_id = ? AND date > ?)
+                OR EXISTS(SELECT 1 FROM stock_snapshots WHERE snapshot_at >= ?)
+        """, (part_id, date, date))
+        if cursor.fetchone()[0]:
+            rebuild_part_balances(cursor, [part_id])
+            cursor.execute("SELECT quantity, balance_after FROM stock_movements WHERE id=?", (movement_id,))
+            quantity, balance = cursor.fetchone()
+    DB.mark_changed("stock_movements", [movement_id])
+    return movement_id, quantity, balance
+
+@METRICS.timer("depo_db_operation_seconds", op="add_stock_movement")
+def add_stock_movement(cursor, code, movement, quantity, shelf=None):
+    """Parça koduna Giriş/Çıkış yazar ve Creator gönderimini kuyruğa alır.
+
+    Parça yoksa oluşturulur; shelf verilmezse varsayılan raf kullanılır. (hareket id,
+    yeni stok) döner; çağıran transaction bittikten sonra OUTBOX.notify() çağırmalıdır.
+    """
+    part_id = _ensure_part(cursor, code)
+
+    # Stock movement kaydı SQLite; stok defterden güncellenir
+    local_movement_id, quantity, new_qty = record_movement(cursor, part_id, movement, quantity, shelf=shelf)
+
+    # Creator payload
+    dt_str = datetime.now().strftime("%d-%b-%Y %H:%M:%S")
+    movement_map = {"Giriş": "added", "Çıkış": "removed", "Sayım": "count"}
+    payload = {
+        "Part_Code": code, #3423
+        "Added_Removed": int(quantity), #25
+        "Stock": int(new_qty),
+        "Movement": movement_map[movement],
+        "Date_Time": dt_str
+    }
+
+    # Creator'a gönderim arka planda outbox üzerinden yapılır; hareketin Creator ID'si
+    # yalnızca hareket satırına yazılır (parçanın creator_id'si Stocks kaydınındır)
+    enqueue_outbox(cursor, "Stock_Movements", payload,
+                   target_table="stock_movements", target_id=local_movement_id)
+    return local_movement_id, new_qty
+
+@METRICS.timer("depo_db_operation_seconds", op="add_count_movement")
+def add_count_movement(cursor, code, counted_qty, shelf):
+    """Sayımı deftere yazar; Stock_Movements ve Stocks gönderimlerini kuyruğa alır.
+
+    shelf verilirse counted_qty o raftaki miktardır, verilmezse parçanın toplamıdır.
+    (hareket id, fark, yeni stok) döner; çağıran OUTBOX.notify() çağırmalıdır.
+    """
+    cursor.execute("SELECT id, creator_id FROM parts WHERE code = ?", (code,))
+    result = cursor.fetchone()
+    if result:
+        part_id, part_creator_id = result
+    else:
+        part_id, part_creator_id = _ensure_part(cursor, code), None
+
+    local_movement_id, difference, new_qty = record_movement(cursor, part_id, "Sayım", counted=counted_qty,
+                                                             shelf=shelf)
+    cursor.execute("SELECT shelf FROM parts WHERE id=?", (part_id,))
+    shelf_location = cursor.fetchone()[0]
+
+    dt_str = datetime.now().strftime("%d-%b-%Y %H:%M:%S")
+
+    # --- Stock Movements raporuna gönderim ---
+    movement_payload = {
+        "Part_Code": code,
+        "Added_Removed": int(difference),
+        "Stock": int(new_qty),
+        "Movement": "count",
+        "Date_Time": dt_str
+    }
+    enqueue_outbox(cursor, "Stock_Movements", movement_payload,
+                   target_table="stock_movements", target_id=local_movement_id)
+
+    # --- Stocks raporuna parça bazlı güncelleme/ekleme ---
+    stock_payload = {
+        "Part_Code": code,
+        "Available_Quantity": int(new_qty),
+        "Shelf_Location": shelf_location or ""
+    }
+    # Eğer parça daha önce Stocks raporuna eklenmişse güncelle, yoksa ekle
+    enqueue_outbox(cursor, "Stocks", stock_payload, method="PUT" if part_creator_id else "POST",
+                   record_id=part_creator_id, part_id=None if part_creator_id else part_id)
+    return local_movement_id, difference, new_qty
+
+@METRICS.timer("depo_db_operation_seconds", op="transfer_stock")
+def transfer_stock(cursor, code, quantity, from_shelf, to_shelf):
+    """Parçanın stoğunu raftan rafa taşır; toplam değişmediği için Creator'a hareket gönderilmez.
+
+    from_shelf boşsa varsayılan raftan taşınır. Parça, hedef raf ya da kaynak rafta
+    yeterli stok yoksa ValueError. (hareket id, kaynakta kalan miktar) döner.
+    """
+    cursor.execute("SELECT id FROM parts WHERE code = ?", (code,))
+    result = cursor.fetchone()
+    if not result:
+        raise ValueError(f"{code} kodlu parça yok")
+    part_id = result[0]
+    to_shelf, from_shelf = (to_shelf or "").strip(), (from_shelf or "").strip() or None
+    if not to_shelf:
+        raise ValueError("Hedef raf gerekli")
+    if quantity <= 0:
+        raise ValueError("Miktar pozitif olmalı")
+    default, _, buckets = _part_buckets(cursor, [part_id])[part_id]
+    source = _ensure_location(cursor, from_shelf) if from_shelf else default
+    if source == _ensure_location(cursor, to_shelf):
+        raise ValueError("Kaynak ve hedef raf aynı")
+    if buckets.get(source, 0) < quantity:
+        raise ValueError(f"{from_shelf or 'Varsayılan raf'}: {buckets.get(source, 0)} adet var, {quantity} istendi")
+    if not from_shelf and source is not None:
+        # Varsayılan raf harekette açıkça yazılır; sonradan değişse de kaynak aynı kalır
+        cursor.execute("SELECT code FROM locations WHERE id = ?", (source,))
+        from_shelf = cursor.fetchone()[0]
+    movement_id, _, _ = record_movement(cursor, part_id, "Transfer", quantity, shelf=from_shelf,
+                                        to_shelf=to_shelf, sync_status="local")
+    return movement_id, buckets[source] - quantity
+
+def part_locations(code):
+    """Parçanın raf bakiyeleri, çoktan aza: [(raf, bölge, miktar)]; rafsız stok raf None ile döner.
+
+    Parça yoksa None döner.
+    """
+    row = DB.fetchone("SELECT id, quantity FROM parts WHERE code = ?", (code,))
+    if not row:
+        return None
+    rows = DB.fetchall("""
+        SELECT l.code, l.zone, pl.quantity FROM part_locations pl JOIN locations l ON l.id = pl.location_id
+        WHERE pl.part_id = ? AND pl.quantity != 0 ORDER BY pl.quantity DESC, l.code
+    """, (row[0],))
+    unlocated = (row[1] or 0) - sum(qty for _, _, qty in rows)
+    return rows + [(None, None, unlocated)] if unlocated else rows
+
+def location_totals(zone=None, after="", limit=-1):
+    """Raf koduna göre raflar ve stokları: [(raf, bölge, parça sayısı, miktar)]."""
+    return DB.fetchall(f"""
+        SELECT l.code, l.zone, COUNT(pl.part_id), COALESCE(SUM(pl.quantity), 0)
+        FROM locations l LEFT JOIN part_locations pl ON pl.location_id = l.id AND pl.quantity != 0
+        WHERE l.code > ? {"AND l.zone = ?" if zone is not None else ""}
+        GROUP BY l.id ORDER BY l.code LIMIT ?
+    """, (after, *(() if zone is None else (zone,)), limit))
+
+def zone_totals():
+    """Bölge başına stok: [(bölge, raf sayısı, parça sayısı, miktar)]; rafsız stok bölge None ile en sonda."""
+    rows = DB.fetchall("""
+        SELECT l.zone, COUNT(DISTINCT pl.location_id), COUNT(DISTINCT pl.part_id), SUM(pl.quantity)
+        FROM part_locations pl JOIN locations l ON l.id = pl.location_id
+        WHERE pl.quantity != 0 GROUP BY l.zone ORDER BY l.zone
+    """)
+    unlocated = DB.fetchone("""
+        SELECT COUNT(*), SUM(rest) FROM (
+            SELECT p.quantity - COALESCE((SELECT SUM(quantity) FROM part_locations WHERE part_id = p.id), 0) AS rest
+            FROM parts p
+        ) WHERE rest != 0
+    """)
+    return rows + [(None, 0, unlocated[0], unlocated[1])] if unlocated[0] else rows
+
+def remove_movement(movement_id):
+    """Hareketi siler, parçanın bakiyelerini yeniden hesaplar; Creator'dan silmeyi kuyruğa alır.
+
+    Hareket yoksa False döner.
+    """
+    with DB.write() as cursor:
+        cursor.execute("SELECT part_id, creator_id FROM stock_movements WHERE id=?", (movement_id,))
+        result = cursor.fetchone()
+        if not result:
+            return False
+
+        part_id, movement_creator_id = result
+        cursor.execute("DELETE FROM stock_movements WHERE id=?", (movement_id,))
+        DB.mark_changed("stock_movements", [movement_id])
+        # Sonraki bakiyeler (ve sonraki sayımların farkı) defterden yeniden hesaplanır
+        rebuild_part_balances(cursor, [part_id])
+        cancel_outbox(cursor, "stock_movements", movement_id)
+
+        # --- Creator’a otomatik silme (arka planda) ---
+        if movement_creator_id:
+            enqueue_outbox(cursor, "Stock_Movements", method="DELETE", record_id=movement_creator_id)
+    OUTBOX.notify()
+    return True
+
+def _fold_ledger(cursor, part_ids=None, boundaries=()):
+    """Defteri parça parça baştan katlar.
+
+    Her parça için (part_id, son bakiye, değişen satırlar, {snapshot_at: bakiye},
+    {raf id: miktar}) üretir; değişen satırlar executemany'ye hazır (quantity,
+    balance_after, id) biçimindedir. Rafsız hareketler parçanın şimdiki varsayılan rafına sayılır.
+    """
+    sql = """SELECT part_id, id, movement_type, quantity, counted_qty, balance_after, date, location_id, to_location_id
+             FROM stock_movements"""
+    params = ()
+    if part_ids is not None:
+        sql += " WHERE part_id IN (SELECT value FROM json_each(?))"
+        params = (json.dumps(list(part_ids)),)
+    boundaries = sorted(boundaries)
+    defaults = dict(cursor.connection.execute("SELECT id, location_id FROM parts WHERE location_id IS NOT NULL"))
+    rows = cursor.connection.execute(sql + " ORDER BY part_id, date, id", params)
+    for part_id, group in groupby(rows, key=itemgetter(0)):
+        balance, changed, at_boundary, b, seen, buckets = 0, [], {}, 0, False, {}
+        default = defaults.get(part_id)
+        for _, movement_id, movement_type, quantity, counted, stored_balance, date, location_id, to_location_id in group:
+            # Bu hareketten önce kapanan görüntüler önceki bakiyeyi alır; ilk hareketten öncekiler yazılmaz
+            while b < len(boundaries) and boundaries[b] < (date or ""):
+                if seen:
+                    at_boundary[boundaries[b]] = balance
+                b += 1
+            seen = True
+            new_quantity, balance = ledger_step_at(
+                buckets, balance, movement_type, quantity, counted,
+                default if location_id is None else location_id, to_location_id,
+                part_count=movement_type == "Sayım" and location_id is None)
+            if new_quantity != quantity or balance != stored_balance:
+                changed.append((new_quantity, balance, movement_id))
+        for boundary in boundaries[b:]:
+            at_boundary[boundary] = balance
+        yield part_id, balance, changed, at_boundary, buckets
+
+def rebuild_part_balances(cursor, part_ids=None):
+    """balance_after, parts.quantity, raf bakiyeleri ve anlık görüntüleri defterden yeniden yazar.
+
+    part_ids verilmezse hareketi olan tüm parçalar işlenir; verilen parçalardan
+    hareketi kalmayanların stoğu sıfırlanır. {part_id: bakiye} döner.
+    """
+    cursor.execute("SELECT DISTINCT snapshot_at FROM stock_snapshots")
+    boundaries = [row[0] for row in cursor.fetchall()]
+    balances, changed, snapshots, locations = {}, [], [], []
+    for part_id, balance, rows, at_boundary, buckets in _fold_ledger(cursor, part_ids, boundaries):
+        balances[part_id] = balance
+        changed.extend(rows)
+        snapshots.extend((at, part_id, qty) for at, qty in at_boundary.items())
+        locations.extend((part_id, location_id, qty) for location_id, qty in buckets.items()
+                         if location_id is not None and qty)
+    for part_id in part_ids or ():
+        balances.setdefault(part_id, 0)
+
+    cursor.executemany("UPDATE stock_movements SET quantity=?, balance_after=? WHERE id=?", changed)
+    DB.mark_changed("stock_movements", [movement_id for _, _, movement_id in changed])
+    cursor.executemany("UPDATE parts SET quantity=? WHERE id=? AND quantity IS NOT ?",
+                       [(qty, part_id, qty) for part_id, qty in balances.items()])
+    if part_ids is None:
+        cursor.execute("DELETE FROM stock_snapshots")
+        cursor.execute("DELETE FROM part_locations")
+    else:
+        for table in ("stock_snapshots", "part_locations"):
+            cursor.execute(f"DELETE FROM {table} WHERE part_id IN (SELECT value FROM json_each(?))",
+                           (json.dumps(list(part_ids)),))
+    cursor.executemany("INSERT INTO stock_snapshots (snapshot_at, part_id, quantity) VALUES (?, ?, ?)", snapshots)
+    cursor.executemany("INSERT INTO part_locations (part_id, location_id, quantity) VALUES (?, ?, ?)", locations)
+    refresh_shelf_text(cursor, balances)
+    return balances
+
+def verify_stock_ledger(repair=False):
+    """Defteri yeniden katlayıp parts.quantity ve balance_after ile karşılaştırır.
+
+    ([(kod, parts.quantity, defter bakiyesi)], bayat balance_after satır sayısı)
+    döner; raf bakiyesi farkları "kod@raf" koduyla listelenir. repair=True ise tüm
+    önbellekler defterden yeniden yazılır.
+    """
+    with DB.write() if repair else nullcontext(DB.connection().cursor()) as cursor:
+        cursor.execute("SELECT id, code, quantity FROM parts")
+        parts = {part_id: (code, qty or 0) for part_id, code, qty in cursor.fetchall()}
+        cursor.execute("SELECT part_id, location_id, quantity FROM part_locations WHERE quantity != 0")
+        stored = {(part_id, location_id): qty for part_id, location_id, qty in cursor.fetchall()}
+        ledger, ledger_locations, stale = {}, {}, 0
+        for part_id, balance, changed, _, buckets in _fold_ledger(cursor):
+            ledger[part_id] = balance
+            stale += len(changed)
+            ledger_locations.update(((part_id, location_id), qty) for location_id, qty in buckets.items()
+                                    if location_id is not None and qty)
+        mismatches = [(code, qty, ledger.get(part_id, 0)) for part_id, (code, qty) in parts.items()
+                      if qty != ledger.get(part_id, 0)]
+        cursor.execute("SELECT id, code FROM locations")
+        location_codes = dict(cursor.fetchall())
+        mismatches.extend((f"{parts[part_id][0]}@{location_codes[location_id]}", stored.get(key, 0),
+                           ledger_locations.get(key, 0))
+                          for key in stored.keys() | ledger_locations.keys()
+                          if stored.get(key, 0) != ledger_locations.get(key, 0)
+                          for part_id, location_id in (key,))
+        mismatches.sort()
+        if repair:
+            rebuild_part_balances(cursor, list(parts))
+            rebuild_reservations(cursor)
+    return mismatches, stale
+
+def _stock_levels_at(cursor, at):
+    # En yakın görüntü + (görüntü, at] aralığında hareketi olan parçaların son bakiyesi
+    cursor.execute("SELECT MAX(snapshot_at) FROM stock_snapshots WHERE snapshot_at <= ?", (at,))
+    base = cursor.fetchone()[0]
+    levels = {}
+    if base:
+        cursor.execute("SELECT part_id, quantity FROM stock_snapshots WHERE snapshot_at = ?", (base,))
+        levels.update(cursor.fetchall())
+    cursor.execute("""
+        SELECT part_id, balance_after FROM (
+            SELECT part_id, balance_after,
+                   ROW_NUMBER() OVER (PARTITION BY part_id ORDER BY date DESC, id DESC) AS rn
+            FROM stock_movements WHERE date > ? AND date <= ?
+        ) WHERE rn = 1
+    """, (base or "", at))
+    levels.update(cursor.fetchall())
+    return levels
+
+def stock_levels_at(at):
+    """Verilen andaki tüm parça stokları: {parça kodu: miktar}."""
+    cursor = DB.connection().cursor()
+    levels = _stock_levels_at(cursor, ledger_time(at))
+    cursor.execute("SELECT id, code FROM parts")
+    codes = dict(cursor.fetchall())
+    return {codes[part_id]: qty for part_id, qty in levels.items() if part_id in codes}
+
+def stock_levels_page(at, after="", limit=100):
+    """Verilen andaki stokların koda göre bir sayfası: [(kod, miktar)].
+
+    Parçalar kod indeksinde after'dan sonra LIMIT ile okunur; her birinin bakiyesi
+    (part_id, date, id) indeksinde tek aramayla bulunur. O ana kadar hareketi
+    olmayan parçalar atlanır.
+    """
+    return DB.fetchall("""
+        SELECT code, quantity FROM (
+            SELECT p.code, (SELECT s.balance_after FROM stock_movements s
+                            WHERE s.part_id = p.id AND s.date <= ?
+                            ORDER BY s.date DESC, s.id DESC LIMIT 1) AS quantity
+            FROM parts p WHERE p.code > ?
+        ) WHERE quantity IS NOT NULL ORDER BY code LIMIT ?
+    """, (ledger_time(at), after, limit))
+
+def stock_at(code, at):
+    """Tek parçanın verilen andaki stoğu; (part_id, date, id) indeksinde tek arama."""
+    row = DB.fetchone("""
+        SELECT s.balance_after FROM stock_movements s JOIN parts p ON p.id = s.part_id
+        WHERE p.code = ? AND s.date <= ?
+        ORDER BY s.date DESC, s.id DESC LIMIT 1
+    """, (code, ledger_time(at)))
+    return row[0] if row else 0
+
+def take_stock_snapshot(cursor, at):
+    at = ledger_time(at)
+    levels = _stock_levels_at(cursor, at)
+    cursor.executemany("INSERT OR REPLACE INTO stock_snapshots (snapshot_at, part_id, quantity) VALUES (?, ?, ?)",
+                       [(at, part_id, qty) for part_id, qty in levels.items()])
+    return len(levels)
+
+def ensure_monthly_snapshots(now=None):
+    """Tamamlanmış her ay için eksik ay sonu görüntüsünü alır; alınan görüntü sayısını döner."""
+    first = DB.fetchone("SELECT MIN(date) FROM stock_movements")[0]
+    if not first:
+        return 0
+    existing = {row[0] for row in DB.fetchall("SELECT DISTINCT snapshot_at FROM stock_snapshots")}
+    now = now or datetime.utcnow()
+    year, month = int(first[:4]), int(first[5:7])
+    taken = 0
+    while (year, month) < (now.year, now.month):
+        year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        at = ledger_time(datetime(year, month, 1) - timedelta(seconds=1))
+        if at not in existing:
+            # Her görüntü bir öncekinin üzerine kurulur; sırayla ve ayrı transaction'larda alınır
+            with DB.write() as cursor:
+                take_stock_snapshot(cursor, at)
+            taken += 1
+    return taken
+
+MAINTENANCE_INTERVAL = 3600  # saniye; ay sonu görüntüleri ve eski kayıt temizliği aralığı (0: yalnızca açılışta)
+
+def start_background_services():
+    """Outbox işçilerini, açılış çekmesini ve bakım işlerini arka planda başlatır.
+
+    Uzun süre açık kalan süreçler run_maintenance'ı MAINTENANCE_INTERVAL'da bir tekrar çağırmalıdır.
+    """
+    # Creator gönderim kuyruğu arka planda
+    OUTBOX.start()
+    # Kapalıyken Creator'da olan değişiklikleri arka planda yakala
+    threading.Thread(target=pull_in_background, daemon=True).start()
+    threading.Thread(target=maintenance_in_background, daemon=True).start()
+
+def run_maintenance():
+    """Tamamlanan ayların stok görüntülerini alır (geçmiş tarihli stok sorguları için),
+    süresi dolan Creator kayıt önbelleğini ve eski webhook anahtarlarını siler."""
+    purge_creator_records()
+    purge_webhook_events()
+    taken = ensure_monthly_snapshots()
+    if taken:
+        print(f"{taken} ay sonu stok görüntüsü alındı.")
+
+def maintenance_in_background():
+    try:
+        run_maintenance()
+    except Exception as e:
+        print("⚠️ Bakım işleri çalıştırılamadı:", e)
+    finally:
+        DB.close_thread_connection()
+
+# --------------------
+OUTBOX_WORKERS = 3
+OUTBOX_MAX_ATTEMPTS = 10
+OUTBOX_BASE_BACKOFF = 2      # saniye
+OUTBOX_MAX_BACKOFF = 300     # saniye
+OUTBOX_POLL_INTERVAL = 5     # saniye
+
+SYNC_STATUS_LABELS = {"pending": "Bekliyor", "synced": "Gönderildi", "failed": "Hata", "local": "Yerel"}
+
+def sync_status_label(sync_status, creator_id=None):
+    """Tablolarda gösterilecek senkron durumu metni."""
+    if sync_status:
+        return SYNC_STATUS_LABELS.get(sync_status, sync_status)
+    # Kuyruktan önceki kayıtlar: creator_id varsa gönderilmiş say
+    return SYNC_STATUS_LABELS["synced"] if creator_id else "-"
+
+def enqueue_outbox(cursor, form_name, payload=None, method="POST", record_id=None,
+                   target_table=None, target_id=None, part_id=None):
+    """Creator gönderimini çağıranın transaction'ı içinde kuyruğa ekler.
+
+    method="BATCH" toplu eklemedir: payload {"records": [...], "target_ids": [...]}
+    biçimindedir ve en fazla CREATOR_BATCH_LIMIT kayıt taşır.
+    Commit'ten sonra OUTBOX.notify() çağrılmalıdır.
+    """
+    cursor.execute(
+        """INSERT INTO outbox (form_name, method, payload, record_id, target_table, target_id, part_id)
+           VALUES (?, ?, ?, ?, ?, ?, ?)""",
+        (form_name, method, json.dumps(payload, ensure_ascii=False) if payload is not None else None,
+         record_id, target_table, target_id, part_id)
+    )
+    job_id = cursor.lastrowid
+    if target_table and target_id is not None:
+        cursor.execute(f"UPDATE {target_table} SET sync_status='pending' WHERE id=?", (target_id,))
+    # Creator bu kaydı webhook ile geri gönderdiğinde ikinci kez uygulanmasın
+    if form_name in WEBHOOK_KINDS_BY_FORM:
+        if method == "POST":
+            register_idempotency_key(cursor, WEBHOOK_KINDS_BY_FORM[form_name], payload)
+        elif method == "BATCH":
+            for record in payload["records"]:
+                register_idempotency_key(cursor, WEBHOOK_KINDS_BY_FORM[form_name], record)
+    return job_id
+
+def cancel_outbox(cursor, target_table, target_id):
+    """Silinen yerel kayıt için henüz gönderilmemiş işleri iptal eder."""
+    cursor.execute(
+        "DELETE FROM outbox WHERE target_table=? AND target_id=? AND status='pending'",
+        (target_table, target_id)
+    )
+
+def retry_failed_outbox():
+    """Hata durumundaki işleri yeniden kuyruğa alır."""
+    with DB.write() as cursor:
+        cursor.execute("UPDATE outbox SET status='pending', attempts=0, next_attempt_at=0 WHERE status='failed'")
+        count = cursor.rowcount
+        for table in ("stock_movements", "work_orders"):
+            cursor.execute(f"""UPDATE {table} SET sync_status='pending'
+                               WHERE id IN (SELECT target_id FROM outbox
+                                            WHERE target_table=? AND status='pending')
+                                  OR id IN (SELECT j.value FROM outbox o, json_each(o.payload, '$.target_ids') j
+                                            WHERE o.target_table=? AND o.method='BATCH' AND o.status='pending')""",
+                           (table, table))
+            if cursor.rowcount:
+                DB.mark_changed(table)
+    OUTBOX.notify()
+    return count
+
+def outbox_counts():
+    return dict(DB.fetchall("SELECT status, COUNT(*) FROM outbox WHERE status != 'done' GROUP BY status"))
+
+class OutboxWorker:
+    """outbox tablosunu arka planda, tekrar deneme ve bekleme süresiyle boşaltan iş parçacığı havuzu."""
+
+    def __init__(self, workers=OUTBOX_WORKERS):
+        self.workers = workers
+        self.on_change = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self):
+        # Önceki çalışmada yarım kalan işler tekrar gönderilsin
+        with DB.write() as cursor:
+            cursor.execute("UPDATE outbox SET status='pending' WHERE status='in_progress'")
+        self._stop.clear()
+        for i in range(self.workers):
+            t = threading.Thread(target=self._run, name=f"outbox-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def stop(self, timeout=5):
+        self._stop.set()
+        self._wake.set()
+        for t in self._threads:
+            t.join(timeout)
+        self._threads = []
+
+    def notify(self):
+        self._wake.set()
+
+    def _claim(self):
+        with DB.write() as cursor:
+            cursor.execute("""
+                SELECT id, form_name, method, payload, record_id, target_table, target_id, part_id, attempts
+                FROM outbox
+                WHERE status='pending' AND next_attempt_at <= ?
+                ORDER BY id ASC LIMIT 1
+            """, (time(),))
+            job = cursor.fetchone()
+            if job:
+                cursor.execute("UPDATE outbox SET status='in_progress' WHERE id=?", (job[0],))
+            return job
+
+    def _run(self):
+        while not self._stop.is_set():
+            job = self._claim()
+            if job is None:
+                self._wake.wait(OUTBOX_POLL_INTERVAL)
+                self._wake.clear()
+                continue
+            self._process(job)
+
+    def _process(self, job):
+        job_id, form_name, method, payload, record_id, target_table, target_id, part_id, attempts = job
+        if method == "BATCH":
+            self._process_batch(job)
+            return
+        try:
+            if method == "DELETE":
+                success = delete_from_creator(form_name, record_id)
+                res = None if success else "Creator silme başarısız"
+            else:
+                data = json.loads(payload) if payload else {}
+                success, res = send_to_creator(form_name, data, method=method, record_id=record_id)
+        except Exception as e:
+            success, res = False, f"outbox hata: {e}"
+
+        with DB.write() as cursor:
+            if success:
+                new_creator_id = extract_record_id_from_data(res) if method != "DELETE" else None
+                cursor.execute("UPDATE outbox SET status='done', attempts=?, last_error=NULL WHERE id=?",
+                               (attempts + 1, job_id))
+                if target_table and method != "DELETE":
+                    if new_creator_id:
+                        cursor.execute(f"UPDATE {target_table} SET creator_id=?, sync_status='synced' WHERE id=?",
+                                       (new_creator_id, target_id))
+                    else:
+                        cursor.execute(f"UPDATE {target_table} SET sync_status='synced' WHERE id=?", (target_id,))
+                if new_creator_id and form_name in WEBHOOK_KINDS_BY_FORM:
+                    register_idempotency_key(cursor, WEBHOOK_KINDS_BY_FORM[form_name], {"ID": new_creator_id})
+                # Parça için creator_id boşsa ekle
+                if part_id and new_creator_id:
+                    cursor.execute("UPDATE parts SET creator_id=? WHERE id=? AND creator_id IS NULL",
+                                   (new_creator_id, part_id))
+            else:
+                attempts += 1
+                if attempts >= OUTBOX_MAX_ATTEMPTS:
+                    cursor.execute("UPDATE outbox SET status='failed', attempts=?, last_error=? WHERE id=?",
+                                   (attempts, str(res), job_id))
+                    if target_table and method != "DELETE":
+                        cursor.execute(f"UPDATE {target_table} SET sync_status='failed' WHERE id=?", (target_id,))
+                else:
+                    delay = min(OUTBOX_MAX_BACKOFF, OUTBOX_BASE_BACKOFF * 2 ** (attempts - 1))
+                    delay *= random.uniform(0.8, 1.2)
+                    cursor.execute(
+                        "UPDATE outbox SET status='pending', attempts=?, next_attempt_at=?, last_error=? WHERE id=?",
+                        (attempts, time() + delay, str(res), job_id)
+                    )
+                print(f"⚠️ outbox id={job_id} ({form_name}) gönderilemedi, deneme {attempts}: {res}")
+            if target_table and method != "DELETE":
+                DB.mark_changed(target_table, [target_id])
+
+        if self.on_change:
+            self.on_change()
+
+    def _process_batch(self, job):
+        # Toplu ekleme: başarılı kayıtlar işlenir, başarısızlar aynı işte bekleme süresiyle yeniden denenir
+        job_id, form_name, method, payload, record_id, target_table, target_id, part_id, attempts = job
+        data = json.loads(payload)
+        records, target_ids = data["records"], data["target_ids"]
+        # Kuyruktayken silinen yerel kayıtlar gönderilmesin
+        alive = {row[0] for row in DB.fetchall(
+            f"SELECT id FROM {target_table} WHERE id IN (SELECT value FROM json_each(?))", (json.dumps(target_ids),))}
+        pairs = [(rec, tid) for rec, tid in zip(records, target_ids) if tid in alive]
+        try:
+            success, res = send_batch_to_creator(form_name, [rec for rec, _ in pairs])
+        except Exception as e:
+            success, res = False, f"outbox hata: {e}"
+
+        done, remaining, error = [], [], res
+        if success:
+            # Yanıtta sonucu olmayan kayıtlar da başarısız sayılır
+            results = res + [(False, "Creator yanıtında sonuç yok")] * (len(pairs) - len(res))
+            for (rec, tid), (ok, value) in zip(pairs, results):
+                if ok:
+                    done.append((value, tid))
+                else:
+                    remaining.append((rec, tid))
+                    error = value
+        else:
+            remaining = pairs
+
+        with DB.write() as cursor:
+            cursor.executemany(f"UPDATE {target_table} SET creator_id=COALESCE(?, creator_id), sync_status='synced' "
+                               f"WHERE id=?", done)
+            if form_name in WEBHOOK_KINDS_BY_FORM:
+                for new_creator_id, _ in done:
+                    if new_creator_id:
+                        register_idempotency_key(cursor, WEBHOOK_KINDS_BY_FORM[form_name], {"ID": new_creator_id})
+            if not remaining:
+                cursor.execute("UPDATE outbox SET status='done', attempts=?, last_error=NULL WHERE id=?",
+                               (attempts + 1, job_id))
+            else:
+                attempts += 1
+                payload = json.dumps({"records": [rec for rec, _ in remaining],
+                                      "target_ids": [tid for _, tid in remaining]}, ensure_ascii=False)
+                if attempts >= OUTBOX_MAX_ATTEMPTS:
+                    cursor.execute("UPDATE outbox SET status='failed', attempts=?, payload=?, last_error=? WHERE id=?",
+                                   (attempts, payload, str(error), job_id))
+                    cursor.executemany(f"UPDATE {target_table} SET sync_status='failed' WHERE id=?",
+                                       [(tid,) for _, tid in remaining])
+                else:
+                    delay = min(OUTBOX_MAX_BACKOFF, OUTBOX_BASE_BACKOFF * 2 ** (attempts - 1))
+                    delay *= random.uniform(0.8, 1.2)
+                    cursor.execute(
+                        """UPDATE outbox SET status='pending', attempts=?, payload=?, next_attempt_at=?, last_error=?
+                           WHERE id=?""",
+                        (attempts, payload, time() + delay, str(error), job_id)
+                    )
+                print(f"⚠️ outbox id={job_id} ({form_name}) {len(remaining)}/{len(records)} kayıt gönderilemedi, "
+                      f"deneme {attempts}: {error}")
+            DB.mark_changed(target_table, [tid for _, tid in done + remaining])
+
+        if self.on_change:
+            self.on_change()
+
+OUTBOX = OutboxWorker()
+METRICS.gauge("depo_outbox_records", outbox_counts, label="status")
+
+# --------------------
+# Toplu Senkronizasyon
+# --------------------
+SYNC_BATCH_SIZE = CREATOR_BATCH_LIMIT
+SYNC_MAX_IN_FLIGHT = 4  # aynı anda Creator'a giden en fazla istek grubu
+
+def _part_payload(code, qty, shelf):
+    return {
+        "Part_Code": code,
+        "Available_Quantity": int(qty),
+        "Shelf_Location": shelf or ""
+    }
+
+AUTO_SYNC_INTERVAL = 300   # saniye; değişen parçalar bu aralıkla kendiliğinden gönderilir (0: kapalı)
+
+def dirty_part_count():
+    """Creator'a gönderilmemiş değişikliği olan parça sayısı (kısmi indeksle okunur)."""
+    return DB.fetchone("SELECT COUNT(*) FROM parts WHERE version > synced_version")[0]
+
+METRICS.gauge("depo_dirty_parts", dirty_part_count)
+
+def push_parts_to_creator(form_link_name="Stock", progress=None, only_dirty=True):
+    """parts tablosunu Creator'a parça parça değil, gruplar halinde gönderir.
+
+    Varsayılan olarak yalnızca son başarılı gönderimden beri değişen parçalar
+    (version > synced_version) gönderilir; hiçbir şey değişmediyse istek atılmaz.
+    Creator'da karşılığı olmayan parçalar çoklu kayıt ekleme ile gönderilir,
+    karşılığı olanlar aynı havuzda eşzamanlı olarak güncellenir.
+    progress(gönderilen, toplam) her grup bittiğinde çağrılır.
+    (başarılı, hatalı) sayılarını döner.
+    """
+    where = "WHERE version > synced_version" if only_dirty else ""
+    parts = DB.fetchall(f"SELECT id, code, quantity, shelf, creator_id, version FROM parts {where}")
+
+    inserts = [p for p in parts if not p[4]]
+    updates = [p for p in parts if p[4]]
+    total = len(parts)
+
+    def add_chunk(chunk):
+        success, res = send_batch_to_creator(form_link_name, [_part_payload(c, q, s) for _, c, q, s, _, _ in chunk])
+        if not success:
+            print("⚠️ Toplu ekleme hatası:", res)
+            return len(chunk), [], []
+        new_ids = []
+        synced = []
+        for (part_id, *_, version), (ok, new_id) in zip(chunk, res):
+            if ok and new_id:
+                new_ids.append((new_id, part_id))
+                synced.append((version, part_id))
+        return len(chunk) - len(new_ids), new_ids, synced
+
+    def update_chunk(chunk):
+        failed = 0
+        synced = []
+        for part_id, code, qty, shelf, creator_id, version in chunk:
+            success, res = send_to_creator(form_link_name, _part_payload(code, qty, shelf),
+                                           method="PUT", record_id=creator_id)
+            if success:
+                synced.append((version, part_id))
+            else:
+                failed += 1
+                print(f"⚠️ {code} güncellenemedi:", res)
+        return failed, [], synced
+
+    jobs = []
+    for i in range(0, len(inserts), SYNC_BATCH_SIZE):
+        jobs.append((add_chunk, inserts[i:i + SYNC_BATCH_SIZE]))
+    for i in range(0, len(updates), SYNC_BATCH_SIZE):
+        jobs.append((update_chunk, updates[i:i + SYNC_BATCH_SIZE]))
+
+    done = failed = 0
+    if progress:
+        progress(0, total)
+    with ThreadPoolExecutor(max_workers=SYNC_MAX_IN_FLIGHT) as pool:
+        futures = {pool.submit(fn, chunk): len(chunk) for fn, chunk in jobs}
+        for future in as_completed(futures):
+            chunk_failed, new_ids, synced = future.result()
+            with DB.write() as cursor:
+                cursor.executemany("UPDATE parts SET creator_id=? WHERE id=?", new_ids)
+                # Gönderilen sürümü işaretle; bu arada değişen parça kirli kalır
+                cursor.executemany("UPDATE parts SET synced_version=? WHERE id=? AND synced_version < ?",
+                                   [(version, part_id, version) for version, part_id in synced])
+            done += futures[future]
+            failed += chunk_failed
+            if progress:
+                progress(done, total)
+    return total - failed, failed
+
+# --------------------
+# Creator'dan Çekme (Pull Sync)
+# --------------------
+PULL_PAGE_SIZE = 200        # Creator rapor API'sinde sayfa başına en fazla kayıt
+PULL_MAX_IN_FLIGHT = 4      # aynı anda istenen sayfa sayısı
+CREATOR_DATETIME_FORMAT = "%d-%b-%Y %H:%M:%S"
+CREATOR_TIMEZONE = os.environ.get("DEPO_CREATOR_TZ")  # ör. "Europe/Istanbul"; boşsa bu makinenin yerel saati
+
+# Çekilen raporlar (işlenme sırasına göre): rapor adı -> olay türü
+# Hareketler stoklardan önce: Creator'daki stok, yerel defterle farkı kalırsa sayım olarak işlenir
+PULL_REPORTS = (
+    ("All_Stock_Movements", "stock_movement"),
+    ("All_Stocks", "stock"),
+    ("All_Work_Orders", "work_order"),
+)
+
+def parse_creator_datetime(value):
+    """Creator'dan gelen tarih metnini datetime'a çevirir; çözülemezse None."""
+    for fmt in (CREATOR_DATETIME_FORMAT, "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d %H:%M:%S"):
+        try:
+            return datetime.strptime(str(value).strip(), fmt)
+        except ValueError:
+            continue
+    return None
+
+def creator_time_to_utc(value):
+    """Creator'ın yerel saatindeki datetime'ı defterin kullandığı UTC'ye (saat dilimsiz) çevirir."""
+    local = value.replace(tzinfo=ZoneInfo(CREATOR_TIMEZONE)) if CREATOR_TIMEZONE else value.astimezone()
+    return local.astimezone(timezone.utc).replace(tzinfo=None)
+
+def creator_ledger_time(value):
+    """Creator'ın Date_Time metnini UTC defter zamanına çevirir; çözülemezse None."""
+    event_time = parse_creator_datetime(value)
+    return ledger_time(creator_time_to_utc(event_time)) if event_time else None
+
+def fetch_creator_report_page(report_name, criteria, start, limit=PULL_PAGE_SIZE):
+    """Raporun bir sayfasını döner; kayıt kalmadıysa boş liste."""
+    url = f"{API_DOMAIN}/creator/v2/data/{OWNER_NAME}/{APP_LINK_NAME}/report/{report_name}"
+    params = {"from": start, "limit": limit}
+    if criteria:
+        params["criteria"] = criteria
+    resp = _creator_request("GET", url, f"report/{report_name}", params=params)
+    if resp is None:
+        raise RuntimeError("Token alınamadı.")
+    if resp.status_code == 404:
+        return []
+    if resp.status_code != 200:
+        raise RuntimeError(f"{report_name} okunamadı: {resp.status_code}, {resp.text}")
+    body = resp.json()
+    if body.get("code") == 3100:  # kayıt yok
+        return []
+    return body.get("data", [])
+
+def fetch_creator_report_since(report_name, since=None):
+    """since'ten beri değişen kayıtları, sayfaları eşzamanlı isteyerek toplar."""
+    criteria = f'Modified_Time >= "{since}"' if since else None
+    records = []
+    start = 1
+    with ThreadPoolExecutor(max_workers=PULL_MAX_IN_FLIGHT) as pool:
+        while True:
+            starts = [start + i * PULL_PAGE_SIZE for i in range(PULL_MAX_IN_FLIGHT)]
+            pages = list(pool.map(lambda s: fetch_creator_report_page(report_name, criteria, s), starts))
+            for page in pages:
+                records.extend(page)
+            if any(len(page) < PULL_PAGE_SIZE for page in pages):
+                return records
+            start = starts[-1] + PULL_PAGE_SIZE
+
+def _pending_part_codes(cursor):
+    """Creator'a henüz gönderilmemiş yerel değişikliği olan parça kodları."""
+    # Toplu (BATCH) işlerde kodlar payload'ın records dizisindedir
+    cursor.execute("""
+        SELECT json_extract(payload, '$.Part_Code') FROM outbox
+        WHERE status IN ('pending', 'in_progress') AND form_name IN ('Stocks', 'Stock', 'Stock_Movements')
+          AND method != 'BATCH'
+        UNION
+        SELECT json_extract(r.value, '$.Part_Code') FROM outbox o, json_each(o.payload, '$.records') r
+        WHERE o.status IN ('pending', 'in_progress') AND o.form_name IN ('Stocks', 'Stock', 'Stock_Movements')
+          AND o.method = 'BATCH'
+    """)
+    return {row[0] for row in cursor.fetchall()}
+
+def _ensure_part(cursor, code):
+    cursor.execute("INSERT OR IGNORE INTO parts (code, description, quantity, shelf) VALUES (?, '', 0, '')", (code,))
+    cursor.execute("SELECT id FROM parts WHERE code = ?", (code,))
+    return cursor.fetchone()[0]
+
+def _upsert_pulled_stocks(cursor, records):
+    # Yerelde gönderilmeyi bekleyen değişiklik varsa Creator'daki eski değer onu ezmesin: kuyruktaki
+    # işler ve henüz push edilmemiş (version > synced_version) parçalar atlanır, push onları gönderir
+    pending = _pending_part_codes(cursor)
+    count = 0
+    for rec in records:
+        code = str(rec.get("Part_Code", "")).strip()
+        if not code or code in pending:
+            continue
+        cursor.execute("SELECT version > synced_version FROM parts WHERE code = ?", (code,))
+        dirty = cursor.fetchone()
+        if dirty and dirty[0]:
+            continue
+        quantity = int(float(rec.get("Available_Quantity") or 0))
+        shelf = (rec.get("Shelf_Location") or "").strip()
+        part_id = _ensure_part(cursor, code)
+        cursor.execute("UPDATE parts SET creator_id=? WHERE id=?", (rec.get("ID"), part_id))
+        # Raf özeti (parts.shelf) raf bakiyelerinden türetilir; Creator'daki tek raf yalnızca
+        # varsayılan rafı olmayan parçaya varsayılan olarak alınır
+        if shelf and not any(c in shelf for c in ",("):
+            states = _part_buckets(cursor, [part_id])
+            if states[part_id][0] is None:
+                _adopt_location(cursor, part_id, states[part_id], _ensure_location(cursor, shelf))
+                _save_part_locations(cursor, states)
+                refresh_shelf_text(cursor, [part_id])
+        cursor.execute("SELECT quantity FROM parts WHERE id=?", (part_id,))
+        # Stok yalnızca defterden değişir: Creator'daki farklı değer bir sayım hareketi olarak işlenir
+        if cursor.fetchone()[0] != quantity:
+            record_movement(cursor, part_id, "Sayım", counted=quantity, sync_status="synced")
+        # Creator'la eşitlenen (önceden temiz) parça tekrar gönderilmesin
+        cursor.execute("UPDATE parts SET synced_version = version WHERE id = ?", (part_id,))
+        count += 1
+    return count
+
+def _upsert_pulled_movements(cursor, records):
+    count, creator_ids = 0, []
+    for rec in records:
+        code = str(rec.get("Part_Code", "")).strip()
+        movement = WEBHOOK_MOVEMENT_MAP.get(str(rec.get("Movement", "")).strip().lower())
+        if not code or movement is None or not rec.get("ID"):
+            continue
+        quantity = int(float(rec.get("Added_Removed") or 0))
+        if movement != "Sayım":
+            quantity = abs(quantity)
+        stock = rec.get("Stock")
+        balance = int(float(stock)) if stock not in (None, "") else None
+        # Creator tarihi kendi yerel saatinde tutar; defter UTC'dir
+        date = creator_ledger_time(rec.get("Date_Time"))
+        counted = balance if movement == "Sayım" else None
+        if register_idempotency_key(cursor, "stock_movement", rec):
+            part_id = _ensure_part(cursor, code)
+            cursor.execute("""
+                INSERT INTO stock_movements (part_id, movement_type, quantity, counted_qty, creator_id, balance_after,
+                                             date, sync_status)
+                VALUES (?, ?, ?, ?, ?, ?, ?, 'synced')
+                ON CONFLICT(creator_id) WHERE creator_id IS NOT NULL DO UPDATE SET
+                    movement_type = excluded.movement_type, quantity = excluded.quantity,
+                    counted_qty = excluded.counted_qty, date = COALESCE(?, date)
+            """, (part_id, movement, quantity, counted, rec["ID"], balance, date or ledger_time(datetime.utcnow()),
+                  date))
+        else:
+            # Daha önce webhook veya kendi gönderimimizle gelmiş: yalnızca değişen alanları güncelle
+            cursor.execute("""
+                UPDATE stock_movements SET movement_type=?, quantity=?, counted_qty=?, date=COALESCE(?, date)
+                WHERE creator_id=?
+            """, (movement, quantity, counted, date, rec["ID"]))
+        creator_ids.append(rec["ID"])
+        count += 1
+    if count:
+        DB.mark_changed("stock_movements")
+    # Geçmiş tarihli hareketler araya girebilir; etkilenen parçaların bakiyeleri defterden yeniden hesaplanır
+    cursor.execute("SELECT DISTINCT part_id FROM stock_movements WHERE creator_id IN (SELECT value FROM json_each(?))",
+                   (json.dumps(creator_ids),))
+    part_ids = [row[0] for row in cursor.fetchall()]
+    if part_ids:
+        rebuild_part_balances(cursor, part_ids)
+    return count
+
+def _upsert_pulled_work_orders(cursor, records):
+    count = 0
+    for rec in records:
+        if not rec.get("ID"):
+            continue
+        values = (rec.get("Maintenance_Repair_Records", ""), rec.get("Required_Parts", ""),
+                  rec.get("Status_Information", ""))
+        if register_idempotency_key(cursor, "work_order", rec):
+            cursor.execute("""
+                INSERT INTO work_orders (records, required_parts, status, creator_id, sync_status)
+                VALUES (?, ?, ?, ?, 'synced')
+                ON CONFLICT(creator_id) WHERE creator_id IS NOT NULL DO UPDATE SET
+                    records = excluded.records, required_parts = excluded.required_parts, status = excluded.status
+            """, values + (rec["ID"],))
+        else:
+            cursor.execute("UPDATE work_orders SET records=?, required_parts=?, status=? WHERE creator_id=?",
+                           values + (rec["ID"],))
+        cursor.execute("SELECT id FROM work_orders WHERE creator_id=?", (rec["ID"],))
+        row = cursor.fetchone()
+        if row:
+            set_work_order_lines(cursor, row[0], values[1], values[2])
+        count += 1
+    if count:
+        DB.mark_changed("work_orders")
+    return count
+
+PULL_UPSERTS = {
+    "stock": _upsert_pulled_stocks,
+    "stock_movement": _upsert_pulled_movements,
+    "work_order": _upsert_pulled_work_orders,
+}
+
+def pull_from_creator(progress=None):
+    """Son çekmeden beri Creator'da değişen kayıtları yerel tablolara işler.
+
+    Her rapor kendi transaction'ında yazılır ve yüksek su işareti (en büyük
+    Modified_Time) aynı transaction'da güncellenir; yarıda kalan çekme bir
+    sonraki seferde kaldığı yerden devam eder. {rapor: işlenen kayıt} döner.
+    """
+    results = {}
+    for report_name, kind in PULL_REPORTS:
+        state_key = f"pull:{report_name}:modified_time"
+        row = DB.fetchone("SELECT value FROM sync_state WHERE key=?", (state_key,))
+        since = row[0] if row else None
+        records = fetch_creator_report_since(report_name, since)
+
+        high_water = parse_creator_datetime(since) if since else None
+        for rec in records:
+            modified = parse_creator_datetime(rec.get("Modified_Time"))
+            if modified and (high_water is None or modified > high_water):
+                high_water = modified
+
+        with DB.write() as cursor:
+            results[report_name] = PULL_UPSERTS[kind](cursor, records)
+            remember_creator_records(report_name, [rec.get("ID") for rec in records])
+            if high_water:
+                cursor.execute("INSERT OR REPLACE INTO sync_state (key, value) VALUES (?, ?)",
+                               (state_key, high_water.strftime(CREATOR_DATETIME_FORMAT)))
+        if progress:
+            progress(report_name, results[report_name])
+    return results
+
+def pull_in_background():
+    """Başlangıçta çağrılır; bağlantı yoksa uygulamayı durdurmadan yalnızca uyarır."""
+    try:
+        results = pull_from_creator()
+        print("Creator’dan değişiklikler alındı:", results)
+    except Exception as e:
+        print("⚠️ Creator’dan değişiklikler alınamadı:", e)
+    finally:
+        DB.close_thread_connection()
+
+# --------------------
+# Toplu İçe Aktarma (CSV / XLSX)
+# --------------------
+IMPORT_MAX_ERRORS = 50   # raporlanacak en fazla hatalı satır
+# Başlık adı (küçük harf) -> alan; Türkçe ve Creator alan adları kabul edilir
+IMPORT_HEADERS = {
+    "parça kodu": "code", "parca kodu": "code", "kod": "code", "part_code": "code", "code": "code",
+    "miktar": "quantity", "adet": "quantity", "quantity": "quantity", "added_removed": "quantity",
+    "hareket": "movement", "movement": "movement",
+    "raf": "shelf", "shelf": "shelf", "shelf_location": "shelf", "konum": "shelf", "location": "shelf",
+}
+
+def _read_import_rows(path):
+    """Dosyayı satır satır okur; (satır no, {alan: değer}) üretir."""
+    if path.lower().endswith(".xlsx"):
+        try:
+            from openpyxl import load_workbook
+        except ImportError:
+            raise ValueError("XLSX okumak için openpyxl gerekli (pip install openpyxl).")
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            header = [IMPORT_HEADERS.get(str(h or "").strip().lower()) for h in next(rows, ())]
+            for line, values in enumerate(rows, start=2):
+                yield line, {field: value for field, value in zip(header, values) if field}
+        finally:
+            workbook.close()
+        return
+
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        # Türkçe Excel CSV'yi ';' ile kaydeder
+        sample = f.read(4096)
+        f.seek(0)
+        try:
+            dialect = csv.Sniffer().sniff(sample, delimiters=",;\t")
+        except csv.Error:
+            dialect = csv.excel
+        reader = csv.reader(f, dialect)
+        header = [IMPORT_HEADERS.get(h.strip().lower()) for h in next(reader, [])]
+        for line, values in enumerate(reader, start=2):
+            yield line, {field: value for field, value in zip(header, values) if field}
+
+def _parse_movement_row(row, default_movement):
+    """İçe aktarma satırını veya API kaydını (kod, hareket, miktar, raf) olarak doğrular; hatalıysa ValueError."""
+    code = str(row.get("code") or "").strip()
+    if not code:
+        raise ValueError("parça kodu boş")
+    movement = default_movement
+    if movement is None and row.get("movement") in (None, ""):
+        raise ValueError("hareket (movement) alanı eksik")
+    if row.get("movement") not in (None, ""):
+        movement = WEBHOOK_MOVEMENT_MAP.get(str(row["movement"]).strip().lower())
+        if movement is None:
+            raise ValueError(f"bilinmeyen hareket: {row['movement']}")
+    quantity = _parse_quantity(row.get("quantity"))
+    shelf = str(row.get("shelf") or "").strip() or None
+    return code, movement, quantity, shelf
+
+def _parse_quantity(raw):
+    """Miktarı negatif olmayan tam sayıya çevirir ("12", "12,0", 12); değilse ValueError."""
+    try:
+        quantity = float(str(raw).strip().replace(",", "."))
+    except ValueError:
+        raise ValueError(f"hatalı miktar: {raw}")
+    if not math.isfinite(quantity) or quantity != int(quantity) or quantity < 0:
+        raise ValueError(f"hatalı miktar: {raw}")
+    return int(quantity)
+
+def import_movements(path, default_movement="Sayım"):
+    """CSV/XLSX dosyasındaki hareketleri tek transaction'da deftere yazar.
+
+    Önce tüm satırlar doğrulanır; hatalı satır varsa hiçbir şey yazılmaz.
+    Miktar, Sayım satırlarında sayılan miktar (raf verilmişse o raftaki, verilmemişse
+    parçanın toplamı), diğerlerinde harekettir. Creator'a
+    hareketler CREATOR_BATCH_LIMIT'lik toplu işlerle gider; parça stokları değişiklik
+    takibiyle (push_parts_to_creator) gönderilir.
+    {"rows": okunan, "imported": yazılan, "errors": [(satır, hata)]} döner.
+    """
+    rows, errors, invalid = [], [], 0
+    for line, row in _read_import_rows(path):
+        if not any(str(value or "").strip() for value in row.values()):
+            continue
+        try:
+            rows.append(_parse_movement_row(row, default_movement))
+        except ValueError as e:
+            invalid += 1
+            if len(errors) < IMPORT_MAX_ERRORS:
+                errors.append((line, str(e)))
+    if invalid or not rows:
+        return {"rows": len(rows) + invalid, "imported": 0, "errors": errors, "invalid": invalid}
+
+    dt_str = datetime.now().strftime(CREATOR_DATETIME_FORMAT)
+    movement_map = {"Giriş": "added", "Çıkış": "removed", "Sayım": "count"}
+    with DB.write() as cursor:
+        codes = sorted({code for code, _, _, _ in rows})
+        cursor.executemany("INSERT OR IGNORE INTO parts (code, description, quantity, shelf) VALUES (?, '', 0, '')",
+                           [(code,) for code in codes])
+        cursor.execute("SELECT code, id FROM parts WHERE code IN (SELECT value FROM json_each(?))",
+                       (json.dumps(codes),))
+        parts = dict(cursor.fetchall())
+        states = _part_buckets(cursor, parts.values())
+        locations = {shelf: _ensure_location(cursor, shelf) for shelf in {shelf for _, _, _, shelf in rows if shelf}}
+
+        # Bakiyeler (raf bakiyeleri dahil) bellekte katlanır; satırlar hazırlanmış tek INSERT ile yazılır
+        movements, payloads = [], []
+        for code, movement, quantity, shelf in rows:
+            part_id, location_id = parts[code], locations.get(shelf)
+            counted = quantity if movement == "Sayım" else None
+            quantity, counted, balance = _step_part(cursor, part_id, states[part_id], movement, quantity, counted,
+                                                    location_id)
+            movements.append((part_id, movement, quantity, counted, shelf if location_id else None, balance,
+                              location_id))
+            payloads.append({"Part_Code": code, "Added_Removed": quantity, "Stock": balance,
+                             "Movement": movement_map[movement], "Date_Time": dt_str})
+
+        cursor.execute("SELECT COALESCE(MAX(id), 0) FROM stock_movements")
+        last_id = cursor.fetchone()[0]
+        cursor.executemany(
+            """INSERT INTO stock_movements (part_id, movement_type, quantity, counted_qty, shelf, balance_after,
+                                            location_id, sync_status)
+               VALUES (?, ?, ?, ?, ?, ?, ?, 'pending')""", movements)
+        # AUTOINCREMENT id'leri ekleme sırasıyla artar; transaction boyunca başka yazan yok
+        cursor.execute("SELECT id FROM stock_movements WHERE id > ? ORDER BY id", (last_id,))
+        movement_ids = [row[0] for row in cursor.fetchall()]
+        DB.mark_changed("stock_movements", movement_ids)
+        cursor.executemany("UPDATE parts SET quantity=? WHERE id=?",
+                           [(balance, part_id) for part_id, (_, balance, _) in states.items()])
+        _save_part_locations(cursor, states)
+        refresh_shelf_text(cursor, states)
+        for start in range(0, len(payloads), CREATOR_BATCH_LIMIT):
+            enqueue_outbox(cursor, "Stock_Movements",
+                           {"records": payloads[start:start + CREATOR_BATCH_LIMIT],
+                            "target_ids": movement_ids[start:start + CREATOR_BATCH_LIMIT]},
+                           method="BATCH", target_table="stock_movements")
+    OUTBOX.notify()
+    return {"rows": len(rows), "imported": len(movement_ids), "errors": [], "invalid": 0}
+
+def import_summary(result):
+    if result["invalid"]:
+        first = "; ".join(f"satır {line}: {error}" for line, error in result["errors"][:3])
+        return f"{result['invalid']} hatalı satır, hiçbir kayıt yüklenmedi ({first})."
+    if not result["imported"]:
+        return "Dosyada yüklenecek satır yok."
+    return f"{result['imported']} hareket yüklendi, Creator'a gönderim kuyrukta."
+
+# --------------------
+# Dışa Aktarma (CSV / JSON Lines / Parquet)
+# --------------------
+EXPORT_CHUNK_SIZE = 10000   # imleçten tek seferde okunan satır (Parquet'te bir row group)
+EXPORT_FORMATS = {".csv": "csv", ".jsonl": "jsonl", ".parquet": "parquet"}
+# tablo -> (sorgu, [(sütun, tip)], tarih sütunu, parça kodu sütunu); filtreler {where} yerine gelir
+EXPORT_TABLES = {
+    "parts": ("""
+        SELECT p.code, p.description, p.quantity, p.shelf, p.creator_id, p.version, p.synced_version, p.updated_at
+        FROM parts p WHERE 1=1 {where} ORDER BY p.code
+    """, [("code", "str"), ("description", "str"), ("quantity", "int"), ("shelf", "str"), ("creator_id", "str"),
+          ("version", "int"), ("synced_version", "int"), ("updated_at", "str")], None, "p.code"),
+    "movements": ("""
+        SELECT s.id, s.date, p.code, s.movement_type, s.quantity, s.counted_qty, s.balance_after, s.shelf,
+               t.code, s.creator_id, s.sync_status
+        FROM stock_movements s JOIN parts p ON p.id = s.part_id LEFT JOIN locations t ON t.id = s.to_location_id
+        WHERE 1=1 {where} ORDER BY s.date, s.id
+    """, [("id", "int"), ("date", "str"), ("part_code", "str"), ("movement_type", "str"), ("quantity", "int"),
+          ("counted_qty", "int"), ("balance_after", "int"), ("shelf", "str"), ("to_shelf", "str"),
+          ("creator_id", "str"), ("sync_status", "str")], "s.date", "p.code"),
+    "work_orders": ("""
+        SELECT w.id, w.date, w.records, w.required_parts, w.status, w.creator_id, w.sync_status
+        FROM work_orders w WHERE 1=1 {where} ORDER BY w.date, w.id
+    """, [("id", "int"), ("date", "str"), ("records", "str"), ("required_parts", "str"), ("status", "str"),
+          ("creator_id", "str"), ("sync_status", "str")], "w.date", None),
+}
+
+def _export_writer(path, fmt, columns):
+    """Biçime göre (yaz(satırlar), kapat()) çifti döner; satırlar parça parça yazılır."""
+    names = [name for name, _ in columns]
+    if fmt == "parquet":
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ValueError("Parquet için pyarrow gerekli (pip install pyarrow).")
+        schema = pa.schema([(name, pa.int64() if kind == "int" else pa.string()) for name, kind in columns])
+        writer = pq.ParquetWriter(path, schema)
+
+        def write(rows):
+            arrays = [pa.array(values, type=field.type) for values, field in zip(zip(*rows), schema)]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+        return write, writer.close
+
+    f = open(path, "w", newline="", encoding="utf-8")
+    if fmt == "csv":
+        writer = csv.writer(f)
+        writer.writerow(names)
+        return writer.writerows, f.close
+
+    def write(rows):
+        f.writelines(json.dumps(dict(zip(names, row)), ensure_ascii=False) + "\n" for row in rows)
+    return write, f.close
+
+def export_table(table, path, fmt=None, since=None, until=None, part_codes=None, progress=None):
+    """Tabloyu dosyaya akıtır; bellek kullanımı tablo boyutundan bağımsızdır.
+
+    fmt verilmezse dosya uzantısından bulunur. since/until tarih sütunu olan
+    tablolara, part_codes parça kodu sütunu olanlara uygulanır. Okuma tek bir
+    okuma transaction'ında yapılır; dışa aktarma sürerken gelen yazmalar dosyaya
+    yarım girmez. Yazılan satır sayısını döner.
+    """
+    if table not in EXPORT_TABLES:
+        raise ValueError(f"Bilinmeyen tablo: {table}")
+    fmt = fmt or EXPORT_FORMATS.get(os.path.splitext(path)[1].lower())
+    if fmt not in EXPORT_FORMATS.values():
+        raise ValueError(f"Desteklenmeyen biçim: {path}")
+    sql, columns, date_column, code_column = EXPORT_TABLES[table]
+
+    where, params = [], []
+    if date_column and since:
+        where.append(f"{date_column} >= ?")
+        params.append(ledger_time(since, end_of_day=False))
+    if date_column and until:
+        where.append(f"{date_column} <= ?")
+        params.append(ledger_time(until))
+    if code_column and part_codes:
+        where.append(f"{code_column} IN (SELECT value FROM json_each(?))")
+        params.append(json.dumps(list(part_codes)))
+    sql = sql.format(where="".join(f" AND {clause}" for clause in where))
+
+    write, close = _export_writer(path, fmt, columns)
+    conn = DB.connection()
+    total = 0
+    try:
+        conn.execute("BEGIN")
+        try:
+            cursor = conn.execute(sql, params)
+            while True:
+                rows = cursor.fetchmany(EXPORT_CHUNK_SIZE)
+                if not rows:
+                    break
+                write(rows)
+                total += len(rows)
+                if progress:
+                    progress(total)
+        finally:
+            conn.execute("COMMIT")
+    finally:
+        close()
+    return total
+
+# --------------------
+# İş Emirleri
+# --------------------
+# Kapalı sayılan durumlar (küçük harf); diğer her durum açık iş emridir ve stok ayırır
+WORK_ORDER_CLOSED_STATUSES = frozenset((
+    "tamamlandı", "tamamlandi", "kapandı", "kapandi", "kapalı", "kapali", "iptal", "iptal edildi",
+    "teslim edildi", "completed", "closed", "cancelled", "canceled", "done",
+))
+# required_parts parçaları: "P1 x2", "2 x P1", "2x P1", "P1*2", "P1: 2", "P1 (2)", "P1 2 adet", "P1" (1 adet).
+# "x" yalnızca boşlukla ayrılmışsa veya miktara bitişikse ayraçtır: "box12" bir koddur.
+REQUIRED_PART_SEPARATORS = re.compile(r"[,;\n]+")
+# İki sayı arasında simetrik "x" ("2 x 3423", "3423 x 2", "2x3423"): kod, bilinen parça kodu olan
+# taraftır; hiçbiri bilinmiyorsa kod önce sayılır (parça kodları sayısal), ikisi de biliniyorsa tanınmaz
+REQUIRED_PART_AMBIGUOUS = re.compile(r"^(?P<a>\d+)(?:\s+[x×]\s+|[x×])(?P<b>\d+)$", re.IGNORECASE)
+REQUIRED_PART_PATTERNS = (
+    # Miktar önce: "2x 3423", "2 adet 3423", "2x P1"
+    re.compile(r"^(?P<qty>\d+)\s*(?:x|×|adet)\s+(?P<code>\S+)$", re.IGNORECASE),
+    re.compile(r"^(?P<qty>\d+)[x×](?P<code>\S+)$", re.IGNORECASE),
+    # Kod önce: "3423 x2", "P1 x 2", "3423*2", "3423: 2"
+    re.compile(r"^(?P<code>\S+)\s+[x×]\s*(?P<qty>\d+)$", re.IGNORECASE),
+    re.compile(r"^(?P<code>\S+?)\s*[*:]\s*(?P<qty>\d+)$"),
+    re.compile(r"^(?P<code>\S+)\s*\(\s*(?P<qty>\d+)\s*(?:adet)?\s*\)$", re.IGNORECASE),
+    re.compile(r"^(?P<code>\S+)\s+(?P<qty>\d+)\s*adet$", re.IGNORECASE),
+    re.compile(r"^(?P<code>\S+)$"),
+)
+
+def _resolve_ambiguous_part(token, known_part):
+    # Simetrik iki sayı değilse None; ikisi de bilinen kodsa karar verilemez: (None, None)
+    match = REQUIRED_PART_AMBIGUOUS.match(token)
+    if not match:
+        return None
+    a, b = match["a"], match["b"]
+    a_known, b_known = (known_part(a), known_part(b)) if known_part else (False, False)
+    if a_known and b_known:
+        return None, None
+    return (b, int(a)) if b_known else (a, int(b))
+
+def parse_required_parts(text, known_part=None):
+    """required_parts metnini ({parça kodu: miktar}, [tanınmayan parçalar]) olarak ayrıştırır.
+
+    Aynı kod birden fazla geçerse miktarlar toplanır. known_part(kod) verilirse iki
+    sayıdan hangisinin kod olduğu ona sorulur ("2 x 3423" ile "3423 x 2").
+    """
+    lines, unparsed = {}, []
+    for token in REQUIRED_PART_SEPARATORS.split(text or ""):
+        token = token.strip()
+        if not token:
+            continue
+        resolved = _resolve_ambiguous_part(token, known_part)
+        if resolved:
+            code, quantity = resolved
+            if code is None:
+                unparsed.append(token)
+            elif quantity:
+                lines[code] = lines.get(code, 0) + quantity
+            continue
+        for pattern in REQUIRED_PART_PATTERNS:
+            match = pattern.match(token)
+            if match:
+                quantity = int(match.groupdict().get("qty") or 1)
+                if quantity:
+                    lines[match["code"]] = lines.get(match["code"], 0) + quantity
+                break
+        else:
+            unparsed.append(token)
+    return lines, unparsed
+
+def work_order_is_open(status):
+    status = (status or "").strip()
+    # "KAPANDI" gibi Türkçe büyük harfler için I -> ı dönüşümü de denenir
+    return not {status.lower(), status.replace("I", "ı").replace("İ", "i").lower()} & WORK_ORDER_CLOSED_STATUSES
+
+def _part_exists(cursor, code):
+    cursor.execute("SELECT 1 FROM parts WHERE code = ?", (code,))
+    return cursor.fetchone() is not None
+
+def set_work_order_lines(cursor, work_order_id, required_parts, status):
+    """İş emrinin satırlarını ve açık/kapalı durumunu yazar; ayrılan stok tetikleyicilerle güncellenir.
+
+    Tanınmayan parça metinlerini döner.
+    """
+    lines, unparsed = parse_required_parts(required_parts, lambda code: _part_exists(cursor, code))
+    # Sıra önemli: eski satırlar eski durumla bırakılır, yeniler yeni durumla ayrılır
+    cursor.execute("DELETE FROM work_order_lines WHERE work_order_id=?", (work_order_id,))
+    cursor.execute("UPDATE work_orders SET is_open=? WHERE id=?", (int(work_order_is_open(status)), work_order_id))
+    cursor.executemany("INSERT INTO work_order_lines (work_order_id, part_code, quantity) VALUES (?, ?, ?)",
+                       [(work_order_id, code, quantity) for code, quantity in lines.items()])
+    return unparsed
+
+def rebuild_work_order_lines(cursor):
+    """Tüm iş emirlerinin satırlarını required_parts'tan yeniden çıkarır ve ayrılan stoğu yeniden hesaplar."""
+    cursor.execute("SELECT id, required_parts, status FROM work_orders")
+    orders = cursor.fetchall()
+    cursor.execute("SELECT code FROM parts")
+    known_part = {row[0] for row in cursor.fetchall()}.__contains__
+    cursor.execute("DELETE FROM work_order_lines")
+    cursor.executemany("UPDATE work_orders SET is_open=? WHERE id=?",
+                       [(int(work_order_is_open(status)), work_order_id) for work_order_id, _, status in orders])
+    cursor.executemany("INSERT INTO work_order_lines (work_order_id, part_code, quantity) VALUES (?, ?, ?)",
+                       [(work_order_id, code, quantity) for work_order_id, parts, _ in orders
+                        for code, quantity in parse_required_parts(parts, known_part)[0].items()])
+    rebuild_reservations(cursor)
+
+def rebuild_reservations(cursor):
+    """parts.reserved'i açık iş emri satırlarından tek sorguda yeniden yazar."""
+    cursor.execute("""
+        UPDATE parts SET reserved = COALESCE((
+            SELECT SUM(l.quantity) FROM work_order_lines l JOIN work_orders w ON w.id = l.work_order_id
+            WHERE l.part_code = parts.code AND w.is_open
+        ), 0)
+    """)
+
+def kittable_work_orders():
+    """Açık iş emirlerinin eldeki stokla tam karşılanıp karşılanamayacağını tek sorguda hesaplar.
+
+    Stok iş emirlerine öncelik sırasıyla (eskiden yeniye) ayrılır: bir satır, aynı
+    parçayı isteyen önceki açık iş emirlerinin ihtiyacı düşüldükten sonra kalan
+    stokla karşılanır. {iş emri id: {parça kodu: eksik miktar}} döner; boş sözlük
+    tam karşılanabilir demektir. Satırı olmayan iş emirleri sonuçta yer almaz.
+    """
+    rows = DB.fetchall("""
+        WITH demand AS (
+            SELECT l.work_order_id, l.part_code, l.quantity,
+                   SUM(l.quantity) OVER (PARTITION BY l.part_code ORDER BY l.work_order_id) AS cumulative
+            FROM work_order_lines l JOIN work_orders w ON w.id = l.work_order_id
+            WHERE w.is_open
+        ), shortage AS (
+            SELECT d.work_order_id, d.part_code,
+                   MIN(d.quantity, MAX(0, d.cumulative - MAX(COALESCE(p.quantity, 0), 0))) AS short
+            FROM demand d LEFT JOIN parts p ON p.code = d.part_code
+        )
+        SELECT work_order_id, json_group_array(CASE WHEN short > 0 THEN json_array(part_code, short) END)
+        FROM shortage GROUP BY work_order_id
+    """)
+    return {work_order_id: dict(item for item in json.loads(shorts) if item) for work_order_id, shorts in rows}
+
+def kitting_summary(result):
+    kittable = sum(1 for shorts in result.values() if not shorts)
+    return f"{len(result)} açık iş emrinden {kittable} tanesi eldeki stokla tam karşılanabilir."
+
+@METRICS.timer("depo_db_operation_seconds", op="add_work_order")
+def add_work_order(records, parts, status):
+    """İş emrini kaydeder ve Creator'a gönderimini kuyruğa alır; yerel id döner."""
+    with DB.write() as cursor:
+        cursor.execute("INSERT INTO work_orders (records, required_parts, status) VALUES (?, ?, ?)",
+                       (records, parts, status))
+        local_id = cursor.lastrowid
+        set_work_order_lines(cursor, local_id, parts, status)
+        DB.mark_changed("work_orders", [local_id])
+        enqueue_outbox(cursor, "Work_Order", {
+            "Maintenance_Repair_Records": records,
+            "Required_Parts": parts,
+            "Status_Information": status
+        }, target_table="work_orders", target_id=local_id)
+    OUTBOX.notify()
+    return local_id
+
+def remove_work_order(work_order_id):
+    """İş emrini siler ve Creator'dan silmeyi kuyruğa alır; iş emri yoksa False döner."""
+    with DB.write() as cursor:
+        cursor.execute("SELECT creator_id FROM work_orders WHERE id=?", (work_order_id,))
+        creator_id = cursor.fetchone()
+        if creator_id:
+            creator_id = creator_id[0]
+        cursor.execute("DELETE FROM work_orders WHERE id=?", (work_order_id,))
+        deleted = cursor.rowcount == 1
+        DB.mark_changed("work_orders", [work_order_id])
+        cancel_outbox(cursor, "work_orders", work_order_id)
+
+        # Creator’dan sil (arka planda)
+        if creator_id:
+            enqueue_outbox(cursor, "All_Work_Orders", method="DELETE", record_id=creator_id)  # <- Burayı All_Work_Orders yaptık
+    OUTBOX.notify()
+    return deleted
+
+# --------------------
+# Arama (FTS5)
+# --------------------
+# Dizinlenen tablo -> aranan sütunlar; dizin <tablo>_fts sanal tablosudur, rowid = tablo id'si
+SEARCH_INDEXES = {
+    "parts": ("code", "description"),
+    "work_orders": ("records", "required_parts", "status"),
+}
+SEARCH_TOKEN = re.compile(r"\w+")
+SEARCH_SCAN_RATIO = 0.02   # aramaya uyan satır oranı bunu aşarsa sonuçlar id sırasıyla taranarak bulunur
+
+def search_match(text):
+    """Arama kutusu metnini FTS5 MATCH ifadesine çevirir; aranacak kelime yoksa None.
+
+    Her kelime önek olarak aranır ve hepsi eşleşmelidir ("rul 34" -> "rul"* "34"*).
+    Kelimeler tırnaklandığı için kullanıcı metni FTS5 sözdizimi olarak yorumlanmaz.
+    """
+    return " ".join(f'"{token}"*' for token in SEARCH_TOKEN.findall(text or "")) or None
+
+def search_filter(table, id_column, match=None):
+    """id_column'u aramaya uyan table satırlarıyla sınırlayan WHERE koşulu (tek parametre: search_match).
+
+    match verilirse kaç satıra uyduğuna bakılır. Az satıra uyan aramada id_column
+    dizini kullanılır; çok satıra uyan aramada ("1" gibi) tüm eşleşmeleri sıralamak
+    yerine tablo sırasıyla taranır, ilk sayfa hemen dolar ("+" dizini devre dışı bırakır).
+    """
+    condition = f"{id_column} IN (SELECT rowid FROM {table}_fts WHERE {table}_fts MATCH ?)"
+    if match:
+        matched = DB.fetchone(f"SELECT COUNT(*) FROM {table}_fts WHERE {table}_fts MATCH ?", (match,))[0]
+        if matched > SEARCH_SCAN_RATIO * DB.fetchone(f"SELECT COUNT(*) FROM {table}")[0]:
+            condition = "+" + condition
+    return condition
+
+# --------------------
+# Flask Webhook Listener
+# --------------------
+app = Flask(__name__)
+
+WEBHOOK_QUEUE_MAX = 20000       # bellekte bekleyebilecek en fazla olay
+WEBHOOK_BATCH_SIZE = 500        # tek transaction'da işlenecek en fazla olay
+WEBHOOK_BATCH_WAIT = 0.05       # saniye; grup doldurmak için kısa bekleme
+WEBHOOK_SERVER_THREADS = 8      # waitress iş parçacığı sayısı
+
+WEBHOOK_KEY_RETENTION_DAYS = 90  # bu süreden eski tekilleştirme anahtarları silinir
+
+# Olay türü -> anahtar için kullanılan alanlar (ID yoksa bu alanların özeti kullanılır)
+WEBHOOK_KEY_FIELDS = {
+    "work_order": ("Maintenance_Repair_Records", "Required_Parts", "Status_Information"),
+    "stock_movement": ("Part_Code", "Added_Removed", "Stock", "Movement", "Date_Time"),
+}
+WEBHOOK_KINDS_BY_FORM = {"Work_Order": "work_order", "Stock_Movements": "stock_movement"}
+WEBHOOK_REPORTS = {kind: report_name for report_name, kind in PULL_REPORTS}   # olay türü -> Creator raporu
+
+# Creator "Movement" değeri -> yerel hareket tipi
+WEBHOOK_MOVEMENT_MAP = {
+    "added": "Giriş", "in": "Giriş", "giriş": "Giriş",
+    "removed": "Çıkış", "out": "Çıkış", "çıkış": "Çıkış",
+    "count": "Sayım", "sayım": "Sayım",
+}
+
+def webhook_event_kind(event):
+    """Payload'ın türünü döner; tanınmıyorsa None."""
+    if not isinstance(event, dict):
+        return None
+    if "Maintenance_Repair_Records" in event:
+        return "work_order"
+    if "Part_Code" in event and "Movement" in event:
+        return "stock_movement"
+    return None
+
+def webhook_idempotency_key(kind, event):
+    """Creator ID varsa onu, yoksa payload alanlarının SHA-256 özetini anahtar yapar."""
+    if event.get("ID"):
+        return f"{kind}:id:{event['ID']}"
+    values = [str(event.get(field, "")).strip() for field in WEBHOOK_KEY_FIELDS[kind]]
+    digest = hashlib.sha256(json.dumps(values, ensure_ascii=False).encode("utf-8")).hexdigest()
+    return f"{kind}:sha256:{digest}"
+
+def register_idempotency_key(cursor, kind, event):
+    """Olayın anahtarlarını kaydeder; herhangi biri daha önce görülmüşse False döner.
+
+    ID taşıyan olaylar için içerik özeti de kaydedilir: bizim gönderdiğimiz
+    kayıt, Creator yanıtı işlenmeden webhook ile geri gelirse içerikten yakalanır.
+    """
+    keys = [webhook_idempotency_key(kind, event)]
+    if event.get("ID") and any(field in event for field in WEBHOOK_KEY_FIELDS[kind]):
+        keys.append(webhook_idempotency_key(kind, {k: v for k, v in event.items() if k != "ID"}))
+    is_new = True
+    for key in keys:
+        cursor.execute("INSERT OR IGNORE INTO webhook_events (idempotency_key, kind) VALUES (?, ?)", (key, kind))
+        is_new = is_new and cursor.rowcount == 1
+    return is_new
+
+def purge_webhook_events(days=WEBHOOK_KEY_RETENTION_DAYS):
+    with DB.write() as cursor:
+        cursor.execute("DELETE FROM webhook_events WHERE received_at < datetime('now', ?)", (f"-{int(days)} days",))
+
+def is_valid_webhook_event(event):
+    """Kuyruğa almadan önceki ucuz kontrol: bilinen bir Creator payload'ı mı?"""
+    return webhook_event_kind(event) is not None
+
+def apply_webhook_event(cursor, event):
+    """Tek bir webhook olayını çağıranın transaction'ı içinde uygular.
+
+    Olay daha önce işlendiyse (aynı anahtar) hiçbir şey yapmaz ve False döner. Bilinen
+    bir iş emrinin Creator'daki düzenlemesi ise aynı ID ile gelir ve kayda uygulanır.
+    """
+    kind = webhook_event_kind(event)
+    # Tekrar gelen olay da kaydın Creator'da hâlâ var olduğunu gösterir
+    remember_creator_records(WEBHOOK_REPORTS[kind], [event.get("ID")])
+    is_new = register_idempotency_key(cursor, kind, event)
+    if kind == "work_order":
+        return _apply_work_order_event(cursor, event, is_new)
+    if not is_new:
+        return False
+    _apply_stock_movement_event(cursor, event)
+    return True
+
+def _apply_work_order_event(cursor, event, is_new):
+    # creator_id ile bilinen iş emri güncellenir (durum değişikliği vb.); aynı içerik tekrarıysa dokunulmaz
+    values = (event.get("Maintenance_Repair_Records", ""), event.get("Required_Parts", ""),
+              event.get("Status_Information", ""))
+    row = None
+    if event.get("ID"):
+        cursor.execute("SELECT id, records, required_parts, status FROM work_orders WHERE creator_id=?",
+                       (event["ID"],))
+        row = cursor.fetchone()
+    if row:
+        work_order_id = row[0]
+        if tuple(row[1:]) == values:
+            return False
+        cursor.execute("UPDATE work_orders SET records=?, required_parts=?, status=? WHERE id=?",
+                       values + (work_order_id,))
+    elif is_new:
+        cursor.execute(
+            "INSERT INTO work_orders (records, required_parts, status, creator_id, sync_status) VALUES (?, ?, ?, ?, ?)",
+            values + (event.get("ID"), "synced")
+        )
+        work_order_id = cursor.lastrowid
+    else:
+        return False
+    set_work_order_lines(cursor, work_order_id, values[1], values[2])
+    DB.mark_changed("work_orders", [work_order_id])
+    return True
+
+def _apply_stock_movement_event(cursor, event):
+    """Creator'daki stok hareketini parts ve stock_movements'a uygular."""
+    code = str(event.get("Part_Code", "")).strip()
+    movement = WEBHOOK_MOVEMENT_MAP.get(str(event.get("Movement", "")).strip().lower())
+    if not code or movement is None:
+        raise ValueError(f"Geçersiz stok hareketi: {event}")
+    quantity = int(float(event.get("Added_Removed") or 0))
+    stock = event.get("Stock")
+
+    part_id = _ensure_part(cursor, code)
+    # Sayımda Creator'ın bildirdiği stok esas alınır, fark yerelde yeniden hesaplanır
+    counted = int(float(stock)) if movement == "Sayım" and stock not in (None, "") else None
+    quantity = quantity if movement == "Sayım" else abs(quantity)
+    # Hareket Creator'daki zamanıyla (UTC'ye çevrilerek) deftere girer; kuyrukta beklediği süre sayılmaz
+    record_movement(cursor, part_id, movement, quantity, counted=counted, creator_id=event.get("ID"),
+                    sync_status="synced", date=creator_ledger_time(event.get("Date_Time")))
+
+class WebhookIngestor:
+    """Webhook olaylarını kuyruğa alıp tek bir yazıcı thread'de gruplar halinde işler.
+
+    HTTP isteği yalnızca doğrulama ve kuyruğa ekleme yapar; veritabanı işi
+    WEBHOOK_BATCH_SIZE'lık transaction'larla arka planda yürür. Her süreç
+    (ör. birden fazla WSGI worker) kendi kuyruğunu ilk istekte başlatır.
+    """
+
+    def __init__(self, maxsize=WEBHOOK_QUEUE_MAX):
+        self.queue = queue.Queue(maxsize=maxsize)
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._submit_lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                purge_webhook_events()
+                self._thread = threading.Thread(target=self._run, name="webhook-ingest", daemon=True)
+                self._thread.start()
+                atexit.register(self.stop)
+
+    def submit(self, events):
+        """Olayları kuyruğa ekler; kuyrukta yer yoksa hiçbirini eklemeden False döner (istemci tekrar denemeli).
+
+        Yer kontrolü ve ekleme aynı kilit altında yapılır: kuyruğu yalnızca gönderenler
+        doldurur, yazıcı thread yalnızca boşaltır; bu yüzden eklemeler yarıda kalmaz.
+        """
+        self.ensure_started()
+        with self._submit_lock:
+            if self.queue.qsize() + len(events) > self.queue.maxsize:
+                return False
+            for event in events:
+                self.queue.put_nowait(event)
+        return True
+
+    def depth(self):
+        return self.queue.qsize()
+
+    def stop(self, timeout=5):
+        """Kuyrukta kalan olayları işleyip thread'i durdurur."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def _next_batch(self):
+        try:
+            batch = [self.queue.get(timeout=0.5)]
+        except queue.Empty:
+            return []
+        deadline = perf_counter() + WEBHOOK_BATCH_WAIT
+        while len(batch) < WEBHOOK_BATCH_SIZE:
+            remaining = deadline - perf_counter()
+            try:
+                batch.append(self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not (self._stop.is_set() and self.queue.empty()):
+            batch = self._next_batch()
+            if batch:
+                self._apply(batch)
+        DB.close_thread_connection()
+
+    def _apply(self, batch):
+        try:
+            with METRICS.timer("depo_webhook_batch_seconds"), DB.write() as cursor:
+                for event in batch:
+                    apply_webhook_event(cursor, event)
+            METRICS.inc("depo_webhook_events_applied_total", len(batch))
+        except Exception as e:
+            # Hatalı olay tüm grubu kaybettirmesin: tek tek dene
+            print(f"⚠️ Webhook grubu ({len(batch)} olay) işlenemedi, tek tek deneniyor:", e)
+            for event in batch:
+                try:
+                    with DB.write() as cursor:
+                        apply_webhook_event(cursor, event)
+                    METRICS.inc("depo_webhook_events_applied_total")
+                except Exception as e:
+                    METRICS.inc("depo_webhook_events_failed_total")
+                    print("⚠️ Webhook olayı atlandı:", e, event)
+
+INGESTOR = WebhookIngestor()
+METRICS.gauge("depo_webhook_queue_depth", INGESTOR.depth)
+
+# Flask Webhook Listener
+@app.route('/creator-webhook', methods=['POST'])
+@METRICS.timer("depo_webhook_request_seconds")
+def creator_webhook():
+    data = request.get_json(silent=True)
+    if data is None:
+        return jsonify({"status": "error", "message": "Geçersiz JSON"}), 400
+
+    # Tek olay veya olay dizisi kabul edilir
+    events = data if isinstance(data, list) else [data]
+    accepted = [event for event in events if is_valid_webhook_event(event)]
+    METRICS.inc("depo_webhook_events_total", len(events) - len(accepted), result="ignored")
+    if not INGESTOR.submit(accepted):
+        METRICS.inc("depo_webhook_events_total", len(accepted), result="rejected")
+        resp = jsonify({"status": "busy", "message": "Kuyruk dolu, daha sonra tekrar deneyin"})
+        resp.headers["Retry-After"] = "5"
+        return resp, 503
+
+    METRICS.inc("depo_webhook_events_total", len(accepted), result="accepted")
+    return jsonify({"status": "accepted", "accepted": len(accepted), "ignored": len(events) - len(accepted)}), 202
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return METRICS.render(), 200, {"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
+
+
+# --------------------
+# Yerel REST API
+# --------------------
+# El terminalleri ve MES için; yazmalar arayüzle aynı servis fonksiyonlarından geçer.
+API_TOKEN = os.environ.get("DEPO_API_TOKEN")  # tanımlıysa /api/ istekleri "Authorization: Bearer <token>" ister
+API_READ_METHODS = ("GET", "HEAD", "OPTIONS")  # token tanımlı değilken yalnızca bunlar açık
+API_PAGE_SIZE = 100
+API_MAX_PAGE_SIZE = 1000
+API_MAX_BATCH = 1000        # tek istekte en fazla kayıt
+
+class ApiError(Exception):
+    def __init__(self, message, status=400, **details):
+        super().__init__(message)
+        self.status = status
+        self.details = details
+
+@app.errorhandler(ApiError)
+def _api_error(error):
+    return jsonify({"status": "error", "message": str(error), **error.details}), error.status
+
+@app.before_request
+def _check_api_token():
+    if not request.path.startswith("/api/"):
+        return
+    if API_TOKEN:
+        if not hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {API_TOKEN}"):
+            raise ApiError("Yetkisiz", 401)
+    elif request.method not in API_READ_METHODS:
+        # Sunucu ağa açık (0.0.0.0) dinler: token olmadan stok yazan uçlar kapalı kalır
+        raise ApiError("Yazma uçları kapalı: DEPO_API_TOKEN tanımlanmalı", 403)
+
+def _api_items():
+    """Gövdeyi (tek nesne veya nesne dizisi) listeye çevirir."""
+    data = request.get_json(silent=True)
+    items = [data] if isinstance(data, dict) else data
+    if not isinstance(items, list) or not items or not all(isinstance(item, dict) for item in items):
+        raise ApiError("Gövde bir JSON nesnesi veya nesne dizisi olmalı")
+    if len(items) > API_MAX_BATCH:
+        raise ApiError(f"Tek istekte en fazla {API_MAX_BATCH} kayıt gönderilebilir", 413)
+    return items
+
+def _api_limit():
+    return max(1, min(request.args.get("limit", API_PAGE_SIZE, type=int), API_MAX_PAGE_SIZE))
+
+def _api_page(items, limit, cursor_key):
+    # Sayfa doluysa son kaydın anahtarı bir sonraki isteğin imlecidir
+    return jsonify({"items": items, "next": items[-1][cursor_key] if len(items) == limit else None})
+
+def _api_write_movements(items, default_movement, allowed):
+    """Kayıtları doğrular ve tek transaction'da yazar; biri bile hatalıysa hiçbiri yazılmaz."""
+    rows, errors = [], []
+    for index, item in enumerate(items):
+        try:
+            row = _parse_movement_row(item, default_movement)
+            if row[1] not in allowed:
+                raise ValueError(f"bu uçta kabul edilmeyen hareket: {row[1]}")
+            rows.append(row)
+        except ValueError as e:
+            errors.append({"index": index, "error": str(e)})
+    if errors:
+        raise ApiError("Geçersiz kayıt", errors=errors)
+
+    results = []
+    with DB.write() as cursor:
+        for code, movement, quantity, shelf in rows:
+            if movement == "Sayım":
+                movement_id, quantity, balance = add_count_movement(cursor, code, quantity, shelf)
+            else:
+                movement_id, balance = add_stock_movement(cursor, code, movement, quantity, shelf)
+            results.append({"id": movement_id, "code": code, "movement": movement,
+                            "quantity": quantity, "balance": balance})
+    OUTBOX.notify()
+    return jsonify({"status": "ok", "items": results}), 201
+
+@app.route('/api/movements', methods=['POST'])
+def api_add_movements():
+    # {"code", "movement": "in"|"out"|"Giriş"|"Çıkış", "quantity", "shelf"?} veya bunların dizisi
+    return _api_write_movements(_api_items(), None, ("Giriş", "Çıkış"))
+
+@app.route('/api/counts', methods=['POST'])
+def api_add_counts():
+    # {"code", "counted", "shelf"?} veya bunların dizisi
+    items = [{**item, "quantity": item.get("counted", item.get("quantity"))} for item in _api_items()]
+    return _api_write_movements(items, "Sayım", ("Sayım",))
+
+@app.route('/api/movements', methods=['GET'])
+def api_list_movements():
+    limit = _api_limit()
+    where, params = [], []
+    if request.args.get("part"):
+        where.append("s.part_id = (SELECT id FROM parts WHERE code = ?)")
+        params.append(request.args["part"])
+    if request.args.get("before", type=int):
+        where.append("s.id < ?")
+        params.append(request.args.get("before", type=int))
+    rows = DB.fetchall(f"""
+        SELECT s.id, p.code, s.movement_type, s.quantity, s.counted_qty, s.balance_after, s.shelf, t.code, s.date,
+               s.sync_status
+        FROM stock_movements s JOIN parts p ON p.id = s.part_id LEFT JOIN locations t ON t.id = s.to_location_id
+        {"WHERE " + " AND ".join(where) if where else ""}
+        ORDER BY s.id DESC LIMIT ?
+    """, (*params, limit))
+    keys = ("id", "code", "movement", "quantity", "counted", "balance", "shelf", "to_shelf", "date", "sync_status")
+    return _api_page([dict(zip(keys, row)) for row in rows], limit, "id")
+
+@app.route('/api/transfers', methods=['POST'])
+def api_add_transfers():
+    # {"code", "quantity", "from"?, "to"} veya bunların dizisi; from verilmezse varsayılan raf
+    items, quantities, errors, results = _api_items(), [], [], []
+    for index, item in enumerate(items):
+        try:
+            quantities.append(_parse_quantity(item.get("quantity")))
+        except ValueError as e:
+            errors.append({"index": index, "error": str(e)})
+    if errors:
+        raise ApiError("Geçersiz kayıt", errors=errors)
+    with DB.write() as cursor:
+        for index, (item, quantity) in enumerate(zip(items, quantities)):
+            try:
+                movement_id, remaining = transfer_stock(cursor, str(item.get("code") or "").strip(), quantity,
+                                                        str(item.get("from") or ""), str(item.get("to") or ""))
+            except ValueError as e:
+                # ApiError transaction'ı geri alır: dizinin hiçbir kaydı yazılmaz
+                raise ApiError("Geçersiz kayıt", errors=[{"index": index, "error": str(e)}])
+            results.append({"id": movement_id, "code": item["code"], "quantity": quantity,
+                            "from": item.get("from"), "to": item["to"], "remaining": remaining})
+    return jsonify({"status": "ok", "items": results}), 201
+
+@app.route('/api/movements/<int:movement_id>', methods=['DELETE'])
+def api_delete_movement(movement_id):
+    if not remove_movement(movement_id):
+        raise ApiError("Hareket bulunamadı", 404)
+    return jsonify({"status": "ok"})
+
+# Yanıt alanı -> SQL ifadesi; available: açık iş emirlerine ayrılan düşüldükten sonra kalan (available-to-promise)
+PART_API_FIELDS = {"code": "code", "description": "description", "quantity": "quantity", "reserved": "reserved",
+                   "available": "quantity - reserved", "shelf": "shelf", "creator_id": "creator_id",
+                   "updated_at": "updated_at"}
+
+@app.route('/api/parts', methods=['GET'])
+def api_list_parts():
+    # q: parça kodu / açıklamada arama (her kelime önek olarak)
+    limit = _api_limit()
+    conditions, params = ["code > ?"], [request.args.get("after", "")]
+    match = search_match(request.args.get("q"))
+    if match:
+        conditions.append(search_filter("parts", "id"))
+        params.append(match)
+    rows = DB.fetchall(f"SELECT {', '.join(PART_API_FIELDS.values())} FROM parts "
+                       f"WHERE {' AND '.join(conditions)} ORDER BY code LIMIT ?", (*params, limit))
+    return _api_page([dict(zip(PART_API_FIELDS, row)) for row in rows], limit, "code")
+
+@app.route('/api/parts/<code>', methods=['GET'])
+def api_get_part(code):
+    row = DB.fetchone(f"SELECT {', '.join(PART_API_FIELDS.values())} FROM parts WHERE code = ?", (code,))
+    if row is None:
+        raise ApiError("Parça bulunamadı", 404)
+    return jsonify(dict(zip(PART_API_FIELDS, row)))
+
+@app.route('/api/parts/<code>/locations', methods=['GET'])
+def api_part_locations(code):
+    # Raf bakiyeleri; rafsız stok "shelf": null ile döner
+    rows = part_locations(code)
+    if rows is None:
+        raise ApiError("Parça bulunamadı", 404)
+    return jsonify({"code": code, "items": [{"shelf": shelf, "zone": zone, "quantity": qty}
+                                            for shelf, zone, qty in rows]})
+
+@app.route('/api/locations', methods=['GET'])
+def api_list_locations():
+    # Raflar ve üzerlerindeki stok, raf koduna göre sayfalı; zone ile tek bölge
+    limit = _api_limit()
+    rows = location_totals(request.args.get("zone"), request.args.get("after", ""), limit)
+    keys = ("shelf", "zone", "parts", "quantity")
+    return _api_page([dict(zip(keys, row)) for row in rows], limit, "shelf")
+
+@app.route('/api/zones', methods=['GET'])
+def api_zones():
+    keys = ("zone", "locations", "parts", "quantity")
+    return jsonify({"items": [dict(zip(keys, row)) for row in zone_totals()]})
+
+def _api_at():
+    try:
+        return ledger_time(request.args["at"]) if request.args.get("at") else None
+    except ValueError:
+        raise ApiError("at YYYY-MM-DD veya 'YYYY-MM-DD HH:MM:SS' olmalı")
+
+@app.route('/api/parts/<code>/balance', methods=['GET'])
+def api_part_balance(code):
+    # at verilmezse güncel stok
+    at = _api_at()
+    row = DB.fetchone("SELECT quantity FROM parts WHERE code = ?", (code,))
+    if row is None:
+        raise ApiError("Parça bulunamadı", 404)
+    return jsonify({"code": code, "at": at, "quantity": stock_at(code, at) if at else row[0]})
+
+@app.route('/api/balances', methods=['GET'])
+def api_balances():
+    # Verilen andaki tüm stoklar, parça koduna göre sayfalı
+    at = _api_at() or ledger_time(datetime.utcnow())
+    limit = _api_limit()
+    rows = stock_levels_page(at, request.args.get("after", ""), limit)
+    return _api_page([{"code": code, "quantity": qty} for code, qty in rows], limit, "code")
+
+WORK_ORDER_API_FIELDS = ("id", "records", "required_parts", "status", "date", "creator_id", "sync_status")
+
+@app.route('/api/work_orders', methods=['GET'])
+def api_list_work_orders():
+    # q: kayıt, gerekli parçalar ve durumda arama
+    limit = _api_limit()
+    conditions, params = [], []
+    if request.args.get("before", type=int):
+        conditions.append("id < ?")
+        params.append(request.args.get("before", type=int))
+    match = search_match(request.args.get("q"))
+    if match:
+        conditions.append(search_filter("work_orders", "id"))
+        params.append(match)
+    rows = DB.fetchall(f"""
+        SELECT {', '.join(WORK_ORDER_API_FIELDS)} FROM work_orders
+        {"WHERE " + " AND ".join(conditions) if conditions else ""} ORDER BY id DESC LIMIT ?
+    """, (*params, limit))
+    return _api_page([dict(zip(WORK_ORDER_API_FIELDS, row)) for row in rows], limit, "id")
+
+@app.route('/api/work_orders', methods=['POST'])
+def api_add_work_orders():
+    # {"records", "required_parts"?, "status"?} veya bunların dizisi
+    items = _api_items()
+    errors = [{"index": index, "error": "records boş olamaz"}
+              for index, item in enumerate(items) if not str(item.get("records") or "").strip()]
+    if errors:
+        raise ApiError("Geçersiz kayıt", errors=errors)
+    # İç içe DB.write dıştaki transaction'a katılır: dizi tek transaction'da yazılır
+    with DB.write():
+        ids = [add_work_order(str(item["records"]).strip(), str(item.get("required_parts") or "").strip(),
+                              str(item.get("status") or "").strip()) for item in items]
+    return jsonify({"status": "ok", "ids": ids}), 201
+
+@app.route('/api/work_orders/kitting', methods=['GET'])
+def api_work_order_kitting():
+    # Tüm açık iş emirleri öncelik sırasıyla tek geçişte hesaplanır; yanıt id'ye göre sayfalanır
+    limit = _api_limit()
+    after = request.args.get("after", 0, type=int)
+    result = kittable_work_orders()
+    ids = sorted(work_order_id for work_order_id in result if work_order_id > after)[:limit]
+    return _api_page([{"id": work_order_id, "kittable": not result[work_order_id], "short": result[work_order_id]}
+                      for work_order_id in ids], limit, "id")
+
+@app.route('/api/work_orders/<int:work_order_id>', methods=['DELETE'])
+def api_delete_work_order(work_order_id):
+    if not remove_work_order(work_order_id):
+        raise ApiError("İş emri bulunamadı", 404)
+    return jsonify({"status": "ok"})
+
+def run_server(host="0.0.0.0", port=5000):
+    """Webhook sunucusunu çok iş parçacıklı WSGI sunucusunda (waitress) çalıştırır."""
+    try:
+        from waitress import serve
+    except ImportError:
+        print("⚠️ waitress yüklü değil, Flask geliştirme sunucusu kullanılıyor (pip install waitress).")
+        app.run(host=host, port=port, threaded=True)
+        return
+    serve(app, host=host, port=port, threads=WEBHOOK_SERVER_THREADS)
+# --------------------
+# Komut Satırı
+# --------------------
+CLI_COMMANDS = ("verify", "snapshot", "stock-at", "import", "export", "kitting", "locations")
+
+def run_cli(argv):
+    """Arayüz açmadan çalışan bakım komutları; çıkış kodunu döner."""
+    parser = argparse.ArgumentParser(prog="main.py", description="Depo veritabanı bakım komutları")
+    commands = parser.add_subparsers(dest="command", required=True)
+    verify = commands.add_parser("verify", help="Bakiyeleri defterden yeniden hesaplayıp parts.quantity ile karşılaştır")
+    verify.add_argument("--repair", action="store_true", help="Farkları defterdeki değerlerle düzelt")
+    commands.add_parser("snapshot", help="Eksik ay sonu stok görüntülerini al")
+    stock = commands.add_parser("stock-at", help="Verilen andaki stokları yazdır")
+    stock.add_argument("at", type=ledger_time, help="YYYY-MM-DD (gün sonu) veya 'YYYY-MM-DD HH:MM:SS', UTC")
+    stock.add_argument("--part", help="Yalnızca bu parça kodu")
+    load = commands.add_parser("import", help="CSV/XLSX dosyasından sayım veya hareket yükle")
+    load.add_argument("file")
+    load.add_argument("--movement", default="Sayım", choices=("Sayım", "Giriş", "Çıkış"),
+                      help="Dosyada Hareket sütunu yoksa kullanılacak hareket (varsayılan: Sayım)")
+    export = commands.add_parser("export", help="Tabloyu CSV, JSON Lines veya Parquet olarak dışa aktar")
+    export.add_argument("table", choices=tuple(EXPORT_TABLES))
+    export.add_argument("file", help="Biçim uzantıdan anlaşılır: .csv, .jsonl, .parquet")
+    export.add_argument("--format", choices=tuple(EXPORT_FORMATS.values()))
+    export.add_argument("--since", type=lambda v: ledger_time(v, end_of_day=False), help="Bu tarihten itibaren (YYYY-MM-DD)")
+    export.add_argument("--until", type=ledger_time, help="Bu tarihe kadar, dahil (YYYY-MM-DD)")
+    export.add_argument("--part", action="append", help="Parça kodu (birden fazla verilebilir)")
+    commands.add_parser("kitting", help="Açık iş emirlerinden eldeki stokla tam karşılanabilenleri listele")
+    locations = commands.add_parser("locations", help="Bölge toplamlarını veya bir bölgenin raflarını yazdır")
+    locations.add_argument("--zone", help="Yalnızca bu bölgenin rafları")
+    args = parser.parse_args(argv)
+
+    init_db()
+    try:
+        return _dispatch_cli(args)
+    except ValueError as e:
+        print(f"Hata: {e}")
+        return 2
+
+def _dispatch_cli(args):
+    if args.command == "verify":
+        mismatches, stale = verify_stock_ledger(repair=args.repair)
+        for code, qty, ledger in mismatches:
+            print(f"{code}\tparts.quantity={qty}\tdefter={ledger}\tfark={qty - ledger}")
+        print(f"{len(mismatches)} parça/raf bakiyesinde fark, {stale} harekette bayat bakiye.")
+        if args.repair:
+            print("Bakiyeler defterden yeniden yazıldı.")
+            return 0
+        return 1 if mismatches or stale else 0
+    if args.command == "import":
+        result = import_movements(args.file, default_movement=args.movement)
+        for line, error in result["errors"]:
+            print(f"satır {line}: {error}")
+        print(import_summary(result))
+        return 1 if result["invalid"] else 0
+    if args.command == "export":
+        total = export_table(args.table, args.file, fmt=args.format, since=args.since, until=args.until,
+                             part_codes=args.part)
+        print(f"{total} satır {args.file} dosyasına yazıldı.")
+        return 0
+    if args.command == "snapshot":
+        print(f"{ensure_monthly_snapshots()} ay sonu stok görüntüsü alındı.")
+        return 0
+    if args.command == "kitting":
+        result = kittable_work_orders()
+        for work_order_id, shorts in sorted(result.items()):
+            missing = ", ".join(f"{code} x{qty}" for code, qty in shorts.items())
+            print(f"{work_order_id}\t{'tam' if not shorts else 'eksik: ' + missing}")
+        print(kitting_summary(result))
+        return 0
+    if args.command == "locations":
+        if args.zone is not None:
+            for code, _, parts, qty in location_totals(args.zone):
+                print(f"{code}\t{parts} parça\t{qty}")
+        else:
+            for zone, locations, parts, qty in zone_totals():
+                print(f"{'rafsız' if zone is None else zone}\t{locations} raf\t{parts} parça\t{qty}")
+        return 0
+    if args.part:
+        print(f"{args.part}\t{stock_at(args.part, args.at)}")
+    else:
+        for code, qty in sorted(stock_levels_at(args.at).items()):
+            print(f"{code}\t{qty}")
+    return 0
+
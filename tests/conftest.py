@@ -0,0 +1,37 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import service  # noqa: E402
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """Her test için boş, şeması kurulmuş geçici veritabanı; outbox işçisi uyandırılmaz."""
+    monkeypatch.setattr(service, "DB", service.Database(str(tmp_path / "depo.db")))
+    monkeypatch.setattr(service.OUTBOX, "notify", lambda: None)
+    service.init_db()
+    yield service.DB
+    service.DB.close_thread_connection()
+
+
+@pytest.fixture
+def client(db, monkeypatch):
+    """Token tanımlı API için test istemcisi; istekler Authorization başlığıyla gider."""
+    monkeypatch.setattr(service, "API_TOKEN", "secret")
+    client = service.app.test_client()
+    client.environ_base["HTTP_AUTHORIZATION"] = "Bearer secret"
+    return client
+
+
+def part(code):
+    """(quantity, version > synced_version) çifti."""
+    return service.DB.fetchone("SELECT quantity, version > synced_version FROM parts WHERE code = ?", (code,))
+
+
+def finish_outbox():
+    # Outbox işleri Creator'a gönderilmiş gibi
+    with service.DB.write() as cursor:
+        cursor.execute("UPDATE outbox SET status='done'")
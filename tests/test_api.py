@@ -0,0 +1,65 @@
+import pytest
+
+import service
+
+
+def test_balances_pages_by_code(client):
+    with service.DB.write() as cursor:
+        for code, qty in (("B", 2), ("A", 1), ("C", 3)):
+            service.add_stock_movement(cursor, code, "Giriş", qty)
+        service._ensure_part(cursor, "AB")  # hareketi yok: listede yer almaz
+
+    first = client.get("/api/balances?limit=2").get_json()
+    assert first == {"items": [{"code": "A", "quantity": 1}, {"code": "B", "quantity": 2}], "next": "B"}
+    second = client.get("/api/balances?limit=2&after=B").get_json()
+    assert second == {"items": [{"code": "C", "quantity": 3}], "next": None}
+
+
+def test_balances_at_past_time(client):
+    with service.DB.write() as cursor:
+        service.record_movement(cursor, service._ensure_part(cursor, "A"), "Giriş", 5, date="2024-01-01 10:00:00")
+        service.add_stock_movement(cursor, "A", "Çıkış", 2)
+
+    items = client.get("/api/balances?at=2024-01-02").get_json()["items"]
+    assert items == [{"code": "A", "quantity": 5}]
+    assert client.get("/api/balances").get_json()["items"] == [{"code": "A", "quantity": 3}]
+
+
+def transfer(client, body):
+    response = client.post("/api/transfers", json=body)
+    return response.status_code, response.get_json()
+
+
+@pytest.mark.parametrize("quantity", ["abc", 2.5, -1, None, True, "1e999"])
+def test_transfer_rejects_bad_quantity_before_writing(client, quantity):
+    with service.DB.write() as cursor:
+        service.add_stock_movement(cursor, "P1", "Giriş", 5, shelf="A01")
+
+    status, body = transfer(client, [{"code": "P1", "quantity": 1, "to": "B01"},
+                                     {"code": "P1", "quantity": quantity, "to": "B01"}])
+    assert status == 400
+    assert body["errors"] == [{"index": 1, "error": f"hatalı miktar: {quantity}"}]
+    assert [(shelf, qty) for shelf, _, qty in service.part_locations("P1")] == [("A01", 5)]
+
+
+def test_transfer_moves_stock(client):
+    with service.DB.write() as cursor:
+        service.add_stock_movement(cursor, "P1", "Giriş", 5, shelf="A01")
+
+    status, body = transfer(client, {"code": "P1", "quantity": "2", "to": "B01"})
+    assert status == 201
+    assert body["items"][0]["remaining"] == 3
+
+
+def test_writes_are_refused_without_token(db):
+    client = service.app.test_client()
+    response = client.post("/api/movements", json={"code": "P1", "movement": "in", "quantity": 1})
+    assert response.status_code == 403
+    assert service.DB.fetchone("SELECT COUNT(*) FROM stock_movements")[0] == 0
+    assert client.get("/api/balances").status_code == 200
+
+
+def test_movement_without_movement_field(client):
+    response = client.post("/api/movements", json={"code": "P1", "quantity": 1})
+    assert response.status_code == 400
+    assert response.get_json()["errors"] == [{"index": 0, "error": "hareket (movement) alanı eksik"}]
@@ -0,0 +1,108 @@
+import pytest
+import requests
+
+import service
+
+
+class FakeResponse:
+    def __init__(self, status_code, body=None):
+        self.status_code = status_code
+        self._body = body or {}
+        self.text = str(self._body)
+
+    def json(self):
+        return self._body
+
+
+@pytest.fixture
+def creator(db, monkeypatch):
+    """_creator_request'i kuyruktaki yanıtlarla değiştirir; atılan istekler calls'a yazılır."""
+    calls, responses = [], []
+
+    def fake_request(method, url, endpoint, **kwargs):
+        calls.append((method, endpoint))
+        response = responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    monkeypatch.setattr(service, "_creator_request", fake_request)
+    return calls, responses
+
+
+@pytest.mark.parametrize("response", [FakeResponse(200), FakeResponse(404)])
+def test_delete_succeeds_with_single_request(creator, response):
+    calls, responses = creator
+    responses.append(response)
+    service.remember_creator_records("All_Stock_Movements", ["1"])
+
+    assert service.delete_from_creator("Stock_Movements", "1") is True
+    assert calls == [("DELETE", "report/All_Stock_Movements")]
+    assert not service.creator_record_known("All_Stock_Movements", "1")
+
+
+@pytest.mark.parametrize("response", [FakeResponse(500), FakeResponse(401), None,
+                                      requests.ConnectionError("timeout")])
+def test_delete_failure_is_retried(creator, response):
+    calls, responses = creator
+    responses.append(response)
+
+    # Kayıt önbellekte yok; hata "zaten silinmiş" sayılmamalı
+    assert service.delete_from_creator("Stock_Movements", "1") is False
+    assert calls == [("DELETE", "report/All_Stock_Movements")]
+
+
+def test_work_order_delete_uses_report_name(creator):
+    calls, responses = creator
+    responses.append(FakeResponse(200))
+    assert service.delete_from_creator("All_Work_Orders", "7") is True
+    assert calls == [("DELETE", "report/All_Work_Orders")]
+
+
+def test_insert_with_known_id_skips_existence_check(creator):
+    calls, responses = creator
+    service.remember_creator_records("All_Stocks", ["5"])
+
+    ok, message = service.send_to_creator("Stocks", {"ID": "5", "Part_Code": "P1"})
+    assert not ok and "zaten" in message
+    assert calls == []
+
+
+def test_insert_remembers_new_record(creator):
+    calls, responses = creator
+    responses.extend([FakeResponse(404), FakeResponse(200, {"code": 3000, "data": {"ID": "9"}})])
+
+    ok, _ = service.send_to_creator("Stocks", {"ID": "8", "Part_Code": "P1"})
+    assert ok
+    assert calls == [("GET", "report/All_Stocks"), ("POST", "form/Stocks")]
+    assert service.creator_record_known("All_Stocks", "9")
+
+
+def run_outbox():
+    """Bekleyen işleri eklenme sırasıyla OutboxWorker._process üzerinden işler."""
+    jobs = service.DB.fetchall("""
+        SELECT id, form_name, method, payload, record_id, target_table, target_id, part_id, attempts
+        FROM outbox WHERE status = 'pending' ORDER BY id
+    """)
+    for job in jobs:
+        service.OutboxWorker()._process(job)
+    return [(form_name, method, record_id) for _, form_name, method, _, record_id, *_ in jobs]
+
+
+def test_count_links_part_to_stocks_record(creator):
+    calls, responses = creator
+    responses += [FakeResponse(200, {"code": 3000, "data": {"ID": "M1"}}),
+                  FakeResponse(200, {"code": 3000, "data": {"ID": "S1"}})]
+    with service.DB.write() as cursor:
+        service.add_count_movement(cursor, "3423", 5, None)
+    assert run_outbox() == [("Stock_Movements", "POST", None), ("Stocks", "POST", None)]
+    # Önce biten hareket işi parçanın Creator kaydı sanılmamalı
+    assert service.DB.fetchone("SELECT creator_id FROM parts WHERE code = '3423'")[0] == "S1"
+
+    # Sonraki sayım yeni Stocks kaydı açmaz, mevcut kaydı günceller
+    responses += [FakeResponse(200, {"code": 3000, "data": {"ID": "M2"}}),
+                  FakeResponse(200, {"code": 3000, "data": {"ID": "S1"}})]
+    with service.DB.write() as cursor:
+        service.add_count_movement(cursor, "3423", 7, None)
+    assert run_outbox() == [("Stock_Movements", "POST", None), ("Stocks", "PUT", "S1")]
+    assert calls[-1] == ("PUT", "form/Stocks")
@@ -0,0 +1,42 @@
+import pytest
+
+import service
+
+
+@pytest.mark.parametrize("row, expected", [
+    ({"code": " 3423 ", "quantity": "5"}, ("3423", "Sayım", 5, None)),
+    ({"code": "3423", "quantity": "2,0", "movement": "in", "shelf": " A01 "}, ("3423", "Giriş", 2, "A01")),
+    ({"code": "3423", "quantity": 7, "movement": "Çıkış"}, ("3423", "Çıkış", 7, None)),
+])
+def test_parse_movement_row(row, expected):
+    assert service._parse_movement_row(row, "Sayım") == expected
+
+
+@pytest.mark.parametrize("row", [
+    {"code": "", "quantity": "1"},
+    {"code": "3423", "quantity": "abc"},
+    {"code": "3423", "quantity": "1.5"},
+    {"code": "3423", "quantity": "-1"},
+    {"code": "3423", "quantity": "1e400"},
+    {"code": "3423", "quantity": "inf"},
+    {"code": "3423", "quantity": "nan"},
+    {"code": "3423", "quantity": "1", "movement": "taşı"},
+])
+def test_parse_movement_row_rejects(row):
+    with pytest.raises(ValueError):
+        service._parse_movement_row(row, "Sayım")
+
+
+def test_api_rejects_overflowing_quantity(client):
+    response = client.post("/api/movements", json={"code": "3423", "movement": "in", "quantity": "1e400"})
+    assert response.status_code == 400
+    assert response.json["errors"][0]["index"] == 0
+
+
+def test_import_reports_bad_rows_and_writes_nothing(db, tmp_path):
+    path = tmp_path / "sayim.csv"
+    path.write_text("Kod;Miktar\nP1;5\nP2;inf\n", encoding="utf-8")
+    result = service.import_movements(str(path))
+    assert result["imported"] == 0 and result["invalid"] == 1
+    assert result["errors"][0][0] == 3
+    assert service.DB.fetchone("SELECT COUNT(*) FROM stock_movements")[0] == 0
@@ -0,0 +1,22 @@
+from time import time
+
+import service
+
+
+def test_maintenance_takes_snapshots_and_purges(db):
+    with service.DB.write() as cursor:
+        service.record_movement(cursor, service._ensure_part(cursor, "P1"), "Giriş", 5, date="2024-01-10 10:00:00")
+        cursor.execute("INSERT INTO creator_records (report, record_id, seen_at) VALUES ('All_Stocks', '1', ?)",
+                       (time() - service.CREATOR_RECORD_TTL - 1,))
+        cursor.execute("INSERT INTO webhook_events (idempotency_key, kind, received_at) "
+                       "VALUES ('stock_movement:id:1', 'stock_movement', '2020-01-01 00:00:00')")
+
+    service.run_maintenance()
+
+    assert service.DB.fetchone("SELECT quantity FROM stock_snapshots WHERE snapshot_at = '2024-01-31 23:59:59'")[0] == 5
+    assert service.DB.fetchone("SELECT COUNT(*) FROM creator_records")[0] == 0
+    assert service.DB.fetchone("SELECT COUNT(*) FROM webhook_events")[0] == 0
+    # İkinci çalıştırma eksik ay kalmadığı için görüntü almaz
+    count = service.DB.fetchone("SELECT COUNT(*) FROM stock_snapshots")[0]
+    service.run_maintenance()
+    assert service.DB.fetchone("SELECT COUNT(*) FROM stock_snapshots")[0] == count
@@ -0,0 +1,14 @@
+import service
+
+
+def test_latency_summary_merges_statuses_per_endpoint():
+    metrics = service.Metrics()
+    for seconds, status in ((0.04, 200), (0.2, 200), (0.3, 500)):
+        metrics.observe("depo_creator_request_seconds", seconds, method="POST", endpoint="form/Stock", status=status)
+    metrics.observe("depo_creator_request_seconds", 0.01, method="GET", endpoint="report/All_Stocks", status=200)
+    metrics.observe("depo_db_transaction_seconds", 1.0)
+
+    assert metrics.latency_summary("depo_creator_request_seconds", "method", "endpoint") == [
+        "GET report/All_Stocks: 1 istek, ort 10 ms, p95 ≤ 50 ms",
+        "POST form/Stock: 3 istek, ort 180 ms, p95 ≤ 500 ms",
+    ]
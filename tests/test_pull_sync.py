@@ -0,0 +1,69 @@
+import service
+from conftest import finish_outbox, part
+
+
+def pull_stocks(records):
+    with service.DB.write() as cursor:
+        return service._upsert_pulled_stocks(cursor, records)
+
+
+def test_pull_does_not_overwrite_unpushed_local_change(db):
+    with service.DB.write() as cursor:
+        service.add_stock_movement(cursor, "P1", "Giriş", 10)
+    finish_outbox()
+
+    assert pull_stocks([{"ID": "1", "Part_Code": "P1", "Available_Quantity": "0"}]) == 0
+    assert part("P1") == (10, 1)
+
+
+def test_pull_reconciles_clean_part(db):
+    assert pull_stocks([{"ID": "1", "Part_Code": "P1", "Available_Quantity": "7", "Shelf_Location": "A01"}]) == 1
+    assert part("P1") == (7, 0)
+
+    assert pull_stocks([{"ID": "1", "Part_Code": "P1", "Available_Quantity": "5", "Shelf_Location": "A01"}]) == 1
+    assert part("P1") == (5, 0)
+    assert service.verify_stock_ledger() == ([], 0)
+
+
+def test_pull_reconciles_after_push(db):
+    with service.DB.write() as cursor:
+        service.add_stock_movement(cursor, "P1", "Giriş", 10)
+    finish_outbox()
+    pull_stocks([{"ID": "1", "Part_Code": "P1", "Available_Quantity": "0"}])
+    # push_parts_to_creator gönderilen sürümü işaretler; sonraki çekme Creator'daki değişikliği alır
+    with service.DB.write() as cursor:
+        cursor.execute("UPDATE parts SET synced_version = version")
+
+    assert pull_stocks([{"ID": "1", "Part_Code": "P1", "Available_Quantity": "12"}]) == 1
+    assert part("P1") == (12, 0)
+
+
+def test_pull_skips_parts_in_pending_import_batch(db, tmp_path):
+    path = tmp_path / "sayim.csv"
+    path.write_text("Kod;Miktar\nP2;50\n", encoding="utf-8")
+    assert service.import_movements(str(path))["imported"] == 1
+    # push tamamlanmış olsa bile toplu Stock_Movements işi hâlâ kuyrukta
+    with service.DB.write() as cursor:
+        cursor.execute("UPDATE parts SET synced_version = version")
+
+    assert pull_stocks([{"ID": "2", "Part_Code": "P2", "Available_Quantity": "0"}]) == 0
+    assert part("P2") == (50, 0)
+
+
+def movement_dates():
+    return [row[0] for row in service.DB.fetchall("SELECT date FROM stock_movements ORDER BY creator_id")]
+
+
+def test_pulled_movement_date_is_stored_in_utc(db, monkeypatch):
+    monkeypatch.setattr(service, "CREATOR_TIMEZONE", "Europe/Istanbul")
+    record = {"ID": "9", "Part_Code": "P1", "Movement": "added", "Added_Removed": "3",
+              "Date_Time": "05-Mar-2024 10:00:00"}
+    with service.DB.write() as cursor:
+        service._upsert_pulled_movements(cursor, [record])
+    assert movement_dates() == ["2024-03-05 07:00:00"]
+
+    # Aynı kayıt Creator'da düzeltilince güncelleme yolu da tarihi çevirir
+    with service.DB.write() as cursor:
+        service._upsert_pulled_movements(cursor, [dict(record, Date_Time="05-Mar-2024 12:30:00", Added_Removed="4")])
+    assert movement_dates() == ["2024-03-05 09:30:00"]
+    assert part("P1")[0] == 4
@@ -0,0 +1,63 @@
+import threading
+
+import service
+from conftest import part
+
+
+def apply(event):
+    with service.DB.write() as cursor:
+        return service.apply_webhook_event(cursor, event)
+
+
+def test_webhook_movement_uses_creator_date_in_utc(db, monkeypatch):
+    monkeypatch.setattr(service, "CREATOR_TIMEZONE", "Europe/Istanbul")
+    assert apply({"ID": "7", "Part_Code": "P1", "Movement": "added", "Added_Removed": "4",
+                  "Date_Time": "05-Mar-2024 10:00:00"})
+
+    assert service.DB.fetchone("SELECT date FROM stock_movements WHERE creator_id = '7'")[0] == "2024-03-05 07:00:00"
+
+
+def test_late_webhook_count_is_placed_in_ledger_order(db, monkeypatch):
+    monkeypatch.setattr(service, "CREATOR_TIMEZONE", "Europe/Istanbul")
+    with service.DB.write() as cursor:
+        service.add_stock_movement(cursor, "P1", "Giriş", 10)
+    # Girişten önce Creator'da yapılmış sayım geç geliyor: giriş sayımın üstüne eklenir
+    assert apply({"ID": "8", "Part_Code": "P1", "Movement": "count", "Added_Removed": "5", "Stock": "5",
+                  "Date_Time": "01-Jan-2024 10:00:00"})
+
+    assert part("P1")[0] == 15
+    assert service.verify_stock_ledger() == ([], 0)
+
+
+def reserved(code):
+    return service.DB.fetchone("SELECT reserved FROM parts WHERE code = ?", (code,))[0]
+
+
+def test_work_order_edit_in_creator_updates_order(db):
+    with service.DB.write() as cursor:
+        service._ensure_part(cursor, "3423")
+    order = {"ID": "W1", "Maintenance_Repair_Records": "CNC-1", "Required_Parts": "3423 x2",
+             "Status_Information": "Beklemede"}
+    assert apply(order)
+    assert reserved("3423") == 2
+
+    assert not apply(order)   # aynı olayın tekrarı
+    assert apply(dict(order, Status_Information="Tamamlandı"))
+    assert service.DB.fetchone("SELECT status FROM work_orders WHERE creator_id = 'W1'")[0] == "Tamamlandı"
+    assert reserved("3423") == 0
+    assert service.DB.fetchone("SELECT COUNT(*) FROM work_orders")[0] == 1
+
+
+def test_concurrent_submits_are_all_or_nothing(monkeypatch):
+    ingestor = service.WebhookIngestor(maxsize=101)
+    monkeypatch.setattr(ingestor, "ensure_started", lambda: None)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(ingestor.submit([{"ID": "1"}] * 2)))
+               for _ in range(200)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Reddedilen hiçbir grup kuyrukta yarım kalmamalı
+    assert ingestor.depth() == 2 * results.count(True) == 100
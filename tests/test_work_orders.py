@@ -0,0 +1,49 @@
+import pytest
+
+import service
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("2x 3423", {"3423": 2}),
+    ("2 X P1", {"P1": 2}),
+    ("2 adet 3423", {"3423": 2}),
+    ("3423 x2", {"3423": 2}),
+    ("3423 x 2", {"3423": 2}),   # iki taraf da sayı: bilinen kod yoksa kod önce
+    ("3423x2", {"3423": 2}),
+    ("P1 x 2", {"P1": 2}),
+    ("3423*2", {"3423": 2}),
+    ("3423: 2", {"3423": 2}),
+    ("3423 (2)", {"3423": 2}),
+    ("3423 2 adet", {"3423": 2}),
+    ("3423", {"3423": 1}),
+    ("box12", {"box12": 1}),
+    ("P1x2", {"P1x2": 1}),
+    ("3423 x2, 3423 (1); 10070 x3\n P2", {"3423": 3, "10070": 3, "P2": 1}),
+])
+def test_parse_required_parts(text, expected):
+    assert service.parse_required_parts(text) == (expected, [])
+
+
+def test_parse_required_parts_reports_unrecognised_entries():
+    assert service.parse_required_parts("2 x, P1 x2, 3423 x 2 adet") == ({"P1": 2}, ["2 x", "3423 x 2 adet"])
+
+
+@pytest.mark.parametrize("text", ["2 x 3423", "2x3423", "3423 x 2", "3423x2"])
+def test_numeric_pair_uses_known_part_code(text):
+    assert service.parse_required_parts(text, {"3423"}.__contains__) == ({"3423": 2}, [])
+
+
+def test_numeric_pair_of_two_known_codes_is_not_guessed():
+    assert service.parse_required_parts("2 x 3423", {"2", "3423"}.__contains__) == ({}, ["2 x 3423"])
+
+
+def test_open_work_order_reserves_parsed_quantity(db):
+    with service.DB.write() as cursor:
+        for code in ("3423", "box12"):
+            service._ensure_part(cursor, code)
+    work_order_id = service.add_work_order("CNC-1: bakım", "2 x 3423, box12", "Beklemede")
+    reserved = dict(service.DB.fetchall("SELECT code, reserved FROM parts WHERE code IN ('3423', 'box12')"))
+    assert reserved == {"3423": 2, "box12": 1}
+
+    service.remove_work_order(work_order_id)
+    assert service.DB.fetchone("SELECT reserved FROM parts WHERE code = '3423'")[0] == 0